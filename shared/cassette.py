@@ -0,0 +1,269 @@
+"""
+Record / replay cassettes for LLM and tool calls.
+
+With CASSETTE_MODE=record everything runs for real and each call is appended,
+with its result and upstream latency, to the JSONL file at CASSETTE_PATH:
+chat-model calls (keyed by messages, bound tools and stop words), tools
+wrapped by cassette_tools() (keyed by tool name, description and input) and
+anything else routed through Cassette.call, such as MCP tool discovery. With
+CASSETTE_MODE=replay those results are served instantly, in recorded order for
+repeated keys, and anything not on the cassette raises CassetteMiss. A
+replayed run makes no network calls, so its wall time is the orchestration
+cost alone: LangChain/LangGraph, message handling, Tool wrappers, routers and
+our glue code.
+
+NodeTimer is a callback handler that splits the wall time of each graph node
+(or of the root chain, for a ReAct AgentExecutor) into model time, tool time
+and the remaining overhead. find_regressions() compares its report against a
+saved baseline so CI can flag overhead regressions.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+DEFAULT_CASSETTE_PATH = "./cassettes/cassette.jsonl"
+
+
+class CassetteMiss(KeyError):
+    """A replayed run made a call that was not recorded."""
+
+
+class Cassette:
+    def __init__(self, path: str = DEFAULT_CASSETTE_PATH, mode: str = "replay"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown cassette mode '{mode}' (expected 'record' or 'replay')")
+        self.path = path
+        self.mode = mode
+        self._lock = threading.Lock()
+        self._entries = {}  # (kind, key) -> [entry, ...] in recorded order
+        self._cursor = Counter()
+        self._file = None
+        self.recorded = 0
+        self.replayed = 0
+        self.replayed_seconds = 0.0  # upstream latency the replay skipped
+
+        if mode == "replay":
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries.setdefault((entry["kind"], entry["key"]), []).append(entry)
+        else:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, "w", encoding="utf-8")
+
+    def _replay(self, kind: str, key: str, label: str):
+        with self._lock:
+            entries = self._entries.get((kind, key))
+            if not entries:
+                raise CassetteMiss(f"{kind} call {label or key[:16]} is not on cassette {self.path}; "
+                                   f"re-record it with CASSETTE_MODE=record")
+            # Repeated identical calls replay in order; extra repeats get the last answer.
+            entry = entries[min(self._cursor[(kind, key)], len(entries) - 1)]
+            self._cursor[(kind, key)] += 1
+            self.replayed += 1
+            self.replayed_seconds += entry["seconds"]
+        return entry["result"]
+
+    def _record(self, kind: str, key: str, label: str, result, seconds: float):
+        line = json.dumps({"kind": kind, "key": key, "label": label, "seconds": round(seconds, 4),
+                           "result": result}, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self.recorded += 1
+
+    def call(self, kind: str, key: str, fn, label: str = "", encode=None, decode=None):
+        """Return the replayed result for (kind, key), or run `fn()` and record it."""
+        if self.mode == "replay":
+            result = self._replay(kind, key, label)
+            return decode(result) if decode else result
+        start = time.perf_counter()
+        result = fn()
+        self._record(kind, key, label, encode(result) if encode else result, time.perf_counter() - start)
+        return result
+
+    async def acall(self, kind: str, key: str, fn, label: str = "", encode=None, decode=None):
+        """Async call(); `fn` returns an awaitable."""
+        if self.mode == "replay":
+            result = self._replay(kind, key, label)
+            return decode(result) if decode else result
+        start = time.perf_counter()
+        result = await fn()
+        self._record(kind, key, label, encode(result) if encode else result, time.perf_counter() - start)
+        return result
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> dict:
+        return {"mode": self.mode, "recorded": self.recorded, "replayed": self.replayed,
+                "replayed_upstream_s": round(self.replayed_seconds, 2)}
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """Process-wide cassette from CASSETTE_MODE / CASSETTE_PATH, or None when not recording or replaying."""
+    global _cassette
+    mode = os.getenv("CASSETTE_MODE", "off")
+    if mode == "off":
+        return None
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette(os.getenv("CASSETTE_PATH", DEFAULT_CASSETTE_PATH), mode)
+        return _cassette
+
+
+def cassette_tools(tools: list) -> list:
+    """Route each tool's calls through the active cassette; unchanged when there is none."""
+    from langchain_core.tools import Tool
+
+    cassette = get_cassette()
+    if cassette is None:
+        return tools
+
+    def wrap(tool):
+        func = tool.func
+
+        def recorded(tool_input):
+            # Agents can each have a tool of the same name (e.g. ReadFile over different
+            # folders), and their calls may interleave, so the description is part of the key.
+            key = hashlib.sha256(json.dumps([tool.name, tool.description, tool_input], default=str)
+                                 .encode("utf-8")).hexdigest()
+            return cassette.call("tool", key, lambda: func(tool_input), label=f"{tool.name}({str(tool_input)[:60]!r})")
+
+        return Tool(name=tool.name, description=tool.description, func=recorded)
+
+    return [wrap(t) for t in tools]
+
+
+class NodeTimer(BaseCallbackHandler):
+    """Per-node wall time split into model, tool and orchestration overhead.
+
+    A node is a LangGraph node run (a chain whose name matches its
+    `langgraph_node` metadata) or a root chain such as an AgentExecutor.
+    Model and tool time counts toward every enclosing node, so a parent node's
+    overhead excludes the work done in its subgraph's model and tool calls.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._parent = {}  # run_id -> parent_run_id
+        self._nodes = {}  # run_id -> open node record
+        self._leaves = {}  # run_id -> (kind, start)
+        self.totals = {}  # node label -> aggregate
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name")
+        node = (metadata or {}).get("langgraph_node")
+        with self._lock:
+            self._parent[run_id] = parent_run_id
+            if (node and name == node) or parent_run_id is None:
+                self._nodes[run_id] = {"label": name, "start": time.perf_counter(), "model": 0.0, "tool": 0.0}
+
+    def _end_chain(self, run_id):
+        now = time.perf_counter()
+        with self._lock:
+            self._parent.pop(run_id, None)
+            node = self._nodes.pop(run_id, None)
+            if node is None:
+                return
+            total = self.totals.setdefault(node["label"], {"calls": 0, "wall": 0.0, "model": 0.0, "tool": 0.0})
+            total["calls"] += 1
+            total["wall"] += now - node["start"]
+            total["model"] += node["model"]
+            total["tool"] += node["tool"]
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end_chain(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end_chain(run_id)
+
+    def _start_leaf(self, kind: str, run_id, parent_run_id):
+        with self._lock:
+            self._parent[run_id] = parent_run_id
+            self._leaves[run_id] = (kind, time.perf_counter())
+
+    def _end_leaf(self, run_id):
+        now = time.perf_counter()
+        with self._lock:
+            leaf = self._leaves.pop(run_id, None)
+            parent = self._parent.pop(run_id, None)
+            if leaf is None:
+                return
+            kind, start = leaf
+            while parent is not None:
+                if parent in self._nodes:
+                    self._nodes[parent][kind] += now - start
+                parent = self._parent.get(parent)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, **kwargs):
+        self._start_leaf("model", run_id, parent_run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, **kwargs):
+        self._start_leaf("model", run_id, parent_run_id)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        self._end_leaf(run_id)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end_leaf(run_id)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        self._start_leaf("tool", run_id, parent_run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._end_leaf(run_id)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end_leaf(run_id)
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                label: {
+                    "calls": t["calls"],
+                    "wall_ms": round(t["wall"] * 1000, 2),
+                    "model_ms": round(t["model"] * 1000, 2),
+                    "tool_ms": round(t["tool"] * 1000, 2),
+                    "overhead_ms": round((t["wall"] - t["model"] - t["tool"]) * 1000, 2),
+                    "overhead_ms_per_call": round((t["wall"] - t["model"] - t["tool"]) * 1000 / t["calls"], 3),
+                }
+                for label, t in self.totals.items()
+            }
+
+    def print_report(self):
+        report = self.report()
+        if not report:
+            return
+        print(f"\n{'node':<20} {'calls':>6} {'wall ms':>9} {'model ms':>9} {'tool ms':>8} {'overhead ms':>12} {'per call':>9}")
+        for label, r in sorted(report.items(), key=lambda item: item[1]["overhead_ms"], reverse=True):
+            print(f"{label:<20} {r['calls']:>6} {r['wall_ms']:>9.1f} {r['model_ms']:>9.1f} {r['tool_ms']:>8.1f} "
+                  f"{r['overhead_ms']:>12.1f} {r['overhead_ms_per_call']:>9.2f}")
+
+
+def find_regressions(report: dict, baseline: dict, tolerance: float = 0.25, floor_ms: float = 0.5) -> list:
+    """Nodes whose per-call overhead grew by more than `tolerance` (and `floor_ms`) over the baseline."""
+    regressions = []
+    for label, r in report.items():
+        base = baseline.get(label)
+        if base is None:
+            continue
+        before, after = base["overhead_ms_per_call"], r["overhead_ms_per_call"]
+        if after > before * (1 + tolerance) and after - before > floor_ms:
+            regressions.append(f"{label}: {before:.2f} -> {after:.2f} ms/call")
+    return regressions
@@ -0,0 +1,303 @@
+"""
+Exact-match cache for chat model responses.
+
+Every chat model here runs at temperature=0, so an identical request
+(deployment, messages, bound tools, sampling params) gets an identical answer.
+Responses are stored in SQLite keyed by a SHA-256 of that request, the file is
+capped at max_bytes with least-recently-used eviction, and concurrent
+identical requests share one upstream call (single-flight). Hits skip the
+rate-limit scheduler entirely.
+
+ScheduledAzureChatOpenAI consults the cache returned by get_llm_cache(); set
+LLM_CACHE=0 to disable it, LLM_CACHE_PATH / LLM_CACHE_MAX_MB to relocate or
+resize it.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "./.llm_cache.sqlite3"
+
+
+def _message_key(message) -> dict:
+    """The parts of a message that reach the model.
+
+    Ids and response/usage metadata differ between otherwise identical
+    conversations (LangGraph's add_messages gives every state message a fresh
+    uuid), so they are left out of the key.
+    """
+    return {
+        "type": message.type,
+        "content": message.content,
+        "tool_calls": getattr(message, "tool_calls", None) or [],
+        "tool_call_id": getattr(message, "tool_call_id", None),
+    }
+
+
+def cache_key(deployment: str, messages: list, llm_string: str) -> str:
+    """Stable hash of a chat request.
+
+    `llm_string` is LangChain's serialization of the model params and call
+    kwargs (temperature, max_tokens, stop, bound tools, ...).
+    """
+    payload = json.dumps(
+        [deployment, [_message_key(m) for m in messages], llm_string],
+        sort_keys=True, default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def encode_result(result) -> dict:
+    """JSON-safe form of a ChatResult."""
+    from langchain_core.load import dumpd
+
+    return {"generations": [dumpd(g) for g in result.generations], "llm_output": result.llm_output}
+
+
+def decode_result(data: dict):
+    """ChatResult from encode_result(); messages get no id, so each replay is a new message in graph state."""
+    from langchain_core.load import load
+    from langchain_core.outputs import ChatResult
+
+    generations = [load(g) for g in data["generations"]]
+    for generation in generations:
+        generation.message.id = None
+    return ChatResult(generations=generations, llm_output=data["llm_output"])
+
+
+def _total_tokens(llm_output: dict) -> int:
+    usage = (llm_output or {}).get("token_usage") or {}
+    return int(usage.get("total_tokens") or 0)
+
+
+class _LeaderCancelled(Exception):
+    """Tells aget_or_call followers that the call they were waiting on was cancelled."""
+
+
+class LLMResponseCache:
+    """SQLite-backed, size-bounded LRU store of ChatResults with single-flight."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = 256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, nbytes INTEGER NOT NULL, "
+            "tokens INTEGER NOT NULL, created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._inflight = {}  # key -> (Event, result holder)
+        self._ainflight = {}  # (loop id, key) -> Future
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.saved_tokens = 0
+
+    def get(self, key: str):
+        """The cached ChatResult, or None."""
+        with self._lock:
+            row = self._conn.execute("SELECT payload, tokens FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+        payload, tokens = row
+        self.hits += 1
+        self.saved_tokens += tokens
+        return decode_result(json.loads(payload))
+
+    def set(self, key: str, result):
+        payload = json.dumps(encode_result(result), default=str)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, payload, nbytes, tokens, created_at, last_access) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, payload, len(payload), _total_tokens(result.llm_output), now, now),
+            )
+            self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM llm_cache").fetchone()
+        overflow = total - self.max_bytes
+        if overflow <= 0:
+            return
+        victims = []
+        for key, nbytes in self._conn.execute("SELECT key, nbytes FROM llm_cache ORDER BY last_access ASC"):
+            victims.append((key,))
+            overflow -= nbytes
+            if overflow <= 0:
+                break
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+
+    def invalidate(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    def get_or_call(self, key: str, call):
+        """Return the cached result for `key`, or run `call()` once for all concurrent callers."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = (threading.Event(), {})
+                self._inflight[key] = inflight
+
+        done, holder = inflight
+        if not leader:
+            self.coalesced += 1
+            done.wait()
+            if "error" in holder:
+                raise holder["error"]
+            if "result" not in holder:
+                # The leader was interrupted without a result; make our own call.
+                self.coalesced -= 1
+                return self.get_or_call(key, call)
+            self.saved_tokens += _total_tokens(holder["result"].llm_output)
+            return holder["result"]
+
+        try:
+            # Another leader may have finished between our miss and registering.
+            result = self.get(key)
+            if result is None:
+                self.misses += 1
+                result = call()
+                self.set(key, result)
+            holder["result"] = result
+            return result
+        except Exception as e:
+            holder["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    async def aget_or_call(self, key: str, call):
+        """Async get_or_call; `call` returns an awaitable. Coalesces within one event loop."""
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        slot = (id(loop), key)
+        future = self._ainflight.get(slot)
+        if future is not None:
+            self.coalesced += 1
+            try:
+                result = await asyncio.shield(future)
+            except _LeaderCancelled:
+                # Cancelling the leader must not cancel its followers; make our own call.
+                self.coalesced -= 1
+                return await self.aget_or_call(key, call)
+            self.saved_tokens += _total_tokens(result.llm_output)
+            return result
+
+        future = loop.create_future()
+        self._ainflight[slot] = future
+        try:
+            self.misses += 1
+            result = await call()
+            self.set(key, result)
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody was waiting
+            raise
+        finally:
+            self._ainflight.pop(slot, None)
+            if not future.done():
+                future.set_exception(_LeaderCancelled())
+                future.exception()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced
+        with self._lock:
+            entries, nbytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM llm_cache"
+            ).fetchone()
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 3) if lookups else 0.0,
+            "saved_tokens": self.saved_tokens,
+            "entries": entries,
+            "mb": round(nbytes / 1e6, 2),
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Process-wide cache configured from the environment, or None when LLM_CACHE=0."""
+    global _cache
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache(
+                path=os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+                max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024),
+            )
+        return _cache
+
+
+if __name__ == "__main__":
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    from langchain_core.messages import AIMessage, HumanMessage
+    from langchain_core.outputs import ChatGeneration, ChatResult
+
+    class FakeDeployment:
+        """Local stand-in for a chat deployment that counts upstream calls."""
+
+        def __init__(self, delay: float = 0.2):
+            self.delay = delay
+            self.calls = 0
+
+        def generate(self, messages):
+            self.calls += 1
+            time.sleep(self.delay)
+            text = f"answer to {messages[-1].content!r}"
+            return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))],
+                              llm_output={"token_usage": {"total_tokens": 120}})
+
+    cache = LLMResponseCache(os.path.join(tempfile.mkdtemp(), "llm_cache.sqlite3"), max_bytes=4096)
+    backend = FakeDeployment()
+
+    def ask(question: str):
+        messages = [HumanMessage(content=question)]
+        key = cache_key("gpt-4.1", messages, "temperature=0")
+        return cache.get_or_call(key, lambda: backend.generate(messages))
+
+    questions = ["Classify: VPN setup"] * 6 + ["Classify: payroll dates"] * 2
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(ask, questions))
+    ask("Classify: VPN setup")
+    print(f"9 requests ({len(set(questions))} distinct) -> {backend.calls} upstream calls; {cache.stats()}")
+
+    for i in range(40):
+        ask(f"Classify: ticket {i}")
+    print(f"After 40 more distinct requests the 4 KB cap keeps {cache.stats()['entries']} entries")
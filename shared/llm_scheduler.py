@@ -0,0 +1,513 @@
+"""
+Shared scheduler for Azure OpenAI calls.
+
+All chat model calls in the process go through one LLMScheduler, which enforces
+request-per-minute and token-per-minute budgets, adapts the number of
+concurrent calls (additive increase on success, multiplicative decrease on
+429), serves interactive calls before batch evaluation calls, and retries
+rate-limited calls with jittered exponential backoff that honors Retry-After.
+
+Budgets come from AZURE_OPENAI_RPM / AZURE_OPENAI_TPM / AZURE_OPENAI_MAX_CONCURRENCY.
+Use `with llm_priority(BATCH):` around evaluation loops.
+"""
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+from langchain_openai import AzureChatOpenAI
+
+INTERACTIVE = 0
+BATCH = 1
+
+_priority = contextvars.ContextVar("llm_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(level: int):
+    """Run the enclosed LLM calls at the given priority class."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """Budget that refills continuously at `per_minute` units per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        """Return (positive) or charge (negative) units after the real cost is known."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return getattr(error, "status_code", None) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read Retry-After (or retry-after-ms) from the error's HTTP response, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000.0
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+class LLMScheduler:
+    """RPM/TPM budgets, AIMD concurrency, priority queueing and 429 retries."""
+
+    def __init__(self, rpm: float = 60, tpm: float = 60000, max_concurrency: int = 16,
+                 initial_concurrency: int = 4, max_retries: int = 6,
+                 base_delay: float = 0.5, max_delay: float = 30.0):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.limit = float(min(initial_concurrency, max_concurrency))
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._cond = threading.Condition()
+        self._queue = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+        self._active = 0
+        self._paused_until = 0.0
+
+        self.stats = {"calls": 0, "rate_limited": 0, "retries": 0, "failed": 0, "wait_seconds": 0.0}
+
+    @property
+    def active(self) -> int:
+        """Calls currently holding a slot."""
+        with self._cond:
+            return self._active
+
+    @property
+    def queued(self) -> int:
+        """Calls waiting for a slot."""
+        with self._cond:
+            return len(self._queue)
+
+    def _acquire(self, est_tokens: int, priority: int, withdrawn: threading.Event = None) -> bool:
+        """Block until a slot is free; returns False if `withdrawn` was set first (no slot taken)."""
+        start = time.monotonic()
+        with self._cond:
+            ticket = (priority, next(self._seq))
+            heapq.heappush(self._queue, ticket)
+            while True:
+                if withdrawn is not None and withdrawn.is_set():
+                    self._queue.remove(ticket)
+                    heapq.heapify(self._queue)
+                    self._cond.notify_all()
+                    return False
+                if self._queue[0] == ticket and self._active < int(self.limit):
+                    wait = max(
+                        self._paused_until - time.monotonic(),
+                        self.requests.wait_time(1),
+                        self.tokens.wait_time(est_tokens),
+                    )
+                    if wait <= 0:
+                        heapq.heappop(self._queue)
+                        self.requests.take(1)
+                        self.tokens.take(est_tokens)
+                        self._active += 1
+                        self.stats["wait_seconds"] += time.monotonic() - start
+                        self._cond.notify_all()
+                        return True
+                    self._cond.wait(timeout=wait)
+                else:
+                    self._cond.wait(timeout=0.5)
+
+    async def _aacquire(self, est_tokens: int, priority: int):
+        """_acquire() from async code, without leaking a slot if the caller is cancelled.
+
+        The blocking wait runs on a worker thread that cancellation cannot
+        stop, so a cancelled caller withdraws its place in the queue, and a
+        slot the thread was granted in the meantime is released.
+        """
+        withdrawn = threading.Event()
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self._acquire, est_tokens, priority, withdrawn))
+        try:
+            await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            withdrawn.set()
+            with self._cond:
+                self._cond.notify_all()
+
+            def release_if_granted(f):
+                if not f.cancelled() and f.exception() is None and f.result():
+                    self._release()
+
+            acquiring.add_done_callback(release_if_granted)
+            raise
+
+    def _release(self, rate_limited: bool = False, succeeded: bool = False):
+        with self._cond:
+            self._active -= 1
+            if rate_limited:
+                self.limit = max(1.0, self.limit / 2)
+            elif succeeded:
+                self.limit = min(float(self.max_concurrency), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        retry_after = retry_after_seconds(error)
+        if retry_after is not None:
+            delay = retry_after + random.uniform(0, self.base_delay)
+            # Everyone waits out the server's Retry-After, not just this caller.
+            with self._cond:
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+        else:
+            delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return delay
+
+    def _on_error(self, attempt: int, error: Exception) -> Optional[float]:
+        """Release the slot and return the backoff delay, or None if the error is final."""
+        if not is_rate_limit_error(error):
+            self._release()
+            self.stats["failed"] += 1
+            return None
+        self._release(rate_limited=True)
+        self.stats["rate_limited"] += 1
+        if attempt >= self.max_retries:
+            self.stats["failed"] += 1
+            return None
+        self.stats["retries"] += 1
+        return self._backoff(attempt, error)
+
+    def call(self, fn, est_tokens: int = 1000, priority: Optional[int] = None):
+        """Run fn() under the scheduler, retrying on 429."""
+        priority = _priority.get() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            self._acquire(est_tokens, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                delay = self._on_error(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self._release()
+                raise
+            self._release(succeeded=True)
+            self.stats["calls"] += 1
+            return result
+
+    async def acall(self, coro_fn, est_tokens: int = 1000, priority: Optional[int] = None):
+        """Async variant of call(); coro_fn() must return a fresh awaitable each time."""
+        priority = _priority.get() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            await self._aacquire(est_tokens, priority)
+            try:
+                result = await coro_fn()
+            except Exception as e:
+                delay = self._on_error(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled (e.g. the losing side of a hedge, or a refused speculative run).
+                self._release()
+                raise
+            self._release(succeeded=True)
+            self.stats["calls"] += 1
+            return result
+
+    async def astream(self, stream_fn, est_tokens: int = 1000, priority: Optional[int] = None):
+        """Iterate stream_fn() (an async iterator factory) while holding a scheduler slot.
+
+        A 429 is retried only before the first chunk; once output has been
+        yielded the error propagates. Cancellation, while queued or while
+        streaming, frees the slot.
+        """
+        priority = _priority.get() if priority is None else priority
+        for attempt in range(self.max_retries + 1):
+            await self._aacquire(est_tokens, priority)
+            started = False
+            try:
+                async for chunk in stream_fn():
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started:
+                    self._release()
+                    self.stats["failed"] += 1
+                    raise
+                delay = self._on_error(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self._release()
+                raise
+            self._release(succeeded=True)
+            self.stats["calls"] += 1
+            return
+
+    def record_usage(self, estimated: int, actual: int):
+        """Correct the TPM budget once the real token usage is known."""
+        with self._cond:
+            self.tokens.adjust(estimated - actual)
+            self._cond.notify_all()
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Process-wide scheduler configured from the environment."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                rpm=float(os.getenv("AZURE_OPENAI_RPM", "60")),
+                tpm=float(os.getenv("AZURE_OPENAI_TPM", "60000")),
+                max_concurrency=int(os.getenv("AZURE_OPENAI_MAX_CONCURRENCY", "16")),
+            )
+        return _scheduler
+
+
+def estimate_tokens(messages, max_tokens: Optional[int] = None) -> int:
+    """Prompt tokens (about 4 characters each) plus the expected completion size."""
+    prompt_chars = sum(len(str(getattr(m, "content", m))) for m in messages)
+    return prompt_chars // 4 + (max_tokens or 500)
+
+
+class ScheduledAzureChatOpenAI(AzureChatOpenAI):
+    """AzureChatOpenAI whose requests go through the shared LLMScheduler.
+
+    The client's own retries are disabled so that 429 handling happens in
+    one place. Deterministic (temperature=0) requests are answered from the
+    exact-match response cache in llm_cache.py when possible, without taking
+    a scheduler slot. When a cassette is active (cassette.py), calls are
+    recorded to it or replayed from it ahead of both.
+    """
+
+    max_retries: Optional[int] = 0
+
+    def _response_cache_key(self, messages, stop, kwargs):
+        """Key for the exact-match response cache, or None if the request isn't deterministic."""
+        from llm_cache import cache_key, get_llm_cache
+
+        if get_llm_cache() is None or self.temperature not in (0, 0.0) or kwargs.get("stream"):
+            return None
+        return cache_key(self.deployment_name, messages, self._get_llm_string(stop=stop, **kwargs))
+
+    def _cassette(self, messages, stop, kwargs):
+        """(active cassette, request key), or (None, None) outside record/replay.
+
+        The key leaves out the deployment and endpoint settings so a cassette
+        replays in CI with placeholder credentials.
+        """
+        from cassette import get_cassette
+        from llm_cache import cache_key
+
+        cassette = get_cassette()
+        if cassette is None:
+            return None, None
+        call = json.dumps({"stop": stop, **kwargs}, sort_keys=True, default=str)
+        return cassette, cache_key("cassette", messages, call)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        def call():
+            scheduler = get_scheduler()
+            est = estimate_tokens(messages, self.max_tokens)
+            result = scheduler.call(
+                lambda: super(ScheduledAzureChatOpenAI, self)._generate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                ),
+                est_tokens=est,
+            )
+            self._record_usage(scheduler, est, result)
+            return result
+
+        def cached():
+            key = self._response_cache_key(messages, stop, kwargs)
+            if key is None:
+                return call()
+            from llm_cache import get_llm_cache
+
+            return get_llm_cache().get_or_call(key, call)
+
+        cassette, key = self._cassette(messages, stop, kwargs)
+        if cassette is None:
+            return cached()
+        from llm_cache import decode_result, encode_result
+
+        return cassette.call("llm", key, cached, label=self.deployment_name,
+                             encode=encode_result, decode=decode_result)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        async def call():
+            scheduler = get_scheduler()
+            est = estimate_tokens(messages, self.max_tokens)
+            result = await scheduler.acall(
+                lambda: super(ScheduledAzureChatOpenAI, self)._agenerate(
+                    messages, stop=stop, run_manager=run_manager, **kwargs
+                ),
+                est_tokens=est,
+            )
+            self._record_usage(scheduler, est, result)
+            return result
+
+        async def cached():
+            key = self._response_cache_key(messages, stop, kwargs)
+            if key is None:
+                return await call()
+            from llm_cache import get_llm_cache
+
+            return await get_llm_cache().aget_or_call(key, call)
+
+        cassette, key = self._cassette(messages, stop, kwargs)
+        if cassette is None:
+            return await cached()
+        from llm_cache import decode_result, encode_result
+
+        return await cassette.acall("llm", key, cached, label=self.deployment_name,
+                                    encode=encode_result, decode=decode_result)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        """Streaming (used by the hedged router) also goes through the cache and the scheduler.
+
+        A cache hit is replayed as a single chunk; a completed stream is cached.
+        """
+        from langchain_core.messages import AIMessageChunk, message_chunk_to_message
+        from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+        from llm_cache import get_llm_cache
+
+        key = self._response_cache_key(messages, stop, kwargs)
+        if key is not None:
+            cached = get_llm_cache().get(key)
+            if cached is not None:
+                message = cached.generations[0].message
+                yield ChatGenerationChunk(message=AIMessageChunk(
+                    content=message.content, additional_kwargs=message.additional_kwargs,
+                    response_metadata=message.response_metadata,
+                ))
+                return
+
+        combined = None
+        async for chunk in get_scheduler().astream(
+            lambda: super(ScheduledAzureChatOpenAI, self)._astream(
+                messages, stop=stop, run_manager=run_manager, **kwargs
+            ),
+            est_tokens=estimate_tokens(messages, self.max_tokens),
+        ):
+            combined = chunk if combined is None else combined + chunk
+            yield chunk
+        if key is not None and combined is not None:
+            get_llm_cache().set(key, ChatResult(generations=[ChatGeneration(
+                message=message_chunk_to_message(combined.message),
+                generation_info=combined.generation_info,
+            )]))
+
+    @staticmethod
+    def _record_usage(scheduler: LLMScheduler, estimated: int, result):
+        usage = (result.llm_output or {}).get("token_usage") or {}
+        if usage.get("total_tokens"):
+            scheduler.record_usage(estimated, usage["total_tokens"])
+
+
+if __name__ == "__main__":
+    from concurrent.futures import ThreadPoolExecutor
+
+    class MockRateLimitError(Exception):
+        status_code = 429
+
+        def __init__(self, retry_after: float):
+            super().__init__("429 Too Many Requests")
+            self.headers = {"retry-after": str(retry_after)}
+
+    class MockAzureDeployment:
+        """Local stand-in for a deployment that allows `capacity` concurrent calls."""
+
+        def __init__(self, capacity: int = 3, latency: float = 0.05):
+            self.capacity = capacity
+            self.latency = latency
+            self.active = 0
+            self.rejected = 0
+            self.order = []
+            self.lock = threading.Lock()
+
+        def complete(self, name: str) -> str:
+            with self.lock:
+                if self.active >= self.capacity:
+                    self.rejected += 1
+                    raise MockRateLimitError(retry_after=0.1)
+                self.active += 1
+            try:
+                time.sleep(self.latency)
+                self.order.append(name)
+                return f"answer to {name}"
+            finally:
+                with self.lock:
+                    self.active -= 1
+
+    for use_scheduler in (False, True):
+        backend = MockAzureDeployment()
+        scheduler = LLMScheduler(rpm=6000, tpm=10_000_000, max_concurrency=16, initial_concurrency=8, base_delay=0.05)
+
+        def job(args):
+            name, level = args
+            if not use_scheduler:
+                for attempt in range(20):
+                    try:
+                        return backend.complete(name)
+                    except MockRateLimitError:
+                        time.sleep(0.01)
+                return None
+            return scheduler.call(lambda: backend.complete(name), est_tokens=100, priority=level)
+
+        jobs = [(f"batch-{i}", BATCH) for i in range(30)] + [(f"interactive-{i}", INTERACTIVE) for i in range(10)]
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=40) as pool:
+            results = list(pool.map(job, jobs))
+        elapsed = time.monotonic() - start
+        done = sum(r is not None for r in results)
+        label = "scheduler" if use_scheduler else "naive retries"
+        print(f"{label:14s}: {done}/{len(jobs)} completed, {backend.rejected} x 429 from mock, {elapsed:.2f}s")
+        if use_scheduler:
+            interactive_rank = [i for i, n in enumerate(backend.order) if n.startswith("interactive")]
+            print(f"{'':14s}  final concurrency limit {scheduler.limit:.1f}, stats {scheduler.stats}")
+            print(f"{'':14s}  mean completion rank of interactive calls: {sum(interactive_rank) / len(interactive_rank):.1f} of {len(jobs)}")
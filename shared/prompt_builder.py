@@ -0,0 +1,178 @@
+"""
+Prompt assembly with byte-stable, cacheable prefixes.
+
+Follows the static/dynamic tiering from week2/task2_hr_assistant.md:
+
+  tier 1  static instructions for a call site (the system prompt), byte-identical
+          on every request
+  tier 2  semi-static context shared by many requests (e.g. the rendered tool
+          list of a ReAct agent), placed directly after tier 1
+  tier 3  per-request content (query, retrieved context, history, scratchpad),
+          always last
+
+Azure OpenAI / OpenAI prompt caching reuses the longest previously seen prefix
+(for prompts of at least 1024 tokens), so anything dynamic that appears before
+static text, or any byte of drift in the static text (trailing whitespace, CRLF,
+a reformatted f-string), turns the rest of the prompt into a cache miss.
+
+Static text is normalized and registered once per call site; registering
+different text under the same site raises. Every assembled prompt is recorded,
+and prefix_report() gives each site's cacheable-prefix token ratio and how
+many distinct prefixes it produced (anything above 1 means the prefix drifted).
+"""
+
+import hashlib
+import textwrap
+import threading
+from functools import lru_cache
+
+# Prompts shorter than this are never served from the provider's prompt cache.
+MIN_CACHEABLE_TOKENS = 1024
+
+REACT_TEMPLATE = """Answer the following questions as best you can. You have access to the following tools:
+
+{tools}
+
+Use the following format:
+
+Question: the input question you must answer
+Thought: you should always think about what to do
+Action: the action to take, should be one of [{tool_names}]
+Action Input: the input to the action
+Observation: the result of the action
+... (this Thought/Action/Action Input/Observation can repeat N times)
+Thought: I now know the final answer
+Final Answer: the final answer to the original input question
+
+Begin!
+
+Question: {input}
+Thought:{agent_scratchpad}"""
+
+_static = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def normalize(text: str) -> str:
+    """Canonical bytes for static text: LF line endings, no indentation or trailing spaces."""
+    lines = textwrap.dedent(text.replace("\r\n", "\n")).strip("\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines)
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoder = _encoder()
+    return len(encoder.encode(text)) if encoder is not None else len(text) // 4
+
+
+def register(site: str, static: str) -> str:
+    """Register a call site's tier-1 text and return its canonical form."""
+    static = normalize(static)
+    with _lock:
+        existing = _static.setdefault(site, static)
+    if existing != static:
+        raise ValueError(f"Static prompt for '{site}' is already registered with different text")
+    return static
+
+
+def record(site: str, prefix: str, full_text: str):
+    digest = hashlib.sha1(prefix.encode("utf-8")).hexdigest()
+    prefix_tokens, total_tokens = count_tokens(prefix), count_tokens(full_text)
+    with _lock:
+        stats = _stats.setdefault(site, {"calls": 0, "prefix_tokens": 0, "total_tokens": 0, "variants": set()})
+        stats["calls"] += 1
+        stats["prefix_tokens"] += prefix_tokens
+        stats["total_tokens"] += total_tokens
+        stats["variants"].add(digest)
+
+
+def chat_messages(site: str, dynamic: list) -> list:
+    """[registered system prompt] + dynamic messages, recorded for the prefix report."""
+    from langchain_core.messages import SystemMessage
+
+    static = _static[site]
+    record(site, static, static + "".join(str(m.content) for m in dynamic))
+    return [SystemMessage(content=static)] + list(dynamic)
+
+
+@lru_cache(maxsize=None)
+def _stable_prompt_template():
+    # Defined on first use: subclassing PromptTemplate imports most of
+    # langchain_core, and importing this module (to register static prompts)
+    # should stay cheap.
+    from langchain_core.prompts import PromptTemplate
+
+    class StablePromptTemplate(PromptTemplate):
+        """PromptTemplate whose text before the first per-request variable is the cacheable prefix.
+
+        Partial variables (tier 2, e.g. ReAct tools) count as part of the prefix.
+        """
+
+        site: str
+
+        @classmethod
+        def for_site(cls, site: str, template: str) -> "StablePromptTemplate":
+            template = register(site, template)
+            base = PromptTemplate.from_template(template)
+            return cls(template=template, input_variables=base.input_variables, site=site)
+
+        def _prefix_template(self) -> str:
+            dynamic = [v for v in self.input_variables if v not in self.partial_variables]
+            positions = [self.template.find("{" + v + "}") for v in dynamic]
+            positions = [p for p in positions if p >= 0]
+            return self.template[:min(positions)] if positions else self.template
+
+        def format(self, **kwargs) -> str:
+            text = super().format(**kwargs)
+            variables = self._merge_partial_and_user_variables(**kwargs)
+            record(self.site, self._prefix_template().format(**variables), text)
+            return text
+
+    StablePromptTemplate.__qualname__ = "StablePromptTemplate"
+    return StablePromptTemplate
+
+
+def __getattr__(name: str):
+    if name == "StablePromptTemplate":
+        return _stable_prompt_template()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def react_prompt(site: str) -> "StablePromptTemplate":
+    """The shared ReAct template; create_react_agent fills {tools}/{tool_names} as tier 2."""
+    return _stable_prompt_template().for_site(site, REACT_TEMPLATE)
+
+
+def prefix_report() -> dict:
+    with _lock:
+        return {
+            site: {
+                "calls": s["calls"],
+                "avg_prefix_tokens": round(s["prefix_tokens"] / s["calls"]),
+                "avg_total_tokens": round(s["total_tokens"] / s["calls"]),
+                "cacheable_ratio": round(s["prefix_tokens"] / s["total_tokens"], 3) if s["total_tokens"] else 0.0,
+                "prefix_variants": len(s["variants"]),
+                "cache_eligible": s["total_tokens"] / s["calls"] >= MIN_CACHEABLE_TOKENS,
+            }
+            for site, s in _stats.items()
+        }
+
+
+def print_prefix_report():
+    report = prefix_report()
+    if not report:
+        return
+    print(f"\n{'call site':<20} {'calls':>6} {'prefix tok':>11} {'total tok':>10} {'cacheable':>10} {'variants':>9}  eligible")
+    for site, r in sorted(report.items()):
+        print(f"{site:<20} {r['calls']:>6} {r['avg_prefix_tokens']:>11} {r['avg_total_tokens']:>10} "
+              f"{r['cacheable_ratio']:>10.0%} {r['prefix_variants']:>9}  {'yes' if r['cache_eligible'] else 'no (<1024 tok)'}")
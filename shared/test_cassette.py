@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+from langchain_core.tools import Tool
+
+import cassette
+from cassette import Cassette, CassetteMiss, cassette_tools, find_regressions
+
+
+def test_record_then_replay_in_order(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    answers = iter(["first", "second"])
+    recorder = Cassette(path, "record")
+    assert recorder.call("llm", "k", lambda: next(answers)) == "first"
+    assert recorder.call("llm", "k", lambda: next(answers)) == "second"
+    assert asyncio.run(recorder.acall("http", "tools", lambda: asyncio.sleep(0, ["a"]))) == ["a"]
+    recorder.close()
+
+    player = Cassette(path, "replay")
+    never = lambda: pytest.fail("replay must not call upstream")
+    assert [player.call("llm", "k", never) for _ in range(3)] == ["first", "second", "second"]
+    assert asyncio.run(player.acall("http", "tools", never)) == ["a"]
+    with pytest.raises(CassetteMiss):
+        player.call("llm", "unknown", never)
+    assert player.stats()["replayed"] == 4
+
+
+def test_encode_and_decode(tmp_path):
+    path = str(tmp_path / "c.jsonl")
+    recorder = Cassette(path, "record")
+    recorder.call("llm", "k", lambda: {1, 2}, encode=sorted)
+    recorder.close()
+    assert Cassette(path, "replay").call("llm", "k", None, decode=set) == {1, 2}
+
+
+def test_unknown_mode():
+    with pytest.raises(ValueError):
+        Cassette("unused.jsonl", "rewind")
+
+
+def test_same_named_tools_are_keyed_by_description(tmp_path, monkeypatch):
+    path = str(tmp_path / "c.jsonl")
+
+    def tools():
+        return [Tool(name="ReadFile", description="IT docs", func=lambda q: f"it:{q}"),
+                Tool(name="ReadFile", description="Finance docs", func=lambda q: f"finance:{q}")]
+
+    monkeypatch.setenv("CASSETTE_MODE", "record")
+    monkeypatch.setattr(cassette, "_cassette", Cassette(path, "record"))
+    it, finance = cassette_tools(tools())
+    assert (finance.run("policy"), it.run("policy")) == ("finance:policy", "it:policy")
+    cassette._cassette.close()
+
+    monkeypatch.setenv("CASSETTE_MODE", "replay")
+    monkeypatch.setattr(cassette, "_cassette", Cassette(path, "replay"))
+    it, finance = cassette_tools([Tool(name=t.name, description=t.description, func=lambda q: pytest.fail("upstream"))
+                                  for t in tools()])
+    # Replayed in the opposite order from the recording.
+    assert (it.run("policy"), finance.run("policy")) == ("it:policy", "finance:policy")
+
+
+def test_find_regressions():
+    baseline = {"agent": {"overhead_ms_per_call": 2.0}, "tools": {"overhead_ms_per_call": 0.1}}
+    report = {"agent": {"overhead_ms_per_call": 3.0}, "tools": {"overhead_ms_per_call": 0.3},
+              "new_node": {"overhead_ms_per_call": 50.0}}
+    assert find_regressions(report, baseline) == ["agent: 2.00 -> 3.00 ms/call"]
+    assert find_regressions(report, baseline, tolerance=0.6) == []
@@ -0,0 +1,109 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from llm_cache import LLMResponseCache, cache_key, encode_result
+
+
+def chat_result(text, tokens=10):
+    return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text))],
+                      llm_output={"token_usage": {"total_tokens": tokens}})
+
+
+def text_of(result):
+    return result.generations[0].message.content
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return LLMResponseCache(path=str(tmp_path / "cache.sqlite3"))
+
+
+def test_cache_key_ignores_message_ids():
+    a = [HumanMessage(content="hi", id="1")]
+    b = [HumanMessage(content="hi", id="2")]
+    assert cache_key("gpt", a, "t=0") == cache_key("gpt", b, "t=0")
+    assert cache_key("gpt", a, "t=0") != cache_key("gpt", [HumanMessage(content="bye")], "t=0")
+
+
+def test_round_trip_clears_message_id(cache):
+    result = chat_result("answer")
+    result.generations[0].message.id = "run-1"
+    cache.set("k", result)
+    cached = cache.get("k")
+    assert text_of(cached) == "answer"
+    assert cached.generations[0].message.id is None
+    assert cache.hits == 1 and cache.saved_tokens == 10
+
+
+def test_evicts_least_recently_used(tmp_path):
+    entry_bytes = len(json.dumps(encode_result(chat_result("a")), default=str))
+    cache = LLMResponseCache(path=str(tmp_path / "cache.sqlite3"), max_bytes=entry_bytes)
+    cache.set("old", chat_result("a"))
+    cache.set("new", chat_result("b"))
+    assert cache.get("old") is None
+    assert text_of(cache.get("new")) == "b"
+
+
+def test_get_or_call_single_flight(cache):
+    calls = []
+    gate = threading.Event()
+
+    def call():
+        calls.append(1)
+        gate.wait(5)
+        return chat_result("answer")
+
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(cache.get_or_call, "k", call) for _ in range(4)]
+        while cache.coalesced < 3:
+            time.sleep(0.01)
+        gate.set()
+        assert [text_of(f.result()) for f in futures] == ["answer"] * 4
+    assert len(calls) == 1
+
+
+def test_aget_or_call_single_flight(cache):
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return chat_result("answer")
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_call("k", call) for _ in range(4)))
+
+    assert [text_of(r) for r in asyncio.run(main())] == ["answer"] * 4
+    assert len(calls) == 1
+    assert cache.coalesced == 3
+
+
+def test_followers_call_again_when_leader_is_cancelled(cache):
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return chat_result(f"answer {len(calls)}")
+
+    async def main():
+        leader = asyncio.ensure_future(cache.aget_or_call("k", call))
+        await asyncio.sleep(0)
+        followers = [asyncio.ensure_future(cache.aget_or_call("k", call)) for _ in range(2)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    results = asyncio.run(main())
+    # One follower took over as leader; the other coalesced onto it.
+    assert [text_of(r) for r in results] == ["answer 2", "answer 2"]
+    assert len(calls) == 2
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from llm_scheduler import LLMScheduler
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+
+def make_scheduler(**kwargs):
+    kwargs.setdefault("rpm", 100000)
+    kwargs.setdefault("tpm", 1e9)
+    kwargs.setdefault("base_delay", 0.0)
+    return LLMScheduler(**kwargs)
+
+
+async def wait_until(predicate, timeout=5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def test_acall_cancelled_mid_call_releases_slot():
+    scheduler = make_scheduler(initial_concurrency=4)
+
+    async def main():
+        tasks = [asyncio.ensure_future(scheduler.acall(lambda: asyncio.sleep(60))) for _ in range(4)]
+        await wait_until(lambda: scheduler.active == 4)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert scheduler.active == 0
+        assert await asyncio.wait_for(scheduler.acall(lambda: asyncio.sleep(0, "ok")), 5) == "ok"
+
+    asyncio.run(main())
+    assert scheduler.active == 0
+
+
+def test_acall_cancelled_while_queued_withdraws():
+    scheduler = make_scheduler(initial_concurrency=1)
+
+    async def main():
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+            return "held"
+
+        holder = asyncio.ensure_future(scheduler.acall(hold))
+        await wait_until(lambda: scheduler.active == 1)
+        queued = asyncio.ensure_future(scheduler.acall(lambda: asyncio.sleep(0, "queued")))
+        await wait_until(lambda: scheduler.queued == 1)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        await wait_until(lambda: scheduler.queued == 0)
+        release.set()
+        assert await holder == "held"
+        assert scheduler.active == 0
+        assert await asyncio.wait_for(scheduler.acall(lambda: asyncio.sleep(0, "next")), 5) == "next"
+
+    asyncio.run(main())
+    assert scheduler.active == 0
+
+
+async def chunks(n, delay=0.0):
+    for i in range(n):
+        await asyncio.sleep(delay)
+        yield i
+
+
+def test_astream_cancelled_while_queued_and_mid_stream():
+    scheduler = make_scheduler(initial_concurrency=1)
+
+    async def consume(delay):
+        return [c async for c in scheduler.astream(lambda: chunks(3, delay))]
+
+    async def main():
+        streaming = asyncio.ensure_future(consume(60))
+        await wait_until(lambda: scheduler.active == 1)
+        queued = asyncio.ensure_future(consume(0))
+        await wait_until(lambda: scheduler.queued == 1)
+        queued.cancel()
+        streaming.cancel()
+        await asyncio.gather(streaming, queued, return_exceptions=True)
+        await wait_until(lambda: scheduler.queued == 0 and scheduler.active == 0)
+        assert await asyncio.wait_for(consume(0), 5) == [0, 1, 2]
+
+    asyncio.run(main())
+    assert scheduler.active == 0
+
+
+def test_rate_limited_call_is_retried_and_halves_concurrency():
+    scheduler = make_scheduler(initial_concurrency=4)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise FakeRateLimitError()
+        return "ok"
+
+    assert scheduler.call(flaky) == "ok"
+    assert len(attempts) == 2
+    assert scheduler.stats["rate_limited"] == 1
+    assert scheduler.stats["retries"] == 1
+    assert scheduler.limit < 4
+    assert scheduler.active == 0
+
+
+def test_non_rate_limit_error_is_not_retried():
+    scheduler = make_scheduler()
+
+    def broken():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        scheduler.call(broken)
+    assert scheduler.stats["failed"] == 1
+    assert scheduler.active == 0
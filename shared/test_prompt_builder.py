@@ -0,0 +1,42 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from langchain_core.messages import HumanMessage, SystemMessage
+
+import prompt_builder
+
+
+def test_register_normalizes_and_rejects_drift():
+    assert prompt_builder.register("test_site", "  Be brief.  \r\n  Cite sources.\n") == "Be brief.\nCite sources."
+    assert prompt_builder.register("test_site", "Be brief.\nCite sources.") == "Be brief.\nCite sources."
+    with pytest.raises(ValueError):
+        prompt_builder.register("test_site", "Be verbose.")
+
+
+def test_chat_messages_puts_static_prompt_first_and_records_it():
+    prompt_builder.register("test_chat", "You answer IT questions.")
+    messages = prompt_builder.chat_messages("test_chat", [HumanMessage(content="vpn?")])
+    assert isinstance(messages[0], SystemMessage) and messages[0].content == "You answer IT questions."
+    assert messages[1].content == "vpn?"
+    assert prompt_builder.prefix_report()["test_chat"]["prefix_variants"] == 1
+
+
+def test_stable_prompt_template_records_prefix():
+    from prompt_builder import StablePromptTemplate
+
+    prompt = StablePromptTemplate.for_site("test_rag", "Use the context.\n{context}\nQ: {question}")
+    assert prompt_builder.StablePromptTemplate is StablePromptTemplate
+    assert prompt.format(context="c1", question="q1") == "Use the context.\nc1\nQ: q1"
+    prompt.format(context="c2", question="q2")
+    report = prompt_builder.prefix_report()["test_rag"]
+    assert report["calls"] == 2 and report["prefix_variants"] == 1
+    assert prompt_builder.react_prompt("test_react").site == "test_react"
+
+
+def test_import_does_not_load_langchain():
+    code = "import sys, prompt_builder; prompt_builder.register('s', 'x'); print('langchain_core' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(prompt_builder.__file__),
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "False"
@@ -0,0 +1,202 @@
+"""
+Concurrent batch evaluation of the RAG QA matrix.
+
+Runs every query in a file through each (retriever x LLM backend) pair, the
+way test_qa_chains does, but:
+
+  - retrieval happens once per (query, retriever) and the context is shared by
+    all backends, instead of every chain re-retrieving;
+  - LLM calls for all backends run at the same time, each backend with its own
+    bounded thread pool (Azure is limited by the shared scheduler, Ollama by
+    local GPU/CPU), at BATCH priority;
+  - answers, retrieval / LLM latencies and token counts go to a JSONL results
+    file, and a per-pair summary is printed at the end.
+
+The query file is plain text (one query per line, '#' comments) or JSONL with a
+"query" field.
+
+    python batch_eval.py queries.txt --output results.jsonl
+    python batch_eval.py queries.jsonl --backends azure hedged --concurrency azure=16 hedged=8
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# llm_scheduler, llm_cache, cassette and prompt_builder live in the repo-level shared/ directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
+from llm_scheduler import BATCH, llm_priority
+
+DEFAULT_CONCURRENCY = {"azure": 8, "ollama": 2, "hedged": 8}
+
+
+def load_queries(path: str) -> list:
+    """Distinct queries in file order.
+
+    Results are keyed by (query, retriever), so a repeated query would collapse
+    into one row; repeats are dropped with a warning instead.
+    """
+    queries, seen, duplicates = [], set(), []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            query = json.loads(line)["query"] if line.startswith("{") else line
+            if query in seen:
+                duplicates.append(query)
+                continue
+            seen.add(query)
+            queries.append(query)
+    if duplicates:
+        print(f"Warning: skipped {len(duplicates)} duplicate queries in {path}: {sorted(set(duplicates))}")
+    return queries
+
+
+def concurrency_spec(spec: str) -> tuple:
+    """argparse type for BACKEND=N."""
+    backend, sep, n = spec.partition("=")
+    if not sep or backend not in DEFAULT_CONCURRENCY:
+        raise argparse.ArgumentTypeError(
+            f"expected BACKEND=N with BACKEND in {sorted(DEFAULT_CONCURRENCY)}, got {spec!r}")
+    try:
+        workers = int(n)
+    except ValueError:
+        workers = 0
+    if workers < 1:
+        raise argparse.ArgumentTypeError(f"N must be a positive integer, got {spec!r}")
+    return backend, workers
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def token_counts(message) -> dict:
+    """Input/output token counts from an AIMessage, whichever way the provider reports them."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    if usage:
+        return {"input_tokens": usage.get("input_tokens", 0), "output_tokens": usage.get("output_tokens", 0)}
+    meta = getattr(message, "response_metadata", None) or {}
+    usage = meta.get("token_usage") or {}
+    return {
+        "input_tokens": usage.get("prompt_tokens", meta.get("prompt_eval_count", 0)),
+        "output_tokens": usage.get("completion_tokens", meta.get("eval_count", 0)),
+    }
+
+
+def retrieve_all(retrievers: dict, queries: list, max_workers: int = 8) -> dict:
+    """{(query, retriever name): (context, source list, retrieval ms)}, one retrieval each."""
+    def retrieve(name, query):
+        start = time.perf_counter()
+        docs = retrievers[name].invoke(query)
+        elapsed = (time.perf_counter() - start) * 1000
+        # Same context the "stuff" chain builds from the default document prompt.
+        context = "\n\n".join(doc.page_content for doc in docs)
+        return (query, name), (context, [doc.metadata.get("source") for doc in docs], elapsed)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(retrieve, name, q) for q in queries for name in retrievers]
+        return dict(f.result() for f in futures)
+
+
+def run_matrix(llms: dict, rag_prompt, contexts: dict, concurrency: dict, output_path: str) -> list:
+    """Run every (query, retriever) context through every backend; rows are written in query order."""
+    def answer(backend, key):
+        (query, retriever), (context, sources, retrieval_ms) = key, contexts[key]
+        row = {"query": query, "retriever": retriever, "backend": backend,
+               "retrieval_ms": round(retrieval_ms, 1), "sources": sources}
+        start = time.perf_counter()
+        try:
+            with llm_priority(BATCH):
+                response = llms[backend].invoke(rag_prompt.format(context=context, question=query))
+            row.update(answer=response.content, **token_counts(response))
+        except Exception as e:
+            row.update(answer=None, error=f"{type(e).__name__}: {e}", input_tokens=0, output_tokens=0)
+        row["llm_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return row
+
+    pools = {b: ThreadPoolExecutor(max_workers=concurrency.get(b, 4)) for b in llms}
+    try:
+        futures = [pools[b].submit(answer, b, key) for key in contexts for b in llms]
+        rows = []
+        with open(output_path, "w", encoding="utf-8") as out:
+            for done, future in enumerate(futures, 1):
+                row = future.result()
+                out.write(json.dumps(row) + "\n")
+                rows.append(row)
+                if done % 50 == 0 or done == len(futures):
+                    print(f"  {done}/{len(futures)} answers")
+        return rows
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+
+
+def print_summary(rows: list):
+    groups = {}
+    for row in rows:
+        groups.setdefault((row["backend"], row["retriever"]), []).append(row)
+    print(f"\n{'backend':<8} {'retriever':<9} {'n':>5} {'errors':>6} {'ret p50':>8} "
+          f"{'llm p50':>8} {'llm p95':>8} {'in tok':>9} {'out tok':>9}")
+    for (backend, retriever), group in sorted(groups.items()):
+        llm_ms = [r["llm_ms"] for r in group if r.get("answer") is not None]
+        print(f"{backend:<8} {retriever:<9} {len(group):>5} {sum('error' in r for r in group):>6} "
+              f"{_percentile([r['retrieval_ms'] for r in group], 50):>8.0f} "
+              f"{_percentile(llm_ms, 50):>8.0f} {_percentile(llm_ms, 95):>8.0f} "
+              f"{sum(r['input_tokens'] for r in group):>9} {sum(r['output_tokens'] for r in group):>9}")
+
+
+def main():
+    import rag
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("queries", help="query file (.txt, one per line, or .jsonl with a 'query' field)")
+    parser.add_argument("--output", default="eval_results.jsonl")
+    parser.add_argument("--backends", nargs="+", default=["azure", "ollama"], choices=["azure", "ollama", "hedged"])
+    parser.add_argument("--retrievers", nargs="+", default=["faiss", "chroma"], choices=["faiss", "chroma"])
+    parser.add_argument("--concurrency", nargs="*", default=[], type=concurrency_spec, metavar="BACKEND=N",
+                        help=f"parallel LLM calls per backend (default {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--retrieval-workers", type=int, default=8)
+    args = parser.parse_args()
+
+    concurrency = dict(DEFAULT_CONCURRENCY)
+    concurrency.update(args.concurrency)
+
+    queries = load_queries(args.queries)
+    print(f"Loaded {len(queries)} queries from {args.queries}")
+
+    doc = rag.deduplicate_chunks(rag.split_documents(rag.load_web_content()))
+    db1, db2 = rag.create_vector_stores(doc, rag.create_embeddings())
+    faiss_retriever, chroma_retriever = rag.create_retrievers(db1, db2)
+    retrievers = {"faiss": faiss_retriever, "chroma": chroma_retriever}
+    retrievers = {name: retrievers[name] for name in args.retrievers}
+
+    start = time.perf_counter()
+    contexts = retrieve_all(retrievers, queries, args.retrieval_workers)
+    print(f"Retrieved {len(contexts)} contexts in {time.perf_counter() - start:.1f}s")
+
+    llms = {}
+    if "azure" in args.backends or "hedged" in args.backends:
+        llms["azure"] = rag.create_azure_llm()
+    if "ollama" in args.backends or "hedged" in args.backends:
+        llms["ollama"] = rag.create_ollama_llm()
+    if "hedged" in args.backends:
+        llms["hedged"] = rag.create_hedged_llm(llms["azure"], llms["ollama"])
+    llms = {name: llms[name] for name in args.backends}
+
+    start = time.perf_counter()
+    rows = run_matrix(llms, rag.create_rag_prompt(), contexts, concurrency, args.output)
+    print(f"{len(rows)} answers in {time.perf_counter() - start:.1f}s -> {args.output}")
+    print_summary(rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark ChunkStore against a plain list of Documents.
+
+Builds a synthetic corpus shaped like the split web pages (--pages pages of
+--chunks-per-page chunks of ~--chunk-chars characters, each page's chunks
+sharing one metadata dict of source/title/doc_type/section) both ways and
+reports, per representation:
+
+  build MB     Python heap retained after construction (tracemalloc)
+  build s      construction time (includes generating the synthetic text)
+  scan s       one pass over all chunk texts (what dedup/hashing does)
+  random us    mean time to materialize one random chunk as a Document
+
+    python bench_chunk_store.py --pages 1000 --chunks-per-page 20
+"""
+
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+
+from langchain_core.documents import Document
+
+from chunk_store import ChunkStore
+
+
+def synthetic_pages(pages: int, chunks_per_page: int, chunk_chars: int, seed: int = 0):
+    """Yields (metadata, [chunk texts]) per page."""
+    rng = random.Random(seed)
+    # Scraped pages are mostly ASCII but not entirely (curly quotes, dashes);
+    # one such character makes CPython store the whole chunk str at 2 bytes/char.
+    words = [f"term{i}" for i in range(5000)] + ["\u2019s", "\u2014", "na\u00efve"]
+    sections = ["integrations", "concepts", "how_to", "tutorials", "api"]
+    for p in range(pages):
+        meta = {
+            "source": f"https://docs.example.com/oss/python/{sections[p % len(sections)]}/page-{p}",
+            "title": f"Page {p} | Example docs",
+            "language": "en",
+            "doc_type": "web",
+            "section": sections[p % len(sections)],
+        }
+        chunks = []
+        for _ in range(chunks_per_page):
+            text, length = [], 0
+            while length < chunk_chars:
+                text.append(rng.choice(words))
+                length += len(text[-1]) + 1
+            chunks.append(" ".join(text))
+        yield meta, chunks
+
+
+def build_documents(pages) -> list:
+    # Splitters copy the page metadata into every chunk, so each chunk has its own dict.
+    return [Document(page_content=text, metadata=dict(meta)) for meta, chunks in pages for text in chunks]
+
+
+def build_store(pages) -> ChunkStore:
+    store = ChunkStore()
+    for meta, chunks in pages:
+        for text in chunks:
+            store.add(text, dict(meta))
+    return store.compact()
+
+
+def measure(name: str, build, make_pages, texts, samples: int) -> dict:
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    # Pages are generated inside the trace so each representation owns its text.
+    obj = build(make_pages())
+    build_s = time.perf_counter() - start
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    total = sum(len(t) for t in texts(obj))
+    scan_s = time.perf_counter() - start
+
+    rng = random.Random(1)
+    idx = [rng.randrange(len(obj)) for _ in range(samples)]
+    start = time.perf_counter()
+    for i in idx:
+        obj[i]
+    random_us = (time.perf_counter() - start) / samples * 1e6
+    return {"name": name, "chunks": len(obj), "chars": total, "build_mb": retained / 1e6,
+            "build_s": build_s, "scan_s": scan_s, "random_us": random_us}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--chunks-per-page", type=int, default=20)
+    parser.add_argument("--chunk-chars", type=int, default=1500)
+    parser.add_argument("--samples", type=int, default=10000)
+    args = parser.parse_args()
+
+    def pages():
+        return synthetic_pages(args.pages, args.chunks_per_page, args.chunk_chars)
+
+    results = [
+        measure("list[Document]", build_documents, pages, lambda docs: (d.page_content for d in docs), args.samples),
+        measure("ChunkStore", build_store, pages, lambda store: store.texts(), args.samples),
+    ]
+
+    print(f"{'representation':<16} {'chunks':>8} {'build MB':>9} {'build s':>8} {'scan s':>7} {'random us':>10}")
+    for r in results:
+        print(f"{r['name']:<16} {r['chunks']:>8} {r['build_mb']:>9.1f} {r['build_s']:>8.2f} "
+              f"{r['scan_s']:>7.3f} {r['random_us']:>10.1f}")
+    baseline, compact = results
+    print(f"\nChunkStore retains {compact['build_mb'] / baseline['build_mb']:.0%} of the list's memory "
+          f"({baseline['build_mb'] - compact['build_mb']:.1f} MB saved for {compact['chunks']} chunks)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark compressed FAISS modes against the flat index.
+
+Reports index memory footprint, query latency (p50/p95) and recall@k relative
+to exact flat search, for flat, sq8 and ivfpq, each with and without exact
+re-ranking. Uses the vectors saved by rag.py (--vectors faiss_index/vectors.npy,
+or a flat faiss_index/index.faiss) or synthetic clustered vectors shaped like
+all-MiniLM-L6-v2 embeddings.
+
+    python bench_faiss_compression.py --n 50000 --k 6
+    python bench_faiss_compression.py --index faiss_index/index.faiss
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from faiss_compressed import build_index, index_nbytes
+
+
+def synthetic_vectors(n: int, dim: int, clusters: int = 64, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    vectors = centers[labels] + 0.35 * rng.normal(size=(n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def search(index, queries: np.ndarray, k: int, vectors: np.ndarray = None, rerank_factor: int = 1):
+    """Per-query search (as the retriever does); returns (ids, latencies_ms)."""
+    results, latencies = [], []
+    for q in queries:
+        q = q[None, :]
+        start = time.perf_counter()
+        _, ids = index.search(q, k * rerank_factor)
+        ids = ids[0][ids[0] >= 0]
+        if rerank_factor > 1:
+            ids = np.sort(ids)
+            distances = ((vectors[ids] - q) ** 2).sum(axis=1)
+            ids = ids[np.argsort(distances)[:k]]
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids[:k])
+    return results, np.array(latencies)
+
+
+def recall_at_k(results, truth) -> float:
+    hits = sum(len(set(r) & set(t)) for r, t in zip(results, truth))
+    return hits / sum(len(t) for t in truth)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", help="path to a .npy matrix of float32 vectors")
+    parser.add_argument("--index", help="path to a flat index.faiss to read vectors from")
+    parser.add_argument("--n", type=int, default=20000, help="synthetic corpus size")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--rerank-factor", type=int, default=4)
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+    elif args.index:
+        flat = faiss.read_index(args.index)
+        vectors = flat.reconstruct_n(0, flat.ntotal).astype(np.float32)
+    else:
+        vectors = synthetic_vectors(args.n, args.dim)
+
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+
+    flat = faiss.IndexFlatL2(vectors.shape[1])
+    flat.add(vectors)
+    truth, flat_lat = search(flat, queries, args.k)
+
+    rows = [("flat", index_nbytes(flat), flat_lat, 1.0, 0.0)]
+    for mode in ("sq8", "ivfpq"):
+        start = time.perf_counter()
+        index = build_index(vectors, mode)
+        build_s = time.perf_counter() - start
+        for rerank in (1, args.rerank_factor):
+            results, lat = search(index, queries, args.k, vectors, rerank)
+            label = mode if rerank == 1 else f"{mode}+rerank x{rerank}"
+            rows.append((label, index_nbytes(index), lat, recall_at_k(results, truth), build_s))
+
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+    print(f"{'mode':<20} {'index MB':>9} {'vs flat':>8} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9} {'build s':>8}")
+    flat_bytes = rows[0][1]
+    for label, nbytes, lat, recall, build_s in rows:
+        print(f"{label:<20} {nbytes / 1e6:>9.2f} {flat_bytes / nbytes:>7.1f}x "
+              f"{np.percentile(lat, 50):>8.3f} {np.percentile(lat, 95):>8.3f} {recall:>9.3f} {build_s:>8.2f}")
+    print("Re-ranked modes also read k x rerank-factor float32 rows per query from the memory-mapped vectors file.")
+
+
+if __name__ == "__main__":
+    main()
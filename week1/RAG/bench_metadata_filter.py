@@ -0,0 +1,132 @@
+"""
+Benchmark metadata pre-filtering against ANN search with post-filtering.
+
+Builds a flat FAISS store over synthetic clustered vectors tagged with a
+source (one of --sources), a year and a doc_type, then for filters of
+decreasing selectivity compares:
+
+  post-filter  ANN search for fetch_k candidates, then drop non-matching ones
+               (what FAISS.similarity_search(filter=...) does)
+  pre-filter   MetadataIndex resolves the filter to row ids first and only those
+               rows are scored (metadata_filter.filtered_search)
+
+reporting p50/p95 latency and recall@k against the exact filtered top-k.
+Selective filters are where post-filtering loses recall (few of the fetch_k
+neighbours match) and pre-filtering gets faster (few rows to score).
+
+    python bench_metadata_filter.py --n 50000 --sources 500
+"""
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from bench_faiss_compression import recall_at_k, synthetic_vectors
+from metadata_filter import MetadataIndex, _matches, filtered_search
+
+
+class QueryVectors(Embeddings):
+    """Returns the precomputed vector for each benchmark query string."""
+
+    def __init__(self, vectors: dict):
+        self.vectors = vectors
+
+    def embed_query(self, text: str) -> list:
+        return self.vectors[text]
+
+    def embed_documents(self, texts: list) -> list:
+        return [self.vectors[t] for t in texts]
+
+
+def build_store(vectors: np.ndarray, num_sources: int, seed: int = 0) -> FAISS:
+    rng = np.random.default_rng(seed)
+    index = faiss.IndexFlatL2(vectors.shape[1])
+    index.add(vectors)
+    docs, mapping = {}, {}
+    sources = rng.integers(0, num_sources, size=len(vectors))
+    years = rng.integers(2022, 2027, size=len(vectors))
+    for i in range(len(vectors)):
+        doc_id = str(i)
+        docs[doc_id] = Document(page_content=doc_id, metadata={
+            "source": f"doc_{sources[i]}.pdf",
+            "year": int(years[i]),
+            "doc_type": "pdf" if sources[i] % 2 else "web",
+        })
+        mapping[i] = doc_id
+    return FAISS(QueryVectors({}), index, InMemoryDocstore(docs), mapping)
+
+
+def exact_filtered(db: FAISS, vectors: np.ndarray, query: np.ndarray, filter: dict, k: int) -> list:
+    keep = [i for i, doc_id in db.index_to_docstore_id.items()
+            if all(_matches(db.docstore.search(doc_id).metadata.get(f), c) for f, c in filter.items())]
+    keep = np.asarray(keep)
+    distances = ((vectors[keep] - query) ** 2).sum(axis=1)
+    return list(keep[np.argsort(distances)[:k]])
+
+
+def run(db: FAISS, metadata_index: MetadataIndex, queries: dict, filter: dict, k: int, fetch_k: int, pre: bool):
+    results, latencies = [], []
+    predicate = lambda meta: all(_matches(meta.get(f), c) for f, c in filter.items())
+    for text, vector in queries.items():
+        start = time.perf_counter()
+        if pre:
+            docs = filtered_search(db, metadata_index, text, k=k, filter=filter, max_exact_fraction=1.0)
+        else:
+            docs = db.similarity_search_by_vector(vector, k=k, filter=predicate, fetch_k=fetch_k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([int(d.page_content) for d in docs])
+    return results, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--n", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--sources", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--fetch-k", type=int, default=20, help="candidates fetched before post-filtering")
+    args = parser.parse_args()
+
+    vectors = synthetic_vectors(args.n, args.dim)
+    db = build_store(vectors, args.sources)
+    start = time.perf_counter()
+    metadata_index = MetadataIndex(db)
+    print(f"{args.n} vectors x {args.dim} dims; metadata index built in {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(1)
+    picks = rng.choice(args.n, size=min(args.queries, args.n), replace=False)
+    noisy = vectors[picks] + 0.05 * rng.normal(size=(len(picks), args.dim)).astype(np.float32)
+    queries = {f"q{i}": v.tolist() for i, v in enumerate(noisy)}
+    db.embedding_function.vectors = queries
+
+    filters = [
+        {"doc_type": "pdf"},
+        {"year": 2026},
+        {"year": {"$gte": 2025}, "doc_type": "web"},
+        {"source": ["doc_1.pdf", "doc_2.pdf", "doc_3.pdf"]},
+        {"source": "doc_7.pdf"},
+        {"source": "doc_7.pdf", "year": 2026},
+    ]
+
+    print(f"{'filter':<48} {'rows':>7} {'mode':<12} {'p50 ms':>8} {'p95 ms':>8} {'recall@k':>9}")
+    for filter in filters:
+        rows = len(metadata_index.candidates(filter))
+        truth = [exact_filtered(db, vectors, np.asarray(v, dtype=np.float32), filter, args.k) for v in queries.values()]
+        for pre in (False, True):
+            results, lat = run(db, metadata_index, queries, filter, args.k, args.fetch_k, pre)
+            mode = "pre-filter" if pre else "post-filter"
+            print(f"{str(filter):<48} {rows:>7} {mode:<12} "
+                  f"{np.percentile(lat, 50):>8.3f} {np.percentile(lat, 95):>8.3f} {recall_at_k(results, truth):>9.3f}")
+    print("filtered_search picks pre-filtering automatically when a filter keeps "
+          "at most max_exact_fraction (default 20%) of the rows.")
+
+
+if __name__ == "__main__":
+    main()
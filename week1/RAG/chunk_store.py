@@ -0,0 +1,178 @@
+"""
+Compact, arena-backed storage for chunked corpora.
+
+A list of LangChain Documents costs a Python object, a str and a metadata dict
+per chunk, even though every chunk of a page carries identical metadata. The
+ChunkStore instead keeps:
+
+  - all chunk text UTF-8 encoded in one contiguous bytearray, addressed by
+    parallel offset / length arrays;
+  - one interned, immutable __slots__ record per distinct metadata dict, with
+    a per-chunk index into those records.
+
+Besides dropping the per-chunk object and dict overhead, UTF-8 is much smaller
+than CPython's str layout for mostly-ASCII text that contains a single curly
+quote or dash, which widens the whole str to 2 bytes per character.
+
+It is a read-only Sequence of Documents: indexing or iterating builds Document
+views on demand (each with its own metadata dict copy), so code that loops over
+chunks (FAISS.from_documents, Chroma.from_documents, corpus_manifest) works
+unchanged. Mutating a view does not change the store.
+"""
+
+import sys
+from array import array
+from collections.abc import Sequence
+
+
+class _Frozen(tuple):
+    """Hashable stand-in for a list or dict value; never equal to a plain tuple."""
+
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return type(self) is type(other) and tuple.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self).__name__, tuple.__hash__(self)))
+
+
+class _FrozenList(_Frozen):
+    __slots__ = ()
+
+
+class _FrozenDict(_Frozen):
+    __slots__ = ()
+
+
+def _freeze(value):
+    if isinstance(value, list):
+        return _FrozenList(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return _FrozenDict(sorted((sys.intern(k) if isinstance(k, str) else k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, _FrozenList):
+        return [_thaw(v) for v in value]
+    if isinstance(value, _FrozenDict):
+        return {k: _thaw(v) for k, v in value}
+    return value
+
+
+class ChunkMeta:
+    """Immutable metadata shared by every chunk that carries the same fields."""
+
+    __slots__ = ("items",)
+
+    def __init__(self, items: tuple):
+        self.items = items
+
+    def as_dict(self) -> dict:
+        """A new dict equal to the one stored, with its nested lists and dicts rebuilt."""
+        return {k: _thaw(v) for k, v in self.items}
+
+
+class ChunkStore(Sequence):
+    def __init__(self):
+        self._buf = bytearray()
+        self._offsets = array("Q")
+        self._lengths = array("I")
+        self._meta_ids = array("I")
+        self._meta = []
+        self._meta_index = {}
+
+    @classmethod
+    def from_documents(cls, docs) -> "ChunkStore":
+        store = cls()
+        store.extend(docs)
+        return store
+
+    def _intern_meta(self, metadata: dict) -> int:
+        key = tuple(_freeze(metadata))
+        meta_id = self._meta_index.get(key)
+        if meta_id is None:
+            meta_id = len(self._meta)
+            self._meta.append(ChunkMeta(key))
+            self._meta_index[key] = meta_id
+        return meta_id
+
+    def add(self, text: str, metadata: dict = None):
+        data = text.encode("utf-8")
+        if isinstance(self._buf, bytes):
+            self._buf = bytearray(self._buf)
+        self._offsets.append(len(self._buf))
+        self._lengths.append(len(data))
+        self._buf += data
+        self._meta_ids.append(self._intern_meta(metadata or {}))
+
+    def extend(self, docs):
+        for doc in docs:
+            self.add(doc.page_content, doc.metadata)
+
+    def compact(self) -> "ChunkStore":
+        """Drop the growth slack of the text buffer once the store is fully built."""
+        self._buf = bytes(self._buf)
+        return self
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def text(self, i: int) -> str:
+        start = self._offsets[i]
+        return self._buf[start:start + self._lengths[i]].decode("utf-8")
+
+    def metadata(self, i: int) -> dict:
+        return self._meta[self._meta_ids[i]].as_dict()
+
+    def document(self, i: int):
+        from langchain_core.documents import Document
+
+        return Document(page_content=self.text(i), metadata=self.metadata(i))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return self.select(range(*i.indices(len(self))))
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chunk index out of range")
+        return self.document(i)
+
+    def texts(self):
+        """Chunk texts in order, without building Documents."""
+        return (self.text(i) for i in range(len(self)))
+
+    def metadatas(self):
+        return (self.metadata(i) for i in range(len(self)))
+
+    def select(self, indices) -> "ChunkStore":
+        """A new compact store holding only the given chunks.
+
+        The immutable ChunkMeta records are shared, but the tables are copied so
+        adding to either store doesn't register metadata in the other.
+        """
+        out = ChunkStore()
+        out._meta, out._meta_index = list(self._meta), dict(self._meta_index)
+        for i in indices:
+            start, length = self._offsets[i], self._lengths[i]
+            out._offsets.append(len(out._buf))
+            out._lengths.append(length)
+            out._buf += self._buf[start:start + length]
+            out._meta_ids.append(self._meta_ids[i])
+        return out.compact()
+
+    def nbytes(self) -> int:
+        """Approximate footprint of the store's own buffers (excluding shared interned strings)."""
+        arrays = sum(a.itemsize * len(a) for a in (self._offsets, self._lengths, self._meta_ids))
+        records = sum(sys.getsizeof(m) + sys.getsizeof(m.items) for m in self._meta)
+        return len(self._buf) + arrays + records
+
+    def __repr__(self) -> str:
+        return f"ChunkStore({len(self)} chunks, {len(self._meta)} metadata records, {self.nbytes() / 1e6:.1f} MB)"
@@ -0,0 +1,135 @@
+"""
+Near-duplicate chunk removal with MinHash + LSH.
+
+Each chunk is reduced to a set of word shingles and a MinHash signature.
+Signatures are split into LSH bands so that only chunks sharing a band bucket
+are compared; a chunk is dropped when its estimated Jaccard similarity with an
+already-kept chunk reaches the threshold. The first occurrence is kept.
+"""
+
+import hashlib
+import random
+import re
+import struct
+from collections import defaultdict
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text: str, size: int = 5) -> set:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash(shingle: str) -> int:
+    return struct.unpack("<I", hashlib.blake2b(shingle.encode("utf-8"), digest_size=4).digest())[0]
+
+
+def optimal_bands(threshold: float, num_perm: int) -> tuple:
+    """Pick (bands, rows) whose LSH S-curve threshold (1/b)^(1/r) is closest to `threshold`."""
+    best = None
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class MinHashDeduplicator:
+    """Streaming near-duplicate filter; call is_duplicate(text) for each chunk in order."""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, shingle_size: int = 5, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = random.Random(seed)
+        self._perms = [(rng.randint(1, MERSENNE_PRIME - 1), rng.randint(0, MERSENNE_PRIME - 1)) for _ in range(num_perm)]
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        self._buckets = [defaultdict(list) for _ in range(self.bands)]
+        self._signatures = []
+        self.seen = 0
+        self.removed = 0
+        self.chars_seen = 0
+        self.chars_removed = 0
+
+    def signature(self, text: str) -> tuple:
+        hashes = [_hash(s) for s in shingles(text, self.shingle_size)] or [0]
+        return tuple(
+            min(((a * h + b) % MERSENNE_PRIME) & MAX_HASH for h in hashes)
+            for a, b in self._perms
+        )
+
+    def similarity(self, sig1: tuple, sig2: tuple) -> float:
+        """Estimated Jaccard similarity from two signatures."""
+        return sum(x == y for x, y in zip(sig1, sig2)) / self.num_perm
+
+    def is_duplicate(self, text: str) -> bool:
+        """Return True if text near-duplicates an earlier chunk; otherwise index it."""
+        self.seen += 1
+        self.chars_seen += len(text)
+        sig = self.signature(text)
+        band_keys = [sig[i * self.rows:(i + 1) * self.rows] for i in range(self.bands)]
+
+        candidates = set()
+        for band, key in zip(self._buckets, band_keys):
+            candidates.update(band.get(key, ()))
+        for idx in candidates:
+            if self.similarity(sig, self._signatures[idx]) >= self.threshold:
+                self.removed += 1
+                self.chars_removed += len(text)
+                return True
+
+        idx = len(self._signatures)
+        self._signatures.append(sig)
+        for band, key in zip(self._buckets, band_keys):
+            band[key].append(idx)
+        return False
+
+    def report(self) -> dict:
+        return {
+            "chunks_in": self.seen,
+            "chunks_removed": self.removed,
+            "chunks_kept": self.seen - self.removed,
+            "chars_removed_pct": round(100 * self.chars_removed / self.chars_seen, 1) if self.chars_seen else 0.0,
+            "threshold": self.threshold,
+            "bands_x_rows": f"{self.bands}x{self.rows}",
+        }
+
+
+def deduplicate_documents(docs: list, threshold: float = 0.8, num_perm: int = 64) -> tuple:
+    """Drop near-duplicate Documents; returns (kept_docs, report).
+
+    A ChunkStore stays a ChunkStore: texts are read without building Documents.
+    """
+    dedup = MinHashDeduplicator(threshold=threshold, num_perm=num_perm)
+    if hasattr(docs, "select"):
+        keep = [i for i, text in enumerate(docs.texts()) if not dedup.is_duplicate(text)]
+        return docs.select(keep), dedup.report()
+    kept = [doc for doc in docs if not dedup.is_duplicate(doc.page_content)]
+    return kept, dedup.report()
+
+
+if __name__ == "__main__":
+    import time
+
+    boilerplate = "LangChain documentation. Skip to main content. Search the docs. Ask AI. GitHub. Forum. " * 3
+    topics = ["vector stores", "retrievers", "chat models", "agents", "prompts", "memory", "tools", "streaming"]
+    texts = []
+    for topic in topics:
+        body = f"This page explains {topic} in LangChain with examples of how to configure and use {topic} in an application. "
+        texts.append(boilerplate + body * 4)
+        # Overlapping split of the same page: shifted window with a small edit.
+        texts.append(boilerplate + body * 4 + "See also the API reference.")
+    texts += [boilerplate] * 5
+
+    start = time.perf_counter()
+    dedup = MinHashDeduplicator(threshold=0.8)
+    kept = [t for t in texts if not dedup.is_duplicate(t)]
+    elapsed = time.perf_counter() - start
+    print(f"{dedup.report()} in {elapsed * 1000:.1f} ms")
@@ -0,0 +1,116 @@
+"""
+Compressed FAISS index with exact re-ranking.
+
+The searchable index holds only compressed codes: scalar 8-bit quantization
+("sq8", 4x smaller than float32) or IVF + product quantization ("ivfpq",
+typically 16-64x smaller). The full float32 vectors are written to a .npy file
+and memory-mapped; a query fetches `rerank_factor * k` candidates from the
+compressed index (at least `fetch_k` when filtering, dropping the ones the
+filter rejects) and re-scores just those rows exactly, so recall stays close
+to the flat index while resident memory is dominated by the compressed codes.
+"""
+
+import math
+
+import faiss
+import numpy as np
+from langchain_community.vectorstores import FAISS
+
+INDEX_MODES = ("flat", "sq8", "ivfpq")
+
+
+def build_index(vectors: np.ndarray, mode: str, pq_m: int = None, pq_nbits: int = 8,
+                nlist: int = None, nprobe: int = 8):
+    """Train and fill a compressed L2 index over `vectors` (float32, shape [n, d])."""
+    n, dim = vectors.shape
+    if mode == "ivfpq" and n < 256 * 4:
+        # PQ codebooks need a few hundred training points per centroid set.
+        print(f"Only {n} vectors; too few to train IVF-PQ, using sq8 instead")
+        mode = "sq8"
+
+    if mode == "sq8":
+        index = faiss.IndexScalarQuantizer(dim, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    elif mode == "ivfpq":
+        nlist = nlist or max(1, min(int(4 * math.sqrt(n)), n // 39))
+        pq_m = pq_m or next(m for m in (48, 32, 24, 16, 12, 8, 4, 2, 1) if dim % m == 0)
+        quantizer = faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFPQ(quantizer, dim, nlist, pq_m, pq_nbits)
+        index.nprobe = min(nprobe, nlist)
+    else:
+        raise ValueError(f"Unknown compressed index mode {mode!r}; expected 'sq8' or 'ivfpq'")
+
+    index.train(vectors)
+    index.add(vectors)
+    return index
+
+
+def index_nbytes(index) -> int:
+    """Serialized size of an index, a close proxy for its resident memory."""
+    return faiss.serialize_index(index).nbytes
+
+
+class CompressedFAISS(FAISS):
+    """FAISS vectorstore that searches compressed codes and re-ranks exactly.
+
+    `exact_vectors` is the memory-mapped float32 matrix aligned with the index
+    ids; when it is None, results come straight from the compressed index.
+    """
+
+    exact_vectors = None
+    rerank_factor = 4
+
+    def similarity_search_with_score_by_vector(self, embedding, k: int = 4, filter=None, fetch_k: int = 20, **kwargs):
+        if self.exact_vectors is None:
+            return super().similarity_search_with_score_by_vector(embedding, k=k, filter=filter, fetch_k=fetch_k, **kwargs)
+
+        query = np.asarray([embedding], dtype=np.float32)
+        if self._normalize_L2:
+            faiss.normalize_L2(query)
+        candidates = max(k * self.rerank_factor, k)
+        if filter is not None:
+            # Like FAISS.similarity_search, filter fetch_k candidates, then re-rank the survivors.
+            candidates = max(candidates, fetch_k)
+        _, ids = self.index.search(query, candidates)
+        ids = np.sort(ids[0][ids[0] >= 0])
+        docs = {int(i): self.docstore.search(self.index_to_docstore_id[int(i)]) for i in ids}
+        if filter is not None:
+            matches = self._create_filter_func(filter)
+            ids = np.asarray([i for i in ids if matches(docs[int(i)].metadata)], dtype=np.int64)
+        if len(ids) == 0:
+            return []
+
+        # Fancy indexing on the memmap reads only the candidate rows from disk.
+        exact = np.asarray(self.exact_vectors[ids])
+        distances = ((exact - query) ** 2).sum(axis=1)
+        order = np.argsort(distances)[:k]
+        score_threshold = kwargs.get("score_threshold")
+        return [
+            (docs[int(ids[i])], float(distances[i]))
+            for i in order
+            if score_threshold is None or distances[i] <= score_threshold
+        ]
+
+
+def attach_exact_vectors(db: FAISS, vectors_path: str, rerank_factor: int = 4) -> CompressedFAISS:
+    """Wrap a loaded store as CompressedFAISS backed by memory-mapped exact vectors."""
+    compressed = CompressedFAISS(
+        embedding_function=db.embedding_function,
+        index=db.index,
+        docstore=db.docstore,
+        index_to_docstore_id=db.index_to_docstore_id,
+    )
+    compressed.exact_vectors = np.load(vectors_path, mmap_mode="r")
+    compressed.rerank_factor = rerank_factor
+    return compressed
+
+
+def compress_store(db: FAISS, mode: str, vectors_path: str, rerank_factor: int = 4, **params) -> CompressedFAISS:
+    """Replace a flat store's index with a compressed one; exact vectors go to vectors_path."""
+    vectors = db.index.reconstruct_n(0, db.index.ntotal).astype(np.float32)
+    np.save(vectors_path, vectors)
+    index = build_index(vectors, mode, **params)
+    print(f"Compressed FAISS index ({mode}): {index_nbytes(db.index) / 1e6:.2f} MB -> {index_nbytes(index) / 1e6:.2f} MB")
+    del vectors
+
+    db.index = index
+    return attach_exact_vectors(db, vectors_path, rerank_factor)
@@ -0,0 +1,84 @@
+"""
+On-disk FAISS index with a corpus manifest.
+
+The index is saved next to a manifest describing the corpus it was built from
+(embedding model, chunk count, and a hash of every chunk's text and metadata).
+On startup the index is reused only if the manifest matches the current corpus,
+and the vectors are memory-mapped rather than read into private memory, so
+several worker processes can share one copy through the OS page cache.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+
+import faiss
+from langchain_community.vectorstores import FAISS
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.pkl"
+MANIFEST_FILE = "manifest.json"
+
+
+def corpus_manifest(docs: list, embedding_model: str, **extra) -> dict:
+    """Describe a chunked corpus; any change to the chunks changes the hash."""
+    digest = hashlib.sha256()
+    for doc in docs:
+        digest.update(doc.page_content.encode("utf-8"))
+        digest.update(json.dumps(doc.metadata, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\0")
+    return {
+        "embedding_model": embedding_model,
+        "num_chunks": len(docs),
+        "corpus_sha256": digest.hexdigest(),
+        **extra,
+    }
+
+
+def save_faiss(db: FAISS, directory: str, manifest: dict):
+    """Write index.faiss / index.pkl via save_local, then the manifest last."""
+    os.makedirs(directory, exist_ok=True)
+    db.save_local(directory)
+    # Writing the manifest last means a crash mid-save never looks like a valid index.
+    tmp_path = os.path.join(directory, MANIFEST_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST_FILE))
+
+
+def read_manifest(directory: str):
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def read_index(path: str, mmap: bool = True):
+    """Read a FAISS index, memory-mapping its vectors when this faiss build supports it."""
+    if mmap:
+        # IO_FLAG_MMAP_IFC maps flat vector codes in place (faiss >= 1.8);
+        # IO_FLAG_MMAP covers IVF inverted lists.
+        flag = getattr(faiss, "IO_FLAG_MMAP_IFC", None) or getattr(faiss, "IO_FLAG_MMAP", 0)
+        try:
+            return faiss.read_index(path, flag)
+        except RuntimeError:
+            pass
+    return faiss.read_index(path)
+
+
+def load_faiss(directory: str, embeddings, manifest: dict, mmap: bool = True):
+    """Load the saved store if its manifest matches; otherwise return None."""
+    if read_manifest(directory) != manifest:
+        return None
+
+    index = read_index(os.path.join(directory, INDEX_FILE), mmap=mmap)
+    with open(os.path.join(directory, DOCSTORE_FILE), "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=docstore,
+        index_to_docstore_id=index_to_docstore_id,
+    )
@@ -0,0 +1,241 @@
+"""
+Hedged routing between two chat model backends (e.g. Azure OpenAI and Ollama).
+
+A request is streamed from the primary backend. If no first token arrives
+within a deadline derived from the primary's recent p95 time-to-first-token,
+the same request is sent to the secondary backend as a hedge. Whichever backend
+finishes first wins and the other stream is cancelled. Backends that fail
+repeatedly are marked unhealthy for a cool-down period and skipped as primary.
+
+A stream cancelled before its first token still contributes a (censored) TTFT
+sample of the time it had waited, so the p95 reflects hedged-away slow requests.
+ScheduledAzureChatOpenAI streams through the rate-limit scheduler and the
+response cache, so hedged traffic keeps the same TPM/RPM budget and 429 handling.
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class BackendStats:
+    """Rolling latency window and health state for one backend."""
+
+    def __init__(self, window: int = 50, failure_threshold: int = 3, cooldown: float = 30.0):
+        self.ttft = deque(maxlen=window)
+        self.latency = deque(maxlen=window)
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.consecutive_failures = 0
+        self.unhealthy_until = 0.0
+        self.counts = {"requests": 0, "wins": 0, "failures": 0, "cancelled": 0, "hedges": 0}
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def record_success(self, ttft: float, latency: float):
+        self.ttft.append(ttft)
+        self.latency.append(latency)
+        self.consecutive_failures = 0
+
+    def record_censored(self, elapsed: float):
+        """A stream cancelled before its first token: its TTFT was at least `elapsed`.
+
+        Keeping these samples stops the slow tail of hedged-away requests from
+        disappearing from the p95 that sets the hedge delay.
+        """
+        self.ttft.append(elapsed)
+
+    def record_failure(self):
+        self.counts["failures"] += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold:
+            self.unhealthy_until = time.monotonic() + self.cooldown
+
+    def summary(self) -> dict:
+        result = dict(self.counts, healthy=self.healthy)
+        if self.ttft:
+            result["ttft_p50"] = round(percentile(self.ttft, 50), 3)
+            result["ttft_p95"] = round(percentile(self.ttft, 95), 3)
+            result["latency_p95"] = round(percentile(self.latency, 95), 3)
+        return result
+
+
+class HedgedRouter:
+    """Route requests to a primary backend and hedge to a secondary on a slow first token.
+
+    Backends are (name, model) pairs where model supports LangChain's
+    `astream(messages)`.
+    """
+
+    def __init__(self, primary, secondary, initial_hedge_delay: float = 2.0,
+                 min_hedge_delay: float = 0.05, max_hedge_delay: float = 10.0, min_samples: int = 5):
+        self.backends = [primary, secondary]
+        self.stats = {name: BackendStats() for name, _ in self.backends}
+        self.initial_hedge_delay = initial_hedge_delay
+        self.min_hedge_delay = min_hedge_delay
+        self.max_hedge_delay = max_hedge_delay
+        self.min_samples = min_samples
+
+    def hedge_delay(self, name: str) -> float:
+        """p95 time-to-first-token of the backend, clamped; a fixed default until warmed up."""
+        samples = self.stats[name].ttft
+        if len(samples) < self.min_samples:
+            return self.initial_hedge_delay
+        return min(self.max_hedge_delay, max(self.min_hedge_delay, percentile(samples, 95)))
+
+    def _ordered_backends(self) -> list:
+        healthy = [b for b in self.backends if self.stats[b[0]].healthy]
+        unhealthy = [b for b in self.backends if not self.stats[b[0]].healthy]
+        return healthy + unhealthy
+
+    async def _stream(self, backend, messages, first_token: asyncio.Event) -> str:
+        name, model = backend
+        stats = self.stats[name]
+        stats.counts["requests"] += 1
+        start = time.monotonic()
+        ttft = None
+        parts = []
+        try:
+            async for chunk in model.astream(messages):
+                if ttft is None:
+                    ttft = time.monotonic() - start
+                    first_token.set()
+                parts.append(chunk.content if hasattr(chunk, "content") else str(chunk))
+        except asyncio.CancelledError:
+            stats.counts["cancelled"] += 1
+            if ttft is None:
+                stats.record_censored(time.monotonic() - start)
+            raise
+        except Exception:
+            stats.record_failure()
+            raise
+        latency = time.monotonic() - start
+        stats.record_success(ttft if ttft is not None else latency, latency)
+        return "".join(parts)
+
+    async def ainvoke(self, messages) -> tuple:
+        """Return (answer_text, backend_name)."""
+        primary, secondary = self._ordered_backends()
+        first_token = asyncio.Event()
+        tasks = {asyncio.create_task(self._stream(primary, messages, first_token)): primary[0]}
+
+        waiter = asyncio.create_task(first_token.wait())
+        done, _ = await asyncio.wait(
+            set(tasks) | {waiter}, timeout=self.hedge_delay(primary[0]), return_when=asyncio.FIRST_COMPLETED
+        )
+        waiter.cancel()
+
+        primary_task = next(iter(tasks))
+        primary_ok = primary_task in done and primary_task.exception() is None
+        if not first_token.is_set() and not primary_ok:
+            # Slow or failed primary: send the hedge.
+            self.stats[secondary[0]].counts["hedges"] += 1
+            tasks[asyncio.create_task(self._stream(secondary, messages, asyncio.Event()))] = secondary[0]
+
+        pending = set(tasks)
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        name = tasks[task]
+                        self.stats[name].counts["wins"] += 1
+                        return task.result(), name
+                    last_error = task.exception()
+                if not pending and secondary[0] not in tasks.values():
+                    # Primary streamed a token but then failed; fall back to the secondary.
+                    self.stats[secondary[0]].counts["hedges"] += 1
+                    fallback = asyncio.create_task(self._stream(secondary, messages, asyncio.Event()))
+                    tasks[fallback] = secondary[0]
+                    pending = {fallback}
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        raise last_error
+
+    def invoke(self, messages) -> tuple:
+        return asyncio.run(self.ainvoke(messages))
+
+    def summary(self) -> dict:
+        return {name: stats.summary() for name, stats in self.stats.items()}
+
+
+class HedgedChatModel(BaseChatModel):
+    """Chat model wrapper so a HedgedRouter can be used anywhere an LLM is expected."""
+
+    router: Any
+
+    @property
+    def _llm_type(self) -> str:
+        return "hedged-router"
+
+    def _generate(self, messages: List, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        text, backend = self.router.invoke(messages)
+        return self._result(text, backend)
+
+    async def _agenerate(self, messages: List, stop: Optional[List[str]] = None, run_manager=None, **kwargs) -> ChatResult:
+        text, backend = await self.router.ainvoke(messages)
+        return self._result(text, backend)
+
+    @staticmethod
+    def _result(text: str, backend: str) -> ChatResult:
+        message = AIMessage(content=text, response_metadata={"backend": backend})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+if __name__ == "__main__":
+    import random
+
+    class MockBackend:
+        """Local stand-in for a streaming chat model with a configurable latency profile."""
+
+        def __init__(self, name: str, ttft: float, slow_ttft: float = None, slow_rate: float = 0.0, fail_rate: float = 0.0):
+            self.name = name
+            self.ttft = ttft
+            self.slow_ttft = slow_ttft
+            self.slow_rate = slow_rate
+            self.fail_rate = fail_rate
+
+        async def astream(self, messages):
+            if random.random() < self.fail_rate:
+                raise RuntimeError(f"{self.name} unavailable")
+            slow = self.slow_ttft is not None and random.random() < self.slow_rate
+            await asyncio.sleep(self.slow_ttft if slow else self.ttft)
+            for word in f"answer from {self.name}".split():
+                yield AIMessage(content=word + " ")
+                await asyncio.sleep(0.002)
+
+    async def run(router, n):
+        latencies = []
+        for _ in range(n):
+            start = time.monotonic()
+            await router.ainvoke([])
+            latencies.append(time.monotonic() - start)
+        return latencies
+
+    random.seed(7)
+    azure = MockBackend("azure", ttft=0.02, slow_ttft=0.5, slow_rate=0.1)
+    ollama = MockBackend("ollama", ttft=0.06)
+
+    baseline = HedgedRouter(("azure", azure), ("ollama", ollama), initial_hedge_delay=60, min_samples=10**9)
+    hedged = HedgedRouter(("azure", azure), ("ollama", ollama), initial_hedge_delay=0.1)
+    for label, router in (("primary only", baseline), ("hedged", hedged)):
+        lat = asyncio.run(run(router, 200))
+        print(f"{label:12s}: p50 {percentile(lat, 50):.3f}s  p95 {percentile(lat, 95):.3f}s  p99 {percentile(lat, 99):.3f}s")
+    print(f"hedged backend stats: {hedged.summary()}")
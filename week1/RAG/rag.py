@@ -3,14 +3,39 @@ from langchain_community.document_loaders import WebBaseLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_community.vectorstores import FAISS, Chroma
-from langchain_openai import AzureChatOpenAI
 from langchain_community.chat_models import ChatOllama
-from langchain.prompts import PromptTemplate
 from langchain.chains import RetrievalQA
+import os
+import sys
 import bs4
 import requests
 from urllib.parse import urljoin, urlparse
 
+# llm_scheduler, llm_cache, cassette and prompt_builder live in the repo-level shared/ directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
+from llm_scheduler import BATCH, ScheduledAzureChatOpenAI, llm_priority
+from llm_cache import get_llm_cache
+from stage_profile import StageProfiler
+from prompt_builder import StablePromptTemplate, print_prefix_report
+from llm_router import HedgedChatModel, HedgedRouter
+from chunk_store import ChunkStore
+from dedup import deduplicate_documents
+from faiss_store import corpus_manifest, load_faiss, save_faiss
+from faiss_compressed import attach_exact_vectors, compress_store
+from tune_hnsw import load_hnsw_settings
+from metadata_filter import FilteredFAISSRetriever, MetadataIndex, chroma_where, enrich_metadata
+
+# Chunks whose estimated Jaccard similarity with an earlier chunk reaches this are dropped.
+DEDUP_THRESHOLD = 0.8
+
+EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+FAISS_INDEX_DIR = "./faiss_index"
+# "flat" keeps full float32 vectors in the index; "sq8" or "ivfpq" store compressed
+# codes and re-rank candidates exactly from memory-mapped vectors.
+FAISS_INDEX_MODE = os.getenv("FAISS_INDEX_MODE", "flat")
+FAISS_VECTORS_PATH = os.path.join(FAISS_INDEX_DIR, "vectors.npy")
+
 def load_web_content():
     """Load content from specific LangChain documentation pages"""
     print("Loading web content...")
@@ -84,18 +109,34 @@ def split_documents(webcontent):
         chunk_overlap=300,
         separators=["\n\n", "\n", ". ", " ", ""]
     )
-    doc = text_splitter.split_documents(webcontent)
-    print(f"Split into {len(doc)} chunks")
-    
-    doc = [chunk for chunk in doc if len(chunk.page_content.strip()) > 50]
-    print(f"After filtering short chunks: {len(doc)} meaningful chunks")
+    # Split page by page straight into the compact store, so the full list of
+    # chunk Documents never exists at once.
+    doc = ChunkStore()
+    total = 0
+    for page in webcontent:
+        chunks = text_splitter.split_documents([page])
+        total += len(chunks)
+        chunks = [chunk for chunk in chunks if len(chunk.page_content.strip()) > 50]
+        # doc_type / section / year tags make chunks filterable at retrieval time
+        doc.extend(enrich_metadata(chunks))
+    print(f"Split into {total} chunks")
+    doc.compact()
+    print(f"After filtering short chunks: {len(doc)} meaningful chunks ({doc!r})")
+    return doc
+
+def deduplicate_chunks(doc, threshold=DEDUP_THRESHOLD):
+    """Remove near-duplicate chunks (shared boilerplate, split overlap) before embedding"""
+    print("Removing near-duplicate chunks...")
+    doc, report = deduplicate_documents(doc, threshold=threshold)
+    print(f"Dedup removed {report['chunks_removed']} of {report['chunks_in']} chunks "
+          f"({report['chars_removed_pct']}% of text) at threshold {threshold}")
     return doc
 
 def create_embeddings():
     """Create embeddings using HuggingFace model"""
     print("Creating embeddings...")
     embeddings = HuggingFaceEmbeddings(
-        model_name="sentence-transformers/all-MiniLM-L6-v2"
+        model_name=EMBEDDING_MODEL
     )
     return embeddings
 
@@ -107,38 +148,57 @@ def create_vector_stores(doc, embeddings):
         print("No documents to create vector stores with!")
         return None, None
         
-    print(f"Creating FAISS index with {len(doc)} documents...")
-    db1 = FAISS.from_documents(
-        documents=doc,
-        embedding=embeddings
-    )
+    manifest = corpus_manifest(doc, EMBEDDING_MODEL, index_mode=FAISS_INDEX_MODE)
+    db1 = load_faiss(FAISS_INDEX_DIR, embeddings, manifest)
+    if db1 is not None:
+        print(f"Loaded memory-mapped FAISS index from {FAISS_INDEX_DIR} (manifest matches {len(doc)} chunks)")
+        if FAISS_INDEX_MODE != "flat":
+            db1 = attach_exact_vectors(db1, FAISS_VECTORS_PATH)
+    else:
+        print(f"Creating FAISS index with {len(doc)} documents...")
+        db1 = FAISS.from_documents(
+            documents=doc,
+            embedding=embeddings
+        )
+        if FAISS_INDEX_MODE != "flat":
+            os.makedirs(FAISS_INDEX_DIR, exist_ok=True)
+            db1 = compress_store(db1, FAISS_INDEX_MODE, FAISS_VECTORS_PATH)
+        save_faiss(db1, FAISS_INDEX_DIR, manifest)
+        print(f"Saved FAISS index to {FAISS_INDEX_DIR}")
     
     print(f"Creating Chroma index with {len(doc)} documents...")
     db2 = Chroma.from_documents(
         documents=doc,
         embedding=embeddings,
-        persist_directory="./chroma_db"
+        persist_directory="./chroma_db",
+        # HNSW settings chosen by tune_hnsw.py --apply; Chroma defaults otherwise.
+        collection_metadata=load_hnsw_settings("./chroma_db") or None
     )
     db2.persist()
     
     print("Vector stores created successfully")
     return db1, db2
 
-def create_retrievers(db1, db2):
-    """Create retrievers from vector stores"""
+def create_retrievers(db1, db2, filter=None):
+    """Create retrievers from vector stores
+
+    `filter` (e.g. {"section": "integrations"} or {"year": {"$gte": 2025}})
+    restricts both retrievers to matching chunks before similarity scoring.
+    """
     print("Creating retrievers...")
     
-    retriever1 = db1.as_retriever(
-        search_type="similarity",
-        search_kwargs={
-            "k": 6,
-        }
+    retriever1 = FilteredFAISSRetriever(
+        db=db1,
+        metadata_index=MetadataIndex(db1),
+        k=6,
+        filter=filter,
     )
     
     retriever2 = db2.as_retriever(
         search_type="similarity", 
         search_kwargs={
             "k": 6,
+            "filter": chroma_where(filter),
         }
     )
     
@@ -170,7 +230,7 @@ def test_retrievers(retriever1, retriever2):
 def create_azure_llm():
     """Create Azure OpenAI LLM"""
     print("Setting up Azure OpenAI LLM...")
-    llm = AzureChatOpenAI(
+    llm = ScheduledAzureChatOpenAI(
         azure_deployment="gpt-4.1",  
         api_version="2024-12-01-preview",
         temperature=0,
@@ -188,11 +248,18 @@ def create_ollama_llm():
     )
     return llm
 
+def create_hedged_llm(azure_llm, ollama_llm):
+    """Create an LLM that hedges slow Azure requests to Ollama"""
+    print("Setting up hedged Azure/Ollama router...")
+    router = HedgedRouter(("azure", azure_llm), ("ollama", ollama_llm))
+    return HedgedChatModel(router=router)
+
 def create_rag_prompt():
     """Create the RAG prompt template"""
-    rag_prompt = PromptTemplate(
-        input_variables=["context", "question"],
-        template="""You are a helpful assistant that answers questions about LangChain and related technologies using the provided context.
+    # Static instructions first so the prefix is byte-identical across queries.
+    rag_prompt = StablePromptTemplate.for_site(
+        "rag_qa",
+        """You are a helpful assistant that answers questions about LangChain and related technologies using the provided context.
 
 Use the following context to answer the question. If you can find relevant information in the context, provide a comprehensive answer. If the information is not available in the context, then say "I don't know based on the provided context."
 
@@ -238,29 +305,41 @@ def test_qa_chains(qa_chain1, qa_chain2, llm_name):
         "What are the main components of LangChain?"     
     ]
     
-    for query in queries:
-        print(f"\nQuery: {query}")
-        
-        print("FAISS Retriever Result:")
-        result1 = qa_chain1(query)
-        print("Answer:", result1["result"])
-        
-        print("Chroma Retriever Result:")
-        result2 = qa_chain2(query)
-        print("Answer:", result2["result"])
+    # Evaluation traffic yields to interactive calls in the shared LLM scheduler.
+    with llm_priority(BATCH):
+        for query in queries:
+            print(f"\nQuery: {query}")
+            
+            print("FAISS Retriever Result:")
+            result1 = qa_chain1(query)
+            print("Answer:", result1["result"])
+            
+            print("Chroma Retriever Result:")
+            result2 = qa_chain2(query)
+            print("Answer:", result2["result"])
 
-def main():
+def main(profile=False, profile_dir="./profile"):
     print("Starting RAG Pipeline...")
+    profiler = StageProfiler(enabled=profile, output_dir=profile_dir)
     
-    webcontent = load_web_content()
-    doc = split_documents(webcontent)
+    with profiler.stage("load web content"):
+        webcontent = load_web_content()
+    with profiler.stage("split"):
+        doc = split_documents(webcontent)
+    with profiler.stage("dedup"):
+        doc = deduplicate_chunks(doc)
     
-    embeddings = create_embeddings()
-    db1, db2 = create_vector_stores(doc, embeddings)
+    with profiler.stage("load embedding model"):
+        embeddings = create_embeddings()
+    # Embedding the chunks happens here, together with FAISS/Chroma indexing
+    with profiler.stage("embed + index"):
+        db1, db2 = create_vector_stores(doc, embeddings)
     
-    retriever1, retriever2 = create_retrievers(db1, db2)
+    with profiler.stage("create retrievers"):
+        retriever1, retriever2 = create_retrievers(db1, db2)
     
-    test_retrievers(retriever1, retriever2)
+    with profiler.stage("test retrievers"):
+        test_retrievers(retriever1, retriever2)
     
     rag_prompt = create_rag_prompt()
     
@@ -268,18 +347,41 @@ def main():
     print("TESTING WITH AZURE OPENAI")
     print("="*50)
     
-    azure_llm = create_azure_llm()
-    azure_qa_chain1, azure_qa_chain2 = create_qa_chains(azure_llm, retriever1, retriever2, rag_prompt)
-    test_qa_chains(azure_qa_chain1, azure_qa_chain2, "Azure OpenAI")
+    with profiler.stage("query: azure"):
+        azure_llm = create_azure_llm()
+        azure_qa_chain1, azure_qa_chain2 = create_qa_chains(azure_llm, retriever1, retriever2, rag_prompt)
+        test_qa_chains(azure_qa_chain1, azure_qa_chain2, "Azure OpenAI")
     
     print("\n" + "="*50)
     print("TESTING WITH OLLAMA")
     print("="*50)
     
-    ollama_llm = create_ollama_llm()
-    ollama_qa_chain1, ollama_qa_chain2 = create_qa_chains(ollama_llm, retriever1, retriever2, rag_prompt)
-    test_qa_chains(ollama_qa_chain1, ollama_qa_chain2, "Ollama")
+    with profiler.stage("query: ollama"):
+        ollama_llm = create_ollama_llm()
+        ollama_qa_chain1, ollama_qa_chain2 = create_qa_chains(ollama_llm, retriever1, retriever2, rag_prompt)
+        test_qa_chains(ollama_qa_chain1, ollama_qa_chain2, "Ollama")
+    
+    print("\n" + "="*50)
+    print("TESTING WITH HEDGED AZURE -> OLLAMA ROUTER")
+    print("="*50)
+    
+    with profiler.stage("query: hedged"):
+        hedged_llm = create_hedged_llm(azure_llm, ollama_llm)
+        hedged_qa_chain1, hedged_qa_chain2 = create_qa_chains(hedged_llm, retriever1, retriever2, rag_prompt)
+        test_qa_chains(hedged_qa_chain1, hedged_qa_chain2, "Hedged Router")
+    print(f"Backend stats: {hedged_llm.router.summary()}")
+    if get_llm_cache() is not None:
+        print(f"LLM cache: {get_llm_cache().stats()}")
+    print_prefix_report()
+    profiler.report()
     print("\nRAG Pipeline completed successfully!")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile", action="store_true",
+                        help="Time each stage with cProfile and tracemalloc; write a summary and .prof dumps.")
+    parser.add_argument("--profile-dir", default="./profile")
+    args = parser.parse_args()
+    main(profile=args.profile, profile_dir=args.profile_dir)
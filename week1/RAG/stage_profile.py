@@ -0,0 +1,89 @@
+"""
+Per-stage profiling for pipeline runs.
+
+Wrap each stage in `with profiler.stage("name"):`. When enabled, every stage
+records wall-clock time, a cProfile capture and the tracemalloc peak; at the
+end `report()` prints a summary table and writes it, together with one
+`<stage>.prof` file per stage, to the output directory. The .prof files are
+standard pstats dumps: `snakeviz split.prof`, `flameprof embed.prof > embed.svg`,
+or `python -m pstats split.prof`.
+
+tracemalloc only sees allocations made through Python's allocator, so memory
+held by native libraries (torch tensors, FAISS/Chroma indexes) is undercounted.
+When disabled, `stage()` is a no-op.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+
+class StageProfiler:
+    def __init__(self, enabled: bool = False, output_dir: str = "./profile", top_functions: int = 3):
+        self.enabled = enabled
+        self.output_dir = output_dir
+        self.top_functions = top_functions
+        self.stages = []
+
+    @contextmanager
+    def stage(self, name: str):
+        if not self.enabled:
+            yield
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            dump = os.path.join(self.output_dir, f"{len(self.stages):02d}_{re.sub(r'[^a-z0-9]+', '_', name.lower())}.prof")
+            profile.dump_stats(dump)
+            self.stages.append({
+                "stage": name,
+                "wall_s": wall,
+                "peak_mb": peak / 1e6,
+                "hotspots": self._hotspots(profile),
+                "dump": dump,
+            })
+
+    def _hotspots(self, profile) -> str:
+        """Top functions by internal time, as 'file:line(func)' strings."""
+        stats = pstats.Stats(profile, stream=io.StringIO())
+        ranked = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+        return ", ".join(f"{os.path.basename(f)}:{line}({func})" for (f, line, func), _ in ranked[:self.top_functions])
+
+    def report(self) -> str:
+        """Print and save the per-stage summary table; returns its path (None when disabled)."""
+        if not self.enabled or not self.stages:
+            return None
+        total = sum(s["wall_s"] for s in self.stages) or 1.0
+        lines = [f"{'stage':<28} {'wall s':>8} {'share':>6} {'py peak MB':>11}  top functions (self time)"]
+        for s in self.stages:
+            lines.append(f"{s['stage']:<28} {s['wall_s']:>8.2f} {s['wall_s'] / total:>6.0%} "
+                         f"{s['peak_mb']:>11.1f}  {s['hotspots']}")
+        lines.append(f"{'total':<28} {total:>8.2f}")
+        table = "\n".join(lines)
+        print("\n" + table)
+
+        path = os.path.join(self.output_dir, "summary.txt")
+        with open(path, "w") as f:
+            f.write(table + "\n\nProfiler dumps:\n" + "\n".join(s["dump"] for s in self.stages) + "\n")
+        print(f"\nProfile summary and per-stage .prof dumps written to {self.output_dir}")
+        return path
@@ -0,0 +1,82 @@
+import argparse
+import json
+import threading
+
+import pytest
+from langchain_core.messages import AIMessage
+
+from batch_eval import _percentile, concurrency_spec, load_queries, run_matrix, token_counts
+
+
+def test_load_queries_text_and_jsonl(tmp_path, capsys):
+    txt = tmp_path / "q.txt"
+    txt.write_text("# comment\nWhat is FAISS?\n\nWhat is Chroma?\nWhat is FAISS?\n")
+    assert load_queries(str(txt)) == ["What is FAISS?", "What is Chroma?"]
+    assert "skipped 1 duplicate" in capsys.readouterr().out
+
+    jsonl = tmp_path / "q.jsonl"
+    jsonl.write_text(json.dumps({"query": "a", "id": 1}) + "\n" + json.dumps({"query": "b"}) + "\n")
+    assert load_queries(str(jsonl)) == ["a", "b"]
+    assert capsys.readouterr().out == ""
+
+
+def test_token_counts_from_usage_metadata_and_response_metadata():
+    azure = AIMessage(content="x", usage_metadata={"input_tokens": 12, "output_tokens": 3, "total_tokens": 15})
+    assert token_counts(azure) == {"input_tokens": 12, "output_tokens": 3}
+    openai_style = AIMessage(content="x", response_metadata={"token_usage": {"prompt_tokens": 7, "completion_tokens": 2}})
+    assert token_counts(openai_style) == {"input_tokens": 7, "output_tokens": 2}
+    ollama = AIMessage(content="x", response_metadata={"prompt_eval_count": 5, "eval_count": 4})
+    assert token_counts(ollama) == {"input_tokens": 5, "output_tokens": 4}
+    assert token_counts("plain string") == {"input_tokens": 0, "output_tokens": 0}
+
+
+def test_percentile():
+    assert _percentile([], 50) == 0.0
+    assert _percentile([3, 1, 2], 50) == 2
+    assert _percentile(list(range(101)), 95) == 95
+    assert _percentile([5], 99) == 5
+
+
+def test_concurrency_spec():
+    assert concurrency_spec("azure=16") == ("azure", 16)
+    for bad in ["azure", "azure=0", "azure=x", "gpt=4"]:
+        with pytest.raises(argparse.ArgumentTypeError):
+            concurrency_spec(bad)
+
+
+class FakePrompt:
+    def format(self, context, question):
+        return f"{question}|{context}"
+
+
+class FakeLLM:
+    def __init__(self, name, fail_on=None):
+        self.name, self.fail_on = name, fail_on
+        self.threads = set()
+
+    def invoke(self, prompt):
+        self.threads.add(threading.get_ident())
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError("backend down")
+        return AIMessage(content=f"{self.name}:{prompt}", usage_metadata={"input_tokens": len(prompt),
+                                                                          "output_tokens": 1, "total_tokens": 0})
+
+
+def test_run_matrix_writes_rows_in_query_order(tmp_path):
+    contexts = {
+        ("q1", "faiss"): ("ctx1", ["a.html"], 1.0),
+        ("q2", "faiss"): ("ctx2", ["b.html"], 2.0),
+    }
+    llms = {"azure": FakeLLM("azure"), "ollama": FakeLLM("ollama", fail_on="q2")}
+    output = tmp_path / "results.jsonl"
+
+    rows = run_matrix(llms, FakePrompt(), contexts, {"azure": 2, "ollama": 1}, str(output))
+
+    assert [(r["query"], r["backend"]) for r in rows] == [
+        ("q1", "azure"), ("q1", "ollama"), ("q2", "azure"), ("q2", "ollama")]
+    assert rows[0]["answer"] == "azure:q1|ctx1"
+    assert rows[0]["input_tokens"] == len("q1|ctx1")
+    assert rows[3]["answer"] is None and rows[3]["error"] == "RuntimeError: backend down"
+    assert rows[1]["sources"] == ["a.html"]
+    assert [json.loads(line) for line in output.read_text().splitlines()] == rows
+    assert len(llms["ollama"].threads) == 1
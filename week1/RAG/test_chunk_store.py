@@ -0,0 +1,48 @@
+from langchain_core.documents import Document
+
+from chunk_store import ChunkStore
+
+
+def test_round_trips_text_and_nested_metadata():
+    metadata = {"source": "a.pdf", "page": 2, "tags": ["hr", "leave"], "extra": {"owner": {"team": "people"}},
+                "span": (1, 5)}
+    store = ChunkStore.from_documents([
+        Document(page_content="Curly “quotes” and a dash — here", metadata=metadata),
+        Document(page_content="plain", metadata={}),
+    ]).compact()
+
+    assert len(store) == 2
+    assert store[0].page_content == "Curly “quotes” and a dash — here"
+    assert store[0].metadata == metadata
+    assert type(store[0].metadata["tags"]) is list
+    assert type(store[0].metadata["span"]) is tuple
+    assert store[-1].metadata == {}
+
+
+def test_list_and_tuple_values_intern_separately():
+    store = ChunkStore()
+    store.add("a", {"pages": [1, 2]})
+    store.add("b", {"pages": (1, 2)})
+    store.add("c", {"pages": [1, 2]})
+    assert len(store._meta) == 2
+    assert [type(m["pages"]) for m in store.metadatas()] == [list, tuple, list]
+
+
+def test_views_do_not_mutate_the_store():
+    store = ChunkStore.from_documents([Document(page_content="x", metadata={"tags": ["a"]})])
+    view = store[0]
+    view.metadata["tags"].append("b")
+    assert store[0].metadata == {"tags": ["a"]}
+
+
+def test_select_copies_metadata_tables():
+    store = ChunkStore.from_documents([Document(page_content=str(i), metadata={"i": i % 2}) for i in range(4)])
+    subset = store[1:4:2]
+    assert list(subset.texts()) == ["1", "3"]
+    assert list(subset.metadatas()) == [{"i": 1}, {"i": 1}]
+
+    subset.add("new", {"i": 99})
+    store.add("other", {"i": 42})
+    assert len(store._meta) == 3 and len(subset._meta) == 3
+    assert subset[-1].metadata == {"i": 99}
+    assert store[-1].metadata == {"i": 42}
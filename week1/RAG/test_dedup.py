@@ -0,0 +1,42 @@
+from langchain_core.documents import Document
+
+from chunk_store import ChunkStore
+from dedup import MinHashDeduplicator, deduplicate_documents, optimal_bands, shingles
+
+BODY = ("This page explains vector stores in LangChain with examples of how to configure "
+        "and use vector stores in an application. ") * 4
+
+
+def test_shingles():
+    assert shingles("One two", size=5) == {"one two"}
+    assert shingles("a b c d", size=2) == {"a b", "b c", "c d"}
+    assert shingles("", size=3) == set()
+
+
+def test_optimal_bands_divides_signature():
+    bands, rows = optimal_bands(0.8, 64)
+    assert bands * rows == 64
+    assert abs((1 / bands) ** (1 / rows) - 0.8) < 0.1
+
+
+def test_near_duplicates_are_dropped_and_first_kept():
+    dedup = MinHashDeduplicator(threshold=0.8)
+    assert not dedup.is_duplicate(BODY)
+    assert dedup.is_duplicate(BODY + "See also the API reference.")
+    assert not dedup.is_duplicate("Retrievers return documents for a query using similarity search over embeddings.")
+    report = dedup.report()
+    assert (report["chunks_in"], report["chunks_removed"], report["chunks_kept"]) == (3, 1, 2)
+
+
+def test_deduplicate_documents_keeps_type_and_order():
+    docs = [Document(page_content=BODY, metadata={"source": "a"}),
+            Document(page_content=BODY + " Edited.", metadata={"source": "b"}),
+            Document(page_content="A different page about chat models and streaming tokens.", metadata={"source": "c"})]
+    kept, report = deduplicate_documents(docs)
+    assert [d.metadata["source"] for d in kept] == ["a", "c"]
+    assert report["chunks_removed"] == 1
+
+    store_kept, store_report = deduplicate_documents(ChunkStore.from_documents(docs))
+    assert isinstance(store_kept, ChunkStore)
+    assert [d.metadata["source"] for d in store_kept] == ["a", "c"]
+    assert store_report == report
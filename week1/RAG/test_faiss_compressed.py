@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("faiss")
+pytest.importorskip("langchain_community")
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from faiss_compressed import compress_store
+
+
+class TableEmbeddings(Embeddings):
+    def __init__(self, table):
+        self.table = table
+
+    def embed_documents(self, texts):
+        return [self.table[t] for t in texts]
+
+    def embed_query(self, text):
+        return self.table[text]
+
+
+@pytest.fixture
+def store(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 16)).astype(np.float32)
+    table = {f"doc{i}": vectors[i].tolist() for i in range(300)}
+    table["query"] = rng.normal(size=16).astype(np.float32).tolist()
+    db = FAISS.from_embeddings(
+        [(f"doc{i}", table[f"doc{i}"]) for i in range(300)], TableEmbeddings(table),
+        metadatas=[{"year": 2026 if i % 3 == 0 else 2024} for i in range(300)],
+    )
+    compressed = compress_store(db, "sq8", str(tmp_path / "vectors.npy"))
+    return compressed, vectors, np.asarray(table["query"], dtype=np.float32)
+
+
+def exact_top(vectors, query, rows, k):
+    distances = ((vectors[rows] - query) ** 2).sum(axis=1)
+    order = np.argsort(distances)[:k]
+    return [f"doc{rows[i]}" for i in order], distances[order]
+
+
+def test_unfiltered_search_is_reranked_exactly(store):
+    db, vectors, query = store
+    hits = db.similarity_search_with_score("query", k=5)
+    names, distances = exact_top(vectors, query, np.arange(300), 5)
+    assert [d.page_content for d, _ in hits] == names
+    assert np.allclose([s for _, s in hits], distances, rtol=1e-5)
+
+
+def test_filtered_search_is_reranked_exactly(store):
+    db, vectors, query = store
+    hits = db.similarity_search_with_score("query", k=5, filter={"year": 2026}, fetch_k=300)
+    names, distances = exact_top(vectors, query, np.arange(0, 300, 3), 5)
+    assert [d.page_content for d, _ in hits] == names
+    assert np.allclose([s for _, s in hits], distances, rtol=1e-5)
+    assert all(d.metadata["year"] == 2026 for d, _ in hits)
+
+    callable_hits = db.similarity_search("query", k=5, filter=lambda meta: meta["year"] == 2026, fetch_k=300)
+    assert [d.page_content for d in callable_hits] == names
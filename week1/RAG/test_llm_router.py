@@ -0,0 +1,59 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
+from llm_router import HedgedRouter
+from llm_scheduler import LLMScheduler
+
+
+class ScheduledBackend:
+    """Streams through an LLMScheduler, like ScheduledAzureChatOpenAI._astream."""
+
+    def __init__(self, scheduler, text):
+        self.scheduler = scheduler
+        self.text = text
+
+    def astream(self, messages):
+        async def tokens():
+            for word in self.text.split():
+                await asyncio.sleep(0)
+                yield word
+        return self.scheduler.astream(tokens)
+
+
+class FastBackend:
+    async def astream(self, messages):
+        yield "secondary"
+
+
+def test_hedge_lost_while_queued_releases_scheduler_slot():
+    scheduler = LLMScheduler(rpm=100000, tpm=1e9, initial_concurrency=1)
+    router = HedgedRouter(("primary", ScheduledBackend(scheduler, "primary")),
+                          ("secondary", FastBackend()), initial_hedge_delay=0.05)
+
+    async def main():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(scheduler.acall(release.wait))
+        while scheduler.active == 0:
+            await asyncio.sleep(0.01)
+
+        # The only slot is taken, so the primary is still queued when the hedge wins.
+        text, backend = await router.ainvoke([])
+        assert (text, backend) == ("secondary", "secondary")
+        assert router.stats["primary"].counts["cancelled"] == 1
+        for _ in range(100):
+            if scheduler.queued == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert scheduler.queued == 0
+
+        release.set()
+        await holder
+        assert scheduler.active == 0
+        text, backend = await asyncio.wait_for(router.ainvoke([]), 5)
+        assert (text, backend) == ("primary", "primary")
+
+    asyncio.run(main())
+    assert scheduler.active == 0
@@ -0,0 +1,72 @@
+import numpy as np
+from langchain_core.documents import Document
+
+from metadata_filter import MetadataIndex, chroma_where, enrich_metadata, filtered_search, parse_filter_suffix
+
+
+def test_parse_filter_suffix_pages_count_from_one():
+    assert parse_filter_suffix("remote work days") == ("remote work days", None)
+    assert parse_filter_suffix("leave | year=2026, source=Policy.pdf; page=2") == (
+        "leave", {"year": 2026, "source": "Policy.pdf", "page": 1})
+    assert parse_filter_suffix("leave | page=1") == ("leave", {"page": 0})
+
+
+def test_chroma_where():
+    assert chroma_where(None) is None
+    assert chroma_where({"year": 2026}) == {"year": 2026}
+    assert chroma_where({"source": ["a", "b"], "year": {"$gte": 2025}}) == {
+        "$and": [{"source": {"$in": ["a", "b"]}}, {"year": {"$gte": 2025}}]}
+
+
+def test_enrich_metadata():
+    web, pdf = enrich_metadata([
+        Document(page_content="", metadata={"source": "https://docs.example.com/oss/python/integrations/vectorstores"}),
+        Document(page_content="", metadata={"source": "Hybrid Work Policy 2026.pdf", "page": 0}),
+    ])
+    assert web.metadata["doc_type"] == "web" and web.metadata["section"] == "integrations"
+    assert pdf.metadata["doc_type"] == "pdf" and pdf.metadata["year"] == 2026
+
+
+class FakeIndex:
+    def __init__(self, vectors):
+        self.ntotal = len(vectors)
+
+
+class FakeDocstore:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def search(self, doc_id):
+        return self.docs[doc_id]
+
+
+class FakeEmbedding:
+    def embed_query(self, text):
+        return [float(text), 0.0]
+
+
+class FakeFAISS:
+    """The parts of a LangChain FAISS store that MetadataIndex and filtered_search read."""
+
+    _normalize_L2 = False
+
+    def __init__(self, rows):
+        self.docs = {str(i): Document(page_content=str(x), metadata=meta) for i, (x, meta) in enumerate(rows)}
+        self.index_to_docstore_id = {i: str(i) for i in range(len(rows))}
+        self.docstore = FakeDocstore(self.docs)
+        self.exact_vectors = np.array([[x, 0.0] for x, _ in rows], dtype=np.float32)
+        self.index = FakeIndex(rows)
+        self.embedding_function = FakeEmbedding()
+
+
+def test_filtered_search_scores_only_matching_rows():
+    rows = [(float(i), {"year": 2024 if i < 10 else 2026, "source": f"{i % 3}.pdf"}) for i in range(20)]
+    db = FakeFAISS(rows)
+    index = MetadataIndex(db)
+
+    assert list(index.candidates({"year": 2026, "source": "0.pdf"})) == [12, 15, 18]
+    assert list(index.candidates({"year": {"$lt": 2025}, "source": ["1.pdf", "2.pdf"]})) == [1, 2, 4, 5, 7, 8]
+    assert len(index.candidates({"year": 1999})) == 0
+
+    hits = filtered_search(db, index, "4.2", k=2, filter={"year": 2026, "source": "0.pdf"})
+    assert [d.page_content for d in hits] == ["12.0", "15.0"]
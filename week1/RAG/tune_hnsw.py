@@ -0,0 +1,199 @@
+"""
+HNSW parameter sweep for a persisted Chroma collection.
+
+Rebuilds the collection's vectors in scratch directories for every combination
+of M and construction_ef, then for each search_ef measures build time, on-disk
+index size, p95 query latency and recall@k against exact (brute-force) search.
+The fastest configuration meeting the recall target is reported. With --apply
+the collection is rebuilt with those settings under a staging name, checked,
+and swapped in, and the settings are written to hnsw_settings.json in the
+persist directory. Chroma keeps them in the collection metadata and applies
+them whenever the store is loaded.
+
+    python tune_hnsw.py ./chroma_db
+    python tune_hnsw.py ../../week4/langchain/vectorstore --recall-target 0.98 --apply
+"""
+
+import argparse
+import itertools
+import json
+import os
+import shutil
+import tempfile
+import time
+
+SETTINGS_FILE = "hnsw_settings.json"
+DEFAULT_COLLECTION = "langchain"
+
+
+def load_hnsw_settings(persist_directory: str) -> dict:
+    """Collection metadata chosen by the last `tune_hnsw.py --apply`, or {} for Chroma defaults."""
+    path = os.path.join(persist_directory, SETTINGS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+
+def _exact_top_k(np, vectors, queries, k: int, space: str):
+    if space == "cosine":
+        v = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+        q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+        scores = -(q @ v.T)
+    elif space == "ip":
+        scores = -(queries @ vectors.T)
+    else:
+        scores = (queries ** 2).sum(1)[:, None] - 2 * queries @ vectors.T + (vectors ** 2).sum(1)[None, :]
+    return np.argsort(scores, axis=1)[:, :k]
+
+
+def _add_batched(collection, ids, embeddings, documents=None, metadatas=None, batch_size: int = 1000):
+    for start in range(0, len(ids), batch_size):
+        end = start + batch_size
+        collection.add(
+            ids=ids[start:end],
+            embeddings=embeddings[start:end],
+            documents=documents[start:end] if documents is not None else None,
+            metadatas=metadatas[start:end] if metadatas is not None else None,
+        )
+
+
+def sweep(data: dict, space: str, m_values, construction_efs, search_efs, k: int, num_queries: int, seed: int = 0) -> list:
+    import chromadb
+    import numpy as np
+
+    ids = data["ids"]
+    vectors = np.asarray(data["embeddings"], dtype=np.float32)
+    rng = np.random.default_rng(seed)
+    sample = rng.choice(len(vectors), size=min(num_queries, len(vectors)), replace=False)
+    queries = vectors[sample] + 0.01 * rng.normal(size=(len(sample), vectors.shape[1])).astype(np.float32)
+    truth = _exact_top_k(np, vectors, queries, k, space)
+    truth_ids = [{ids[i] for i in row} for row in truth]
+
+    results = []
+    for m, construction_ef in itertools.product(m_values, construction_efs):
+        scratch = tempfile.mkdtemp(prefix="hnsw_sweep_")
+        try:
+            client = chromadb.PersistentClient(path=scratch)
+            metadata = {"hnsw:space": space, "hnsw:M": m, "hnsw:construction_ef": construction_ef}
+            start = time.perf_counter()
+            collection = client.create_collection("sweep", metadata=metadata)
+            _add_batched(collection, ids, vectors.tolist())
+            build_s = time.perf_counter() - start
+            size_mb = _dir_size(scratch) / 1e6
+
+            for search_ef in search_efs:
+                collection.modify(metadata={**metadata, "hnsw:search_ef": search_ef})
+                latencies, hits = [], 0
+                for q, expected in zip(queries, truth_ids):
+                    t0 = time.perf_counter()
+                    found = collection.query(query_embeddings=[q.tolist()], n_results=k, include=[])
+                    latencies.append((time.perf_counter() - t0) * 1000)
+                    hits += len(expected & set(found["ids"][0]))
+                results.append({
+                    "M": m,
+                    "construction_ef": construction_ef,
+                    "search_ef": search_ef,
+                    "build_s": round(build_s, 2),
+                    "index_mb": round(size_mb, 2),
+                    "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+                    "recall": round(hits / (k * len(queries)), 4),
+                })
+                print(results[-1])
+            del client
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+    return results
+
+
+def choose(results: list, recall_target: float) -> dict:
+    """Lowest p95 latency among configs meeting the target; else the highest recall."""
+    passing = [r for r in results if r["recall"] >= recall_target]
+    if passing:
+        return min(passing, key=lambda r: (r["p95_ms"], r["index_mb"], r["build_s"]))
+    return max(results, key=lambda r: (r["recall"], -r["p95_ms"]))
+
+
+def apply_settings(persist_directory: str, collection_name: str, data: dict, space: str, best: dict):
+    """Rebuild the live collection with the chosen settings and persist them.
+
+    M and construction_ef are fixed when the HNSW graph is built, so the rows
+    in `data` are copied into a new collection first. Only once it holds every
+    row is it swapped in under the live name (the old collection is parked
+    under a backup name until the rename succeeds), so a failed rebuild
+    leaves the original untouched.
+    """
+    import chromadb
+
+    settings = {
+        "hnsw:space": space,
+        "hnsw:M": best["M"],
+        "hnsw:construction_ef": best["construction_ef"],
+        "hnsw:search_ef": best["search_ef"],
+    }
+    client = chromadb.PersistentClient(path=persist_directory)
+    staging, backup = f"{collection_name}_hnsw_staging", f"{collection_name}_hnsw_backup"
+    # Leftovers from an interrupted run; list_collections() returns names on newer Chroma versions.
+    existing = {c if isinstance(c, str) else c.name for c in client.list_collections()}
+    for name in existing & {staging, backup}:
+        client.delete_collection(name)
+
+    collection = client.create_collection(staging, metadata=settings)
+    try:
+        _add_batched(collection, data["ids"], data["embeddings"], data["documents"], data["metadatas"])
+        if collection.count() != len(data["ids"]):
+            raise RuntimeError(f"Rebuilt collection has {collection.count()} rows, expected {len(data['ids'])}")
+    except BaseException:
+        client.delete_collection(staging)
+        raise
+
+    live = client.get_collection(collection_name)
+    live.modify(name=backup)
+    try:
+        collection.modify(name=collection_name)
+    except BaseException:
+        live.modify(name=collection_name)
+        raise
+    client.delete_collection(backup)
+
+    with open(os.path.join(persist_directory, SETTINGS_FILE), "w") as f:
+        json.dump(settings, f, indent=2)
+    print(f"Rebuilt '{collection_name}' in {persist_directory} with {settings}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("persist_directory")
+    parser.add_argument("--collection", default=DEFAULT_COLLECTION)
+    parser.add_argument("--m", type=int, nargs="+", default=[8, 16, 32])
+    parser.add_argument("--construction-ef", type=int, nargs="+", default=[64, 100, 200])
+    parser.add_argument("--search-ef", type=int, nargs="+", default=[10, 32, 64, 128])
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--recall-target", type=float, default=0.95)
+    parser.add_argument("--apply", action="store_true", help="write the chosen settings back and rebuild the collection")
+    args = parser.parse_args()
+
+    import chromadb
+
+    client = chromadb.PersistentClient(path=args.persist_directory)
+    collection = client.get_collection(args.collection)
+    space = (collection.metadata or {}).get("hnsw:space", "l2")
+    data = collection.get(include=["embeddings", "documents", "metadatas"])
+    print(f"Loaded {len(data['ids'])} vectors from '{args.collection}' ({space}); current metadata {collection.metadata}")
+    del client
+
+    results = sweep(data, space, args.m, args.construction_ef, args.search_ef, args.k, args.queries)
+    best = choose(results, args.recall_target)
+    print(f"\nChosen (recall target {args.recall_target}): {best}")
+
+    if args.apply:
+        apply_settings(args.persist_directory, args.collection, data, space, best)
+
+
+if __name__ == "__main__":
+    main()
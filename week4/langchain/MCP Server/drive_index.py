@@ -0,0 +1,207 @@
+"""
+Per-document index over a Google Drive folder.
+
+Every file in the folder (or an explicit list of file ids) is downloaded and
+its text extracted concurrently, one Drive client per worker thread since
+googleapiclient services are not thread-safe. Each document's sentences go
+into an inverted index (term -> (doc, sentence)), so a query only touches the
+sentences that share a term with it, and results say which document they came
+from.
+
+The Drive service and the downloader are injected, so the whole path can be
+exercised without credentials:
+
+    python drive_index.py      # indexes a fake two-file folder and runs a batch search
+"""
+
+import io
+import re
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+
+def _terms(text: str) -> list:
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def list_folder_files(service, folder_id: str) -> list:
+    """All non-folder files directly inside a Drive folder (follows pagination)."""
+    files, page_token = [], None
+    while True:
+        response = service.files().list(
+            q=f"'{folder_id}' in parents and trashed = false",
+            fields="nextPageToken, files(id, name, mimeType)",
+            pageToken=page_token,
+        ).execute()
+        files.extend(f for f in response.get("files", []) if f.get("mimeType") != FOLDER_MIME_TYPE)
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            return files
+
+
+def _download(request, downloader=None) -> bytes:
+    if downloader is None:
+        from googleapiclient.http import MediaIoBaseDownload as downloader
+    buf = io.BytesIO()
+    media = downloader(buf, request)
+    done = False
+    while not done:
+        _, done = media.next_chunk()
+    return buf.getvalue()
+
+
+def extract_text(service, file_meta: dict, downloader=None) -> str:
+    """Download one Drive file and return its text (Google Docs, PDFs, text/* files).
+
+    Raises RuntimeError for any other type rather than indexing its bytes as text.
+    """
+    file_id, mime_type = file_meta["id"], file_meta.get("mimeType", "")
+    if "google-apps.document" in mime_type:
+        request = service.files().export_media(fileId=file_id, mimeType="text/plain")
+        return _download(request, downloader).decode("utf-8", errors="ignore")
+
+    is_pdf = "pdf" in mime_type.lower()
+    if not is_pdf and not mime_type.startswith("text/"):
+        raise RuntimeError(f"Unsupported file type: {mime_type or 'unknown'}")
+    data = _download(service.files().get_media(fileId=file_id), downloader)
+    if is_pdf:
+        from PyPDF2 import PdfReader
+
+        reader = PdfReader(io.BytesIO(data))
+        return "\n".join(page.extract_text() or "" for page in reader.pages)
+    return data.decode("utf-8", errors="ignore")
+
+
+class DriveDocIndex:
+    """Sentences of several documents behind one inverted index."""
+
+    def __init__(self):
+        self.documents = {}  # file id -> {"name": ..., "sentences": [...]}
+        self.errors = {}  # file id -> error message
+        self._postings = defaultdict(set)
+
+    def add(self, file_id: str, name: str, text: str):
+        sentences = [s.strip() for s in re.split(r"[.!?\n]+", text) if s.strip()]
+        self.documents[file_id] = {"name": name, "sentences": sentences}
+        for i, sentence in enumerate(sentences):
+            for term in set(_terms(sentence)):
+                self._postings[term].add((file_id, i))
+
+    def __len__(self):
+        return len(self.documents)
+
+    def search(self, query: str, k: int = 5) -> list:
+        """Sentences sharing the most query terms; returns [(doc name, sentence)]."""
+        hits = defaultdict(int)
+        for term in set(_terms(query)):
+            for location in self._postings.get(term, ()):
+                hits[location] += 1
+        ranked = sorted(hits.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [(self.documents[doc]["name"], self.documents[doc]["sentences"][i]) for (doc, i), _ in ranked]
+
+    def search_batch(self, queries: list, k: int = 5) -> dict:
+        return {query: self.search(query, k) for query in queries}
+
+
+def build_drive_index(service_factory, folder_id: str = None, file_ids: list = None,
+                      max_workers: int = 8, downloader=None) -> DriveDocIndex:
+    """Download and index every file in `folder_id` and/or `file_ids` concurrently.
+
+    `service_factory()` returns a Drive v3 service; it is called once per worker
+    thread. Files that fail to download or have an unsupported type are recorded
+    in `index.errors`.
+    """
+    local = threading.local()
+
+    def service():
+        if not hasattr(local, "service"):
+            local.service = service_factory()
+        return local.service
+
+    files = list_folder_files(service(), folder_id) if folder_id else []
+    known = {f["id"] for f in files}
+    for file_id in file_ids or []:
+        if file_id not in known:
+            files.append(service().files().get(fileId=file_id, fields="id, name, mimeType").execute())
+
+    def fetch(file_meta):
+        return file_meta, extract_text(service(), file_meta, downloader)
+
+    index = DriveDocIndex()
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        futures = [pool.submit(fetch, f) for f in files]
+        for file_meta, future in zip(files, futures):
+            try:
+                _, text = future.result()
+                index.add(file_meta["id"], file_meta.get("name", file_meta["id"]), text)
+            except Exception as e:
+                index.errors[file_meta["id"]] = str(e)
+    return index
+
+
+def format_hits(hits: list) -> str:
+    return "\n\n".join(f"[{name}] {sentence}" for name, sentence in hits)
+
+
+class _FakeRequest:
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def execute(self):
+        return self.content
+
+
+class FakeDriveService:
+    """In-memory stand-in for the parts of the Drive v3 API used here.
+
+    `files` maps file id -> (name, mimeType, bytes, parent folder id).
+    """
+
+    def __init__(self, files: dict):
+        self._files = files
+
+    def files(self):
+        return self
+
+    def list(self, q: str, fields: str = None, pageToken: str = None):
+        folder = q.split("'")[1]
+        return _FakeRequest({"files": [
+            {"id": fid, "name": name, "mimeType": mime}
+            for fid, (name, mime, _, parent) in self._files.items() if parent == folder
+        ]})
+
+    def get(self, fileId: str, fields: str = None):
+        name, mime, _, _ = self._files[fileId]
+        return _FakeRequest({"id": fileId, "name": name, "mimeType": mime})
+
+    def get_media(self, fileId: str):
+        return _FakeRequest(self._files[fileId][2])
+
+    def export_media(self, fileId: str, mimeType: str):
+        return _FakeRequest(self._files[fileId][2])
+
+
+class FakeDownloader:
+    """Mimics MediaIoBaseDownload for _FakeRequest objects, in one chunk."""
+
+    def __init__(self, buf, request):
+        self.buf, self.request = buf, request
+
+    def next_chunk(self):
+        self.buf.write(self.request.execute())
+        return None, True
+
+
+if __name__ == "__main__":
+    fake = FakeDriveService({
+        "a": ("Health Plan.txt", "text/plain", b"Hospital expenses are covered up to 5 lakh. Dental is excluded.", "folder"),
+        "b": ("Dependents", "application/vnd.google-apps.document",
+              b"Spouse and two children can be added. Parents need the premium add-on.", "folder"),
+    })
+    index = build_drive_index(lambda: fake, folder_id="folder", downloader=FakeDownloader)
+    print(f"Indexed {len(index)} documents, errors: {index.errors}")
+    for query, hits in index.search_batch(["hospital expenses", "add parents to insurance"]).items():
+        print(f"\n### {query}\n{format_hits(hits)}")
@@ -1,21 +1,19 @@
 from mcp.server.fastmcp import FastMCP
 import os
 import pickle
-import io
-import re
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-from PyPDF2 import PdfReader
+
+from drive_index import DriveDocIndex, build_drive_index, format_hits
 
 mcp = FastMCP("GoogleDocsMCP")
 
-INSURANCE_DOCS_CONTENT = ""
+INSURANCE_INDEX = DriveDocIndex()
 SCOPES = ['https://www.googleapis.com/auth/drive.readonly']
 
 def load_google_drive_docs():
-    global INSURANCE_DOCS_CONTENT
+    global INSURANCE_INDEX
     
     creds = None
     token_path = 'token.pickle'
@@ -47,58 +45,22 @@ def load_google_drive_docs():
             with open(token_path, 'wb') as token:
                 pickle.dump(creds, token)
             
-        service = build('drive', 'v3', credentials=creds)
-        file_id = os.getenv("GOOGLE_DRIVE_FILE_ID")
+        folder_id = os.getenv("GOOGLE_DRIVE_FOLDER_ID")
+        file_ids = [f.strip() for f in os.getenv("GOOGLE_DRIVE_FILE_ID", "").split(",") if f.strip()]
         
-        if not file_id:
+        if not folder_id and not file_ids:
             return False
         
-        file_metadata = service.files().get(fileId=file_id, fields='name,mimeType,size').execute()
-        mime_type = file_metadata.get('mimeType')
-        
-        if 'google-apps.document' in mime_type:
-            request = service.files().export_media(fileId=file_id, mimeType='text/plain')
-            file_content = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_content, request)
-            
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-            
-            file_content.seek(0)
-            INSURANCE_DOCS_CONTENT = file_content.read().decode('utf-8', errors='ignore')
-            
-        elif 'pdf' in mime_type.lower():
-            request = service.files().get_media(fileId=file_id)
-            pdf_content = io.BytesIO()
-            downloader = MediaIoBaseDownload(pdf_content, request)
-            
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-            
-            pdf_content.seek(0)
-            pdf_reader = PdfReader(pdf_content)
-            
-            text_content = []
-            for page_num, page in enumerate(pdf_reader.pages, 1):
-                page_text = page.extract_text()
-                if page_text:
-                    text_content.append(f"--- Page {page_num} ---\n{page_text}\n")
-            
-            INSURANCE_DOCS_CONTENT = "\n".join(text_content)
-            
-        else:
-            request = service.files().get_media(fileId=file_id)
-            file_content = io.BytesIO()
-            downloader = MediaIoBaseDownload(file_content, request)
-            
-            done = False
-            while not done:
-                status, done = downloader.next_chunk()
-            
-            file_content.seek(0)
-            INSURANCE_DOCS_CONTENT = file_content.read().decode('utf-8', errors='ignore')
+        # Files are downloaded concurrently, each worker thread with its own client
+        INSURANCE_INDEX = build_drive_index(
+            lambda: build('drive', 'v3', credentials=creds),
+            folder_id=folder_id,
+            file_ids=file_ids,
+            max_workers=int(os.getenv("GOOGLE_DRIVE_MAX_WORKERS", "8")),
+        )
+        print(f"Indexed {len(INSURANCE_INDEX)} documents from Google Drive")
+        for file_id, error in INSURANCE_INDEX.errors.items():
+            print(f"Error loading {file_id}: {error}")
         
         return True
         
@@ -109,24 +71,27 @@ def load_google_drive_docs():
 @mcp.tool()
 def search_insurance_docs(query: str) -> str:
     """Search insurance documents for relevant information based on a query."""
-    if not INSURANCE_DOCS_CONTENT:
+    if not len(INSURANCE_INDEX):
         return "No documents loaded. Please ensure Google Drive credentials are configured."
     
-    query_lower = query.lower()
-    sentences = re.split(r'[.!?\n]+', INSURANCE_DOCS_CONTENT)
-    relevant_sentences = []
-    
-    for sentence in sentences:
-        sentence = sentence.strip()
-        if sentence and any(word in sentence.lower() for word in query_lower.split()):
-            relevant_sentences.append(sentence)
-    
-    if relevant_sentences:
-        result = "\n\n".join(relevant_sentences[:5])
-        return f"Found in insurance documents:\n\n{result}"
+    hits = INSURANCE_INDEX.search(query, k=5)
+    if hits:
+        return f"Found in insurance documents:\n\n{format_hits(hits)}"
     else:
         return "No relevant information found in the insurance documents for your query."
 
+@mcp.tool()
+def search_insurance_docs_batch(queries: list[str]) -> str:
+    """Search insurance documents for several queries at once; results are grouped per query."""
+    if not len(INSURANCE_INDEX):
+        return "No documents loaded. Please ensure Google Drive credentials are configured."
+    
+    sections = []
+    for query, hits in INSURANCE_INDEX.search_batch(queries, k=5).items():
+        body = format_hits(hits) if hits else "No relevant information found."
+        sections.append(f"### {query}\n{body}")
+    return "\n\n".join(sections)
+
 if __name__ == "__main__":
     load_google_drive_docs()
     mcp.run()
\ No newline at end of file
@@ -1,7 +1,8 @@
 import asyncio
-from langchain_mcp_adapters import MultiServerMCPClient
 import os
 
+from mcp_pool import MCPSessionPool
+
 async def main():
     server_config = {
         "gdoc_server": {
@@ -11,21 +12,19 @@ async def main():
         }
     }
     
-    client = MultiServerMCPClient(server_config)
-    
-    async with client:
+    # Each server is started once; listing and every tool call reuse its session.
+    async with MCPSessionPool(server_config) as pool:
         print("Connected to MCP server(s)")
         print("=" * 70)
         
-        async with client.session("gdoc_server") as session:
-            tools_list = await session.list_tools()
-            print(f"Available tools (via MCP tools/list): {len(tools_list.tools)}")
-            for tool in tools_list.tools:
-                print(f"  - {tool.name}: {tool.description}")
+        tools_list = await pool.list_tools("gdoc_server")
+        print(f"Available tools (via MCP tools/list): {len(tools_list)}")
+        for tool in tools_list:
+            print(f"  - {tool.name}: {tool.description}")
         
         print("=" * 70)
         
-        tools = await client.get_tools()
+        tools = await pool.get_tools()
         if tools:
             print(f"\nLangChain tools available: {len(tools)}")
             search_tool = next((t for t in tools if t.name == "search_insurance_docs"), None)
@@ -33,6 +32,8 @@ async def main():
                 print("\nTesting search_insurance_docs tool...")
                 result = await search_tool.ainvoke({"query": "coverage"})
                 print(f"Result: {result}")
+        
+        print(f"\nMCP pool metrics: {pool.metrics()}")
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,164 @@
+"""
+Long-lived MCP session pool.
+
+MultiServerMCPClient.get_tools() and one-off `client.session(...)` blocks each
+start a fresh stdio subprocess, so gdoc_server.py would repeat its Drive
+download and PDF parse on every listing or call. The pool starts each
+configured server once, keeps its session open, serves tool listing and every
+tool call from that session, and restarts a server only when a call fails at
+the transport level (the process died). Tool-level errors come back as
+results and never trigger a restart.
+
+Each session is owned by its own task, so the stdio transport is entered and
+exited in the same task even when calls come from many concurrent tasks.
+
+    async with MCPSessionPool(server_config) as pool:
+        tools = await pool.get_tools()
+        ...
+        print(pool.metrics())
+"""
+
+import asyncio
+import time
+
+from langchain_core.tools import StructuredTool
+from langchain_mcp_adapters import MultiServerMCPClient
+
+
+def _percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _result_text(result) -> str:
+    return "\n".join(getattr(part, "text", str(part)) for part in result.content)
+
+
+class _Server:
+    def __init__(self, name: str):
+        self.name = name
+        self.session = None
+        self.task = None
+        self.stop = None
+        self.lock = asyncio.Lock()
+        self.spawns = 0
+        self.restarts = 0
+        self.calls = 0
+        self.failures = 0
+        self.rtts_ms = []
+
+
+class MCPSessionPool:
+    """One persistent session per MCP server, restarted only after a crash."""
+
+    def __init__(self, server_config: dict, max_restarts: int = 3):
+        self.client = MultiServerMCPClient(server_config)
+        self.max_restarts = max_restarts
+        self._servers = {name: _Server(name) for name in server_config}
+
+    async def __aenter__(self):
+        await asyncio.gather(*(self.session(name) for name in self._servers))
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _own_session(self, server: _Server, ready: asyncio.Future):
+        try:
+            async with self.client.session(server.name) as session:
+                ready.set_result(session)
+                await server.stop.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+
+    async def _start(self, server: _Server):
+        server.stop = asyncio.Event()
+        ready = asyncio.get_running_loop().create_future()
+        server.task = asyncio.create_task(self._own_session(server, ready))
+        server.session = await ready
+        server.spawns += 1
+
+    async def _shutdown(self, server: _Server):
+        if server.task is not None:
+            server.stop.set()
+            try:
+                await server.task
+            except Exception:
+                pass  # the transport of a crashed server may fail on close
+        server.session, server.task = None, None
+
+    async def session(self, name: str):
+        """The live session for `name`, starting the server on first use."""
+        server = self._servers[name]
+        async with server.lock:
+            if server.session is None or server.task.done():
+                await self._shutdown(server)
+                await self._start(server)
+            return server.session
+
+    async def _restart(self, server: _Server, dead_session):
+        async with server.lock:
+            # Another caller may already have replaced the dead session.
+            if server.session is dead_session:
+                server.restarts += 1
+                await self._shutdown(server)
+                await self._start(server)
+
+    async def list_tools(self, name: str) -> list:
+        session = await self.session(name)
+        return (await session.list_tools()).tools
+
+    async def call_tool(self, name: str, tool: str, arguments: dict) -> str:
+        server = self._servers[name]
+        for attempt in range(self.max_restarts + 1):
+            session = await self.session(name)
+            start = time.perf_counter()
+            try:
+                result = await session.call_tool(tool, arguments)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                server.failures += 1
+                if attempt == self.max_restarts:
+                    raise
+                await self._restart(server, session)
+                continue
+            server.calls += 1
+            server.rtts_ms.append((time.perf_counter() - start) * 1000)
+            return _result_text(result)
+
+    async def get_tools(self) -> list:
+        """LangChain tools for every server's MCP tools, all routed through the pool."""
+        tools = []
+        for name in self._servers:
+            for mcp_tool in await self.list_tools(name):
+                async def call(_server=name, _tool=mcp_tool.name, **kwargs):
+                    return await self.call_tool(_server, _tool, kwargs)
+
+                tools.append(StructuredTool(
+                    name=mcp_tool.name,
+                    description=mcp_tool.description or "",
+                    args_schema=mcp_tool.inputSchema,
+                    coroutine=call,
+                ))
+        return tools
+
+    def metrics(self) -> dict:
+        return {
+            name: {
+                "spawns": s.spawns,
+                "restarts": s.restarts,
+                "calls": s.calls,
+                "failures": s.failures,
+                "rtt_p50_ms": round(_percentile(s.rtts_ms, 50), 2),
+                "rtt_p95_ms": round(_percentile(s.rtts_ms, 95), 2),
+                "rtt_max_ms": round(max(s.rtts_ms, default=0.0), 2),
+            }
+            for name, s in self._servers.items()
+        }
+
+    async def close(self):
+        await asyncio.gather(*(self._shutdown(s) for s in self._servers.values()))
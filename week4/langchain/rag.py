@@ -1,14 +1,25 @@
 import os
-from langchain_openai import AzureChatOpenAI
+import sys
+
+# llm_scheduler, llm_cache, cassette and prompt_builder live in the repo-level shared/ directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
 from langchain_community.vectorstores import Chroma
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.agents import AgentExecutor, create_react_agent
-from langchain.prompts import PromptTemplate
+from langchain.agents import create_react_agent
 from langchain.tools import Tool
 from langchain_community.tools import DuckDuckGoSearchRun
 
-llm = AzureChatOpenAI(
+from search_cache import CachedSearch
+from ingest import ingest_pdfs
+from tune_hnsw import load_hnsw_settings
+from react_memo import MemoizedAgentExecutor, memoize_tools
+from llm_scheduler import ScheduledAzureChatOpenAI
+from cassette import NodeTimer, cassette_tools, get_cassette
+from metadata_filter import chroma_where, parse_filter_suffix
+from prompt_builder import print_prefix_report, react_prompt
+
+llm = ScheduledAzureChatOpenAI(
     azure_deployment="gpt-4.1",
     api_version="2024-12-01-preview",
     temperature=0,
@@ -22,6 +33,8 @@ embeddings = HuggingFaceEmbeddings(
 
 vectorstore_path = "./vectorstore"
 
+web_search = CachedSearch(DuckDuckGoSearchRun().run)
+
 def initialize_vectorstore(pdf_files=None):
     """Initialize or load the Chroma vectorstore."""
     if os.path.exists(vectorstore_path) and os.path.exists(os.path.join(vectorstore_path, "chroma.sqlite3")):
@@ -40,99 +53,79 @@ def initialize_vectorstore(pdf_files=None):
     
     if pdf_files:
         print("Creating new vectorstore from PDF files...")
-        docs = []
-        for file in pdf_files:
-            if os.path.exists(file):
-                print(f"Loading {file}...")
-                loader = PyPDFLoader(file)
-                docs.extend(loader.load())
-        
-        if docs:
-            db = Chroma.from_documents(
-                docs,
-                embedding=embeddings,
-                persist_directory=vectorstore_path
-            )
-            db.persist()
-            print(f"Created vectorstore with {len(docs)} documents")
-            return db
-        else:
-            raise ValueError("No documents found to load")
+        db = ingest_pdfs(pdf_files, embeddings, vectorstore_path,
+                         collection_metadata=load_hnsw_settings(vectorstore_path) or None)
+        db.persist()
+        return db
     else:
         raise ValueError("Vectorstore does not exist and no PDF files provided. Please provide PDF files to create the vectorstore.")
 
-def hr_policy_search(query: str, db=None):
-    """Search HR policy documents for information about policies, procedures, and guidelines."""
+def hr_policy_search(query: str, db=None, filter=None):
+    """Search HR policy documents for information about policies, procedures, and guidelines.
+
+    `filter` (e.g. {"source": "Hybrid Work Policy 2026.pdf", "page": 1}; pages
+    are 0-based here) or a "question | year=2026, page=2" suffix (1-based
+    pages) restricts the search to matching chunks.
+    """
     if db is None:
         db = initialize_vectorstore()
     
-    results = db.similarity_search(query, k=3)
+    if filter is None:
+        query, filter = parse_filter_suffix(query)
+    results = db.similarity_search(query, k=3, filter=chroma_where(filter))
     return "\n".join([r.page_content for r in results])
 
 def create_hr_agent(db=None):
     """Create an agent with HR policy search and web search tools."""
-    if db is None:
+    cassette = get_cassette()
+    # A replayed run never calls the tools, so it doesn't need the vectorstore.
+    if db is None and (cassette is None or cassette.mode != "replay"):
         db = initialize_vectorstore()
     
-    web_search = DuckDuckGoSearchRun()
-    
-    tools = [
+    tools = memoize_tools(cassette_tools([
         Tool(
             name="HR_Policy_Search",
             func=lambda q: hr_policy_search(q, db),
-            description="Search HR policy documents for information about policies, procedures, and guidelines. Use this to find information about company policies, hiring practices, employee benefits, and internal procedures."
+            description="Search HR policy documents for information about policies, procedures, and guidelines. Use this to find information about company policies, hiring practices, employee benefits, and internal procedures. To restrict the search, append filters after a pipe, e.g. 'remote work days | year=2026' or '... | source=Hybrid Work Policy 2026.pdf, page=2'."
         ),
         Tool(
             name="Web_Search",
             func=web_search.run,
             description="Fetch industry benchmarks, trends, and external information from the web. Use this to find industry standards, market trends, and comparative data."
         )
-    ]
+    ]))
     
-    template = """Answer the following questions as best you can. You have access to the following tools:
-
-{tools}
-
-Use the following format:
-
-Question: the input question you must answer
-Thought: you should always think about what to do
-Action: the action to take, should be one of [{tool_names}]
-Action Input: the input to the action
-Observation: the result of the action
-... (this Thought/Action/Action Input/Observation can repeat N times)
-Thought: I now know the final answer
-Final Answer: the final answer to the original input question
-
-Begin!
-
-Question: {input}
-Thought:{agent_scratchpad}"""
-
-    prompt = PromptTemplate.from_template(template)
+    # Static instructions, then the tool list, then the per-request question.
+    prompt = react_prompt("hr_react_agent")
     
     agent = create_react_agent(llm, tools, prompt)
     
-    agent_executor = AgentExecutor(
+    agent_executor = MemoizedAgentExecutor(
         agent=agent,
         tools=tools,
         verbose=True,
         handle_parsing_errors=True,
-        max_iterations=10
+        max_iterations=10,
+        llm=llm
     )
     
     return agent_executor
 
 if __name__ == "__main__":
-    db = initialize_vectorstore()
-    
-    agent_executor = create_hr_agent(db)
+    agent_executor = create_hr_agent()
     
+    # CASSETTE_MODE=record / replay (see shared/cassette.py); replay times orchestration only
+    timer = NodeTimer()
     result = agent_executor.invoke({
         "input": "Compare our current hiring trend with industry benchmarks."
-    })
+    }, config={"callbacks": [timer]})
     
     print("\n" + "="*70)
     print("Final Answer:")
     print("="*70)
     print(result["output"])
+    print(f"Memo stats: {result['memo_stats']}")
+    if get_cassette() is not None:
+        print(f"Cassette: {get_cassette().stats()}")
+        timer.print_report()
+    print_prefix_report()
@@ -0,0 +1,22 @@
+"""
+HNSW settings chosen for this vectorstore.
+
+The sweep lives in week1/RAG/tune_hnsw.py; run it against ./vectorstore with
+--apply to rebuild the collection and write hnsw_settings.json here:
+
+    python ../../week1/RAG/tune_hnsw.py ./vectorstore --recall-target 0.98 --apply
+"""
+
+import json
+import os
+
+SETTINGS_FILE = "hnsw_settings.json"
+
+
+def load_hnsw_settings(persist_directory: str) -> dict:
+    """Collection metadata chosen by the last `tune_hnsw.py --apply`, or {} for Chroma defaults."""
+    path = os.path.join(persist_directory, SETTINGS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
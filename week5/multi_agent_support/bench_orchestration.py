@@ -0,0 +1,205 @@
+"""
+Orchestration overhead of the multi-agent graph, measured on a cassette.
+
+Record the test queries once against the real deployment and tools, then
+replay them with every LLM and tool call served from the cassette at zero
+latency. Per graph node the report shows how much wall time is left over:
+LangGraph scheduling, message filtering, Tool wrappers, routers and our code.
+Replay needs no network or credentials (placeholders are filled in).
+
+    CASSETTE_MODE=record python multi_agent_system.py
+    python bench_orchestration.py --repeat 5 --save overhead_baseline.json
+    python bench_orchestration.py --baseline overhead_baseline.json   # exits 1 on regressions
+
+--self-check records the test queries against a scripted stand-in for the
+deployment (served through the real Azure client by an httpx mock transport)
+in one process and replays them in another, failing unless every call is
+served from the cassette with identical answers. Graph state gets fresh
+message ids on every run, so this catches cassette keys that depend on them.
+
+    python bench_orchestration.py --self-check
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+# llm_scheduler, llm_cache, cassette and prompt_builder live in the repo-level shared/ directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
+_placeholders = [("AZURE_OPENAI_ENDPOINT", "https://replay.invalid/"),
+                 ("AZURE_OPENAI_API_KEY", "replay"),
+                 ("AZURE_OPENAI_API_VERSION", "2024-12-01-preview"),
+                 ("AZURE_OPENAI_DEPLOYMENT_NAME", "replay")]
+
+
+class ScriptedDeployment:
+    """Answers chat-completion requests like the real deployment would, without a network.
+
+    The supervisor gets a classification, an agent first calls ReadFile and
+    then answers from the tool output, and synthesis joins the answers. Every
+    response gets a fresh completion and tool-call id, as upstream does.
+    """
+
+    def __init__(self):
+        self.calls = 0
+
+    def _reply(self, body: dict) -> dict:
+        messages = body["messages"]
+        system, last = messages[0].get("content") or "", messages[-1]
+        if system.startswith("You are a supervisor"):
+            query = last["content"].lower()
+            labels = [label for label, pattern in [("IT", r"vpn|software|laptop"),
+                                                   ("Finance", r"reimburse|payroll|expense")]
+                      if re.search(pattern, query)]
+            return {"role": "assistant", "content": ", ".join(labels) or "IT"}
+        if body.get("tools") and last["role"] != "tool":
+            question = next(m["content"] for m in reversed(messages) if m["role"] == "user")
+            return {"role": "assistant", "content": None, "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:24]}", "type": "function",
+                "function": {"name": "ReadFile", "arguments": json.dumps({"__arg1": question})},
+            }]}
+        if body.get("tools"):
+            return {"role": "assistant", "content": f"From the docs: {str(last['content'])[:120]}"}
+        return {"role": "assistant", "content": f"Combined: {last['content'][:200]}"}
+
+    def __call__(self, request):
+        import httpx
+
+        self.calls += 1
+        message = self._reply(json.loads(request.content))
+        return httpx.Response(200, json={
+            "id": f"chatcmpl-{uuid.uuid4().hex}", "object": "chat.completion", "created": int(time.time()),
+            "model": "gpt-4.1",
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+            "usage": {"prompt_tokens": 50, "completion_tokens": 10, "total_tokens": 60},
+        })
+
+
+def run_stub_phase():
+    """One --self-check phase (CASSETTE_MODE from the environment); prints its outcome as JSON."""
+    import httpx
+
+    import multi_agent_system
+    from cassette import get_cassette
+    from llm_scheduler import ScheduledAzureChatOpenAI
+
+    deployment = ScriptedDeployment()
+    llm = ScheduledAzureChatOpenAI(
+        azure_deployment="gpt-4.1",
+        api_version="2024-12-01-preview",
+        temperature=0,
+        azure_endpoint="https://stub.invalid/",
+        api_key="stub",
+        max_retries=0,
+        http_client=httpx.Client(transport=httpx.MockTransport(deployment)),
+    )
+
+    class NoWebSearch:
+        def run(self, query: str) -> str:
+            return f"No web results for {query!r}"
+
+    multi_agent_system.get_llm = lambda: llm
+    multi_agent_system.get_web_search = lambda: NoWebSearch()
+
+    answers = [multi_agent_system.run_query(query) for query in multi_agent_system.TEST_QUERIES]
+    get_cassette().close()
+    print(json.dumps({"answers": answers, "upstream_calls": deployment.calls, "cassette": get_cassette().stats()}))
+
+
+def self_check() -> bool:
+    """Record then replay the test queries in separate processes; True when replay matches."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    outcomes = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in ("record", "replay"):
+            env = {**os.environ, "CASSETTE_MODE": mode, "CASSETTE_PATH": os.path.join(tmp, "cassette.jsonl"),
+                   "LLM_CACHE": "0"}
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--stub-phase"],
+                                  cwd=here, env=env, capture_output=True, text=True)
+            if proc.returncode != 0:
+                print(f"{mode} phase failed:\n{proc.stderr[-2000:]}")
+                return False
+            outcomes[mode] = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{mode}: {outcomes[mode]['upstream_calls']} upstream calls; cassette {outcomes[mode]['cassette']}")
+
+    record, replay = outcomes["record"], outcomes["replay"]
+    problems = []
+    if replay["upstream_calls"]:
+        problems.append(f"replay made {replay['upstream_calls']} upstream calls")
+    if replay["answers"] != record["answers"]:
+        problems.append("replayed answers differ from the recorded ones")
+    if replay["cassette"]["replayed"] != record["cassette"]["recorded"]:
+        problems.append(f"replayed {replay['cassette']['replayed']} of {record['cassette']['recorded']} recorded calls")
+    for problem in problems:
+        print(f"FAIL: {problem}")
+    if not problems:
+        print(f"OK: {len(record['answers'])} queries replayed from the cassette with identical answers")
+    return not problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cassette", default=None, help="Cassette to replay (default: CASSETTE_PATH or ./cassettes/cassette.jsonl)")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed passes over the test queries, after one warm-up pass")
+    parser.add_argument("--save", help="Write the per-node report as JSON (e.g. a CI baseline)")
+    parser.add_argument("--baseline", help="Compare against a saved report and exit 1 on overhead regressions")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed per-call overhead growth over the baseline")
+    parser.add_argument("--self-check", action="store_true", help="Record and replay against a scripted deployment")
+    parser.add_argument("--stub-phase", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    for name, placeholder in _placeholders:
+        os.environ.setdefault(name, placeholder)
+    if args.stub_phase:
+        run_stub_phase()
+        return
+    if args.self_check:
+        sys.exit(0 if self_check() else 1)
+
+    os.environ["CASSETTE_MODE"] = "replay"
+    if args.cassette:
+        os.environ["CASSETTE_PATH"] = args.cassette
+
+    from cassette import NodeTimer, find_regressions, get_cassette
+    from multi_agent_system import TEST_QUERIES, run_query
+
+    # Warm-up: builds the lazy components (graph compile, indexes, clients).
+    for query in TEST_QUERIES:
+        run_query(query)
+
+    timer = NodeTimer()
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for query in TEST_QUERIES:
+            run_query(query, callbacks=[timer])
+    elapsed = time.perf_counter() - start
+
+    runs = args.repeat * len(TEST_QUERIES)
+    print(f"{runs} replayed queries in {elapsed:.2f} s ({elapsed / runs * 1000:.1f} ms per query); "
+          f"cassette: {get_cassette().stats()}")
+    timer.print_report()
+
+    report = timer.report()
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.save}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), tolerance=args.tolerance)
+        if regressions:
+            print("\nOrchestration overhead regressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"\nNo node exceeds its baseline overhead by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+Section index for the internal documentation folders.
+
+Each .txt file in a docs directory is split into sections (a heading line plus
+the paragraph/list under it) and indexed with BM25 so that the ReadFile tool
+can return only the few sections that match a query instead of whole files.
+Parsed files are cached in memory and re-read only when their mtime changes.
+
+Changed files are parsed outside the index lock and the new state is swapped in
+at once, so searches keep running against the previous state during a refresh.
+With auto_refresh=False the index never touches the disk on the query path and
+is refreshed by a FileWatcher instead.
+"""
+
+import math
+import os
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "for", "from",
+    "how", "i", "in", "is", "it", "my", "of", "on", "or", "our", "the", "to",
+    "what", "when", "where", "which", "who", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> list:
+    """Lowercase word tokens without stopwords."""
+    return [t for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS]
+
+
+@dataclass
+class Section:
+    filename: str
+    title: str
+    heading: str
+    text: str
+    terms: Counter = field(default_factory=Counter)
+    length: int = 0
+
+
+def split_sections(filename: str, content: str) -> list:
+    """Split a document into heading-led sections.
+
+    Blocks are separated by blank lines. A block that is a single line (or
+    whose first line ends with ':') is treated as a heading for the text that
+    follows it. The first line of the file is the document title.
+    """
+    blocks = [b.strip() for b in re.split(r"\n\s*\n", content) if b.strip()]
+    if not blocks:
+        return []
+
+    title = blocks[0].splitlines()[0].strip()
+    sections = []
+    pending_heading = ""
+
+    for block in blocks:
+        lines = block.splitlines()
+        if len(lines) == 1:
+            # Standalone heading (or the title); attach it to the next block.
+            if pending_heading and pending_heading != title:
+                sections.append(Section(filename, title, pending_heading, pending_heading))
+            pending_heading = lines[0].strip()
+            continue
+
+        if lines[0].rstrip().endswith(":"):
+            heading = lines[0].strip().rstrip(":")
+            body = block
+            if pending_heading and pending_heading != title:
+                body = f"{pending_heading}\n{block}"
+        else:
+            heading = pending_heading.rstrip(":") or title
+            body = f"{pending_heading}\n{block}" if pending_heading and pending_heading != title else block
+
+        sections.append(Section(filename, title, heading, body))
+        pending_heading = ""
+
+    if pending_heading and pending_heading != title:
+        sections.append(Section(filename, title, pending_heading, pending_heading))
+
+    for section in sections:
+        # File name and document title are indexed with every section so a
+        # query like "payroll schedule" still reaches the right file.
+        stem = os.path.splitext(filename)[0].replace("_", " ")
+        section.terms = Counter(tokenize(f"{stem} {section.title} {section.text}"))
+        section.length = sum(section.terms.values())
+
+    return sections
+
+
+class DocumentIndex:
+    """In-memory BM25 index over the sections of every file in a directory."""
+
+    def __init__(self, directory: str, extensions=(".txt", ".md"), k1: float = 1.2, b: float = 0.75,
+                 auto_refresh: bool = True):
+        self.directory = directory
+        self.extensions = extensions
+        self.k1 = k1
+        self.b = b
+        self.auto_refresh = auto_refresh
+        self._files = {}  # filename -> (mtime_ns, size, [Section])
+        self._raw = {}  # filename -> full text, used for exact filename lookups
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self.disk_reads = 0
+        self.refreshes = 0
+        self._sections, self._df, self._avg_len = self._stats({})
+        self.refresh()
+
+    def refresh(self) -> bool:
+        """Re-parse files whose mtime or size changed. Returns True if anything changed."""
+        with self._refresh_lock:
+            with self._lock:
+                files, raw = dict(self._files), dict(self._raw)
+            if not self._scan(files, raw):
+                return False
+            sections, df, avg_len = self._stats(files)
+            with self._lock:
+                self._files, self._raw = files, raw
+                self._sections, self._df, self._avg_len = sections, df, avg_len
+            self.refreshes += 1
+            return True
+
+    def _scan(self, files: dict, raw: dict) -> bool:
+        """Update `files` / `raw` in place from the directory; True if anything changed."""
+        seen = {}
+        if os.path.isdir(self.directory):
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    if entry.is_file() and entry.name.endswith(self.extensions):
+                        st = entry.stat()
+                        seen[entry.name] = (st.st_mtime_ns, st.st_size)
+
+        changed = False
+        for name in list(files):
+            if name not in seen:
+                del files[name]
+                raw.pop(name, None)
+                changed = True
+
+        for name, (mtime, size) in seen.items():
+            cached = files.get(name)
+            if cached and cached[0] == mtime and cached[1] == size:
+                continue
+            try:
+                with open(os.path.join(self.directory, name), "r", encoding="utf-8") as f:
+                    content = f.read()
+            except OSError:
+                continue
+            self.disk_reads += 1
+            files[name] = (mtime, size, split_sections(name, content))
+            raw[name] = content
+            changed = True
+        return changed
+
+    @staticmethod
+    def _stats(files: dict) -> tuple:
+        sections = [s for _, _, secs in files.values() for s in secs]
+        df = Counter()
+        for section in sections:
+            df.update(section.terms.keys())
+        total = sum(s.length for s in sections)
+        return sections, df, total / len(sections) if sections else 0.0
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+    def filenames(self) -> list:
+        with self._lock:
+            return sorted(self._files)
+
+    def get_file(self, filename: str):
+        """Return the full text of a file by exact name, or None."""
+        if self.auto_refresh:
+            self.refresh()
+        with self._lock:
+            return self._raw.get(filename)
+
+    def search(self, query: str, k: int = 3) -> list:
+        """Return up to k (score, Section) pairs ranked by BM25."""
+        if self.auto_refresh:
+            self.refresh()
+        with self._lock:
+            sections = self._sections
+            df = self._df
+            avg_len = self._avg_len or 1.0
+
+        q_terms = set(tokenize(query))
+        if not q_terms or not sections:
+            return []
+
+        n = len(sections)
+        scored = []
+        for section in sections:
+            score = 0.0
+            for term in q_terms:
+                tf = section.terms.get(term)
+                if not tf:
+                    continue
+                idf = math.log(1 + (n - df[term] + 0.5) / (df[term] + 0.5))
+                norm = tf + self.k1 * (1 - self.b + self.b * section.length / avg_len)
+                score += idf * tf * (self.k1 + 1) / norm
+            if score > 0:
+                scored.append((score, section))
+
+        scored.sort(key=lambda pair: pair[0], reverse=True)
+        return scored[:k]
+
+
+def format_results(results: list) -> str:
+    """Render search results as compact, source-labelled snippets."""
+    parts = []
+    for _, section in results:
+        label = section.filename if section.heading == section.title else f"{section.filename} > {section.heading}"
+        parts.append(f"[{label}]\n{section.text}")
+    return "\n\n".join(parts)
+
+
+if __name__ == "__main__":
+    import sys
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else "./it_docs"
+    query = " ".join(sys.argv[2:]) or "vpn mac setup"
+    index = DocumentIndex(directory)
+    print(f"Indexed {len(index)} sections from {len(index.filenames())} files")
+    print(format_results(index.search(query)))
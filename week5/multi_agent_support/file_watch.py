@@ -0,0 +1,171 @@
+"""
+Change detection for source document folders.
+
+FileWatcher keeps a snapshot of (mtime_ns, size) for every matching file under
+its paths (directories are scanned one level deep, plain files are watched
+directly) and reports what was added, modified or removed since the last scan
+to a callback on a background thread. Bursts of writes (an editor saving, a
+copy in progress) are coalesced: a batch is delivered only once the snapshot
+has been stable for `settle` seconds.
+
+On Linux with the optional inotify_simple package installed, the thread sleeps
+on inotify events instead of rescanning every `interval` seconds. The scan
+itself is the same either way, so a missed or overflowed event only delays a
+change until the next periodic scan. If the callback raises, the batch is
+retried on the next scan.
+"""
+
+import os
+import threading
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Changes:
+    added: list = field(default_factory=list)
+    modified: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.modified or self.removed)
+
+    def paths(self) -> list:
+        return self.added + self.modified + self.removed
+
+
+def snapshot(paths: list, extensions: tuple = None) -> dict:
+    """path -> (mtime_ns, size) for the files currently under `paths`."""
+    files = {}
+    for path in paths:
+        if os.path.isdir(path):
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    if entry.is_file() and (extensions is None or entry.name.endswith(extensions)):
+                        st = entry.stat()
+                        files[os.path.join(path, entry.name)] = (st.st_mtime_ns, st.st_size)
+        elif os.path.isfile(path):
+            st = os.stat(path)
+            files[path] = (st.st_mtime_ns, st.st_size)
+    return files
+
+
+def diff(old: dict, new: dict) -> Changes:
+    return Changes(
+        added=sorted(p for p in new if p not in old),
+        modified=sorted(p for p in new if p in old and new[p] != old[p]),
+        removed=sorted(p for p in old if p not in new),
+    )
+
+
+class FileWatcher:
+    def __init__(self, paths: list, on_change, extensions: tuple = None,
+                 interval: float = 2.0, settle: float = 0.5):
+        self.paths = list(paths)
+        self.on_change = on_change
+        self.extensions = extensions
+        self.interval = interval
+        self.settle = settle
+        self._snapshot = snapshot(self.paths, extensions)
+        self._stop = threading.Event()
+        self._thread = None
+        self._inotify = None
+        self.batches = 0
+        self.errors = 0
+        self.last_error = None
+
+    def poll(self) -> Changes:
+        """Scan once; when something changed, wait until it settles and return the diff."""
+        current = snapshot(self.paths, self.extensions)
+        if current == self._snapshot:
+            return Changes()
+        while not self._stop.wait(self.settle):
+            again = snapshot(self.paths, self.extensions)
+            if again == current:
+                break
+            current = again
+        changes = diff(self._snapshot, current)
+        self._snapshot = current
+        return changes
+
+    def _open_inotify(self):
+        try:
+            from inotify_simple import INotify, flags
+        except ImportError:
+            return None
+        mask = flags.CREATE | flags.CLOSE_WRITE | flags.MODIFY | flags.DELETE | flags.MOVED_TO | flags.MOVED_FROM
+        try:
+            inotify = INotify()
+            # Editors and copy tools replace files by renaming, so watch the parent directory of single files.
+            for directory in {p if os.path.isdir(p) else os.path.dirname(os.path.abspath(p)) for p in self.paths}:
+                if os.path.isdir(directory):
+                    inotify.add_watch(directory, mask)
+            return inotify
+        except OSError:
+            return None
+
+    def _wait(self):
+        if self._inotify is not None:
+            self._inotify.read(timeout=int(self.interval * 1000))
+        else:
+            self._stop.wait(self.interval)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wait()
+            previous = self._snapshot
+            changes = self.poll()
+            if not changes or self._stop.is_set():
+                continue
+            try:
+                self.on_change(changes)
+                self.batches += 1
+            except Exception as e:
+                self._snapshot = previous
+                self.errors += 1
+                self.last_error = e
+                print(f"File watcher: reload failed ({e!r}); retrying on the next scan")
+
+    def start(self) -> "FileWatcher":
+        if self._thread is None:
+            self._inotify = self._open_inotify()
+            self._thread = threading.Thread(target=self._run, name="file-watch", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._inotify is not None else f"polling every {self.interval}s"
+
+
+if __name__ == "__main__":
+    import tempfile
+    import time
+
+    directory = tempfile.mkdtemp()
+    with open(os.path.join(directory, "vpn.txt"), "w") as f:
+        f.write("VPN setup\n")
+
+    batches = []
+    watcher = FileWatcher([directory], batches.append, extensions=(".txt",), interval=0.1, settle=0.1).start()
+    print(f"Watching {directory} ({watcher.mode})")
+
+    with open(os.path.join(directory, "laptop.txt"), "w") as f:
+        f.write("Laptop requests\n")
+    with open(os.path.join(directory, "vpn.txt"), "a") as f:
+        f.write("Mac: install the client first\n")
+    time.sleep(0.5)
+    os.remove(os.path.join(directory, "vpn.txt"))
+    time.sleep(0.5)
+    watcher.stop()
+
+    for changes in batches:
+        print({k: [os.path.basename(p) for p in v] for k, v in vars(changes).items() if v})
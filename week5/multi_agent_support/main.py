@@ -4,6 +4,8 @@ Demo script for the Multi-Agent Support System
 This script demonstrates how to use the multi-agent system with example queries.
 """
 
+import argparse
+
 from multi_agent_system import run_query
 
 def main():
@@ -53,4 +55,20 @@ def main():
         print("=" * 70)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report import time per module and lazy component build times, then exit.")
+    args = parser.parse_args()
+    
+    if args.profile_startup:
+        import multi_agent_system
+        from startup_profile import print_startup_report
+        
+        print_startup_report("multi_agent_system", {
+            "get_llm": multi_agent_system.get_llm,
+            "get_it_tools": multi_agent_system.get_it_tools,
+            "get_finance_tools": multi_agent_system.get_finance_tools,
+            "get_stateless_app": multi_agent_system.get_stateless_app,
+        })
+    else:
+        main()
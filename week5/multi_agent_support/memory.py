@@ -0,0 +1,119 @@
+"""
+Bounded session memory for the multi-agent graph.
+
+The last `max_turns` turns (a HumanMessage plus everything the agents and tools
+produced in response) are kept verbatim. Older turns are folded into a rolling
+summary that is capped at `summary_token_cap` tokens, so the prompt sent to the
+agents stays roughly constant in size however long the session runs.
+"""
+
+import os
+import sqlite3
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+
+SESSION_DB_PATH = "./.sessions.sqlite3"
+
+SUMMARY_PROMPT = """You maintain a running summary of a support conversation between an employee and IT/Finance agents.
+
+Current summary:
+{summary}
+
+New conversation turns to fold in:
+{turns}
+
+Write an updated summary in at most {max_words} words. Keep facts the user stated, decisions, answers given, file names and open questions. Drop greetings and tool-call mechanics."""
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    return text[: max_tokens * 4].rsplit(" ", 1)[0] + " ..."
+
+
+def split_turns(messages: list) -> list:
+    """Group messages into turns, each starting at a HumanMessage."""
+    turns = []
+    for msg in messages:
+        if isinstance(msg, HumanMessage) or not turns:
+            turns.append([msg])
+        else:
+            turns[-1].append(msg)
+    return turns
+
+
+def render_turns(turns: list) -> str:
+    lines = []
+    for turn in turns:
+        for msg in turn:
+            if isinstance(msg, HumanMessage):
+                lines.append(f"User: {msg.content}")
+            elif isinstance(msg, AIMessage) and msg.content and not msg.tool_calls:
+                lines.append(f"Agent: {msg.content}")
+            elif isinstance(msg, ToolMessage):
+                lines.append(f"Tool result: {truncate_to_tokens(str(msg.content), 100)}")
+    return "\n".join(lines)
+
+
+class ConversationMemory:
+    """Decides which turns stay verbatim and keeps the rolling summary under a cap."""
+
+    def __init__(self, summarize_llm=None, max_turns: int = 3, summary_token_cap: int = 300):
+        self.summarize_llm = summarize_llm
+        self.max_turns = max_turns
+        self.summary_token_cap = summary_token_cap
+
+    def summarize(self, summary: str, turns: list) -> str:
+        rendered = render_turns(turns)
+        if self.summarize_llm is None:
+            # No model available: keep the most recent part of the transcript.
+            merged = f"{summary}\n{rendered}".strip()
+            return merged[-self.summary_token_cap * 4:]
+
+        prompt = SUMMARY_PROMPT.format(
+            summary=summary or "(empty)",
+            turns=rendered,
+            max_words=int(self.summary_token_cap * 0.75),
+        )
+        response = self.summarize_llm.invoke([HumanMessage(content=prompt)])
+        return truncate_to_tokens(response.content.strip(), self.summary_token_cap)
+
+    def compact(self, messages: list, summary: str = "") -> dict:
+        """Return a state update that removes old turns and extends the summary.
+
+        Returns an empty dict when the history is still within max_turns.
+        """
+        turns = split_turns(messages)
+        if len(turns) <= self.max_turns:
+            return {}
+
+        old_turns = turns[: -self.max_turns]
+        removals = [RemoveMessage(id=msg.id) for turn in old_turns for msg in turn if msg.id]
+        return {
+            "messages": removals,
+            "summary": self.summarize(summary, old_turns),
+        }
+
+    @staticmethod
+    def context_messages(summary: str) -> list:
+        """Messages to place after the agent's system prompt."""
+        if not summary:
+            return []
+        return [SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")]
+
+
+def create_checkpointer(path: str = SESSION_DB_PATH):
+    """SQLite checkpointer when langgraph-checkpoint-sqlite is installed, else in-memory."""
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        from langgraph.checkpoint.memory import MemorySaver
+        return MemorySaver()
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
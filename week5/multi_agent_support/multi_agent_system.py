@@ -1,94 +1,165 @@
 
 import os
+import re
+import sys
+from functools import lru_cache
 from typing import TypedDict, Annotated, Literal
-from langchain_openai import AzureChatOpenAI
-from langchain_community.tools import DuckDuckGoSearchRun
-from langchain.tools import Tool
-from langgraph.graph import StateGraph, END
-from langgraph.prebuilt import ToolNode
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
-
-llm = AzureChatOpenAI(
-    azure_deployment="gpt-4.1",
-    api_version="2024-12-01-preview",
-    temperature=0,
-    azure_endpoint="https://ai-enablement.openai.azure.com/",
-    api_key="api key"
-)
-
-web_search = DuckDuckGoSearchRun()
+
+# llm_scheduler, llm_cache, cassette and prompt_builder live in the repo-level shared/ directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
+import prompt_builder
+from doc_index import DocumentIndex, format_results
+from search_cache import CachedSearch
+
+# Importing this module must stay cheap: the LLM client, search tool, document
+# indexes and compiled graph are built on first use by the get_* factories below,
+# and langgraph / langchain_core (about a second together) are imported only
+# inside the functions that use them.
+
+
+@lru_cache(maxsize=None)
+def get_llm():
+    from llm_scheduler import ScheduledAzureChatOpenAI
+
+    return ScheduledAzureChatOpenAI(
+        azure_deployment="gpt-4.1",
+        api_version="2024-12-01-preview",
+        temperature=0,
+        azure_endpoint="https://ai-enablement.openai.azure.com/",
+        api_key="api key"
+    )
+
+
+@lru_cache(maxsize=None)
+def get_web_search() -> CachedSearch:
+    """Shared by both agents; identical queries are served from the on-disk cache."""
+    from langchain_community.tools import DuckDuckGoSearchRun
+
+    return CachedSearch(DuckDuckGoSearchRun().run)
+
+def merge_answers(current: dict, update: dict) -> dict:
+    """Reducer for per-branch answers; parallel branches each add their own key, None resets."""
+    if update is None:
+        return {}
+    return {**(current or {}), **update}
+
+
+def _add_messages(current: list, update: list) -> list:
+    """LangGraph's add_messages reducer, imported when the graph first runs."""
+    from langgraph.graph.message import add_messages
+
+    return add_messages(current, update)
+
 
 class AgentState(TypedDict):
-    messages: Annotated[list, "messages"]
-    next_agent: str
+    messages: Annotated[list, _add_messages]
+    next_agents: list
+    answers: Annotated[dict, merge_answers]
+    summary: str
+
+
+@lru_cache(maxsize=None)
+def get_memory():
+    """Keep the last few turns verbatim; older turns are folded into state["summary"]."""
+    from memory import ConversationMemory
+
+    return ConversationMemory(summarize_llm=get_llm(), max_turns=3, summary_token_cap=300)
 
 IT_DOCS_DIR = "./it_docs"
 FINANCE_DOCS_DIR = "./finance_docs"
 
+# Refresh the document indexes from a background file watcher instead of
+# checking the directory on every ReadFile call.
+HOT_RELOAD = os.getenv("HOT_RELOAD", "0") == "1"
+_watchers = []
+
 
 # TODO : file system MCp
-def read_file_tool(directory: str):
-    """Create a ReadFile tool for a specific directory."""
-    def read_file(filename: str) -> str:
-        """Read a file from the specified directory."""
-        file_path = os.path.join(directory, filename)
-        if not os.path.exists(file_path):
-            return f"File '{filename}' not found in {directory} directory."
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return f"Content of {filename}:\n\n{content}"
-        except Exception as e:
-            return f"Error reading file '{filename}': {str(e)}"
-    
+def read_file_tool(directory: str, top_k: int = 3):
+    """Create a ReadFile tool for a specific directory.
+
+    The directory is indexed once into heading-level sections; each call
+    returns only the top matching sections for the query. Files are re-parsed
+    only when their mtime changes. An exact filename still returns the whole file.
+    """
+    index = DocumentIndex(directory, auto_refresh=not HOT_RELOAD)
+    if HOT_RELOAD:
+        from file_watch import FileWatcher
+
+        _watchers.append(FileWatcher([directory], lambda _: index.refresh(), extensions=index.extensions).start())
+
+    def read_file(query: str) -> str:
+        """Search the directory's documentation for sections matching the query."""
+        query = query.strip().strip("'\"")
+        content = index.get_file(query)
+        if content is not None:
+            return f"Content of {query}:\n\n{content}"
+
+        results = index.search(query, k=top_k)
+        if not results:
+            available = ", ".join(index.filenames()) or "none"
+            return f"No matching sections for '{query}' in {directory} directory. Available files: {available}"
+        return format_results(results)
+
     return read_file
 
-it_read_file = read_file_tool(IT_DOCS_DIR)
-finance_read_file = read_file_tool(FINANCE_DOCS_DIR)
-
-it_tools = [
-    Tool(
-        name="ReadFile",
-        func=it_read_file,
-        description="Read internal IT documentation files. Use this to find information about IT policies, procedures, approved software, VPN setup, hardware requests, etc. Provide the filename (e.g., 'vpn_setup.txt', 'approved_software.txt', 'laptop_request.txt')"
-    ),
-    Tool(
-        name="WebSearch",
-        func=web_search.run,
-        description="Search the web for external IT information, technical documentation, software guides, troubleshooting steps, and industry best practices."
-    )
-]
+@lru_cache(maxsize=None)
+def get_it_tools() -> list:
+    from langchain_core.tools import Tool
+    from cassette import cassette_tools
 
-finance_tools = [
-    Tool(
-        name="ReadFile",
-        func=finance_read_file,
-        description="Read internal finance documentation files. Use this to find information about reimbursement procedures, budget reports, payroll schedules, expense policies, etc. Provide the filename (e.g., 'reimbursement_policy.txt', 'budget_report.txt', 'payroll_schedule.txt')"
-    ),
-    Tool(
-        name="WebSearch",
-        func=web_search.run,
-        description="Search the web for public finance data, industry benchmarks, financial regulations, and external financial information."
-    )
-]
+    # Recorded / replayed when CASSETTE_MODE is set (see shared/cassette.py)
+    return cassette_tools([
+        Tool(
+            name="ReadFile",
+            func=read_file_tool(IT_DOCS_DIR),
+            description="Read internal IT documentation files. Use this to find information about IT policies, procedures, approved software, VPN setup, hardware requests, etc. Provide a short search query (e.g., 'vpn setup mac', 'approved browsers'); only the most relevant sections are returned."
+        ),
+        Tool(
+            name="WebSearch",
+            func=get_web_search().run,
+            description="Search the web for external IT information, technical documentation, software guides, troubleshooting steps, and industry best practices."
+        )
+    ])
 
-it_llm = llm.bind_tools(it_tools)
-finance_llm = llm.bind_tools(finance_tools)
 
+@lru_cache(maxsize=None)
+def get_finance_tools() -> list:
+    from langchain_core.tools import Tool
+    from cassette import cassette_tools
+
+    # Recorded / replayed when CASSETTE_MODE is set (see shared/cassette.py)
+    return cassette_tools([
+        Tool(
+            name="ReadFile",
+            func=read_file_tool(FINANCE_DOCS_DIR),
+            description="Read internal finance documentation files. Use this to find information about reimbursement procedures, budget reports, payroll schedules, expense policies, etc. Provide a short search query (e.g., 'reimbursement deadline', 'payroll processing dates'); only the most relevant sections are returned."
+        ),
+        Tool(
+            name="WebSearch",
+            func=get_web_search().run,
+            description="Search the web for public finance data, industry benchmarks, financial regulations, and external financial information."
+        )
+    ])
+
+
+@lru_cache(maxsize=None)
+def get_it_llm():
+    return get_llm().bind_tools(get_it_tools())
+
+
+@lru_cache(maxsize=None)
+def get_finance_llm():
+    return get_llm().bind_tools(get_finance_tools())
 
-def supervisor_agent(state: AgentState) -> AgentState:
-    """Supervisor agent that classifies queries and routes to appropriate agent."""
-    messages = state["messages"]
-    
-    user_query = ""
-    for msg in messages:
-        if isinstance(msg, HumanMessage):
-            user_query = msg.content
-            break
-    
-    classification_prompt = """You are a supervisor agent that classifies user queries into one of two categories: IT or Finance.
+
+def memory_node(state: AgentState) -> AgentState:
+    """Fold turns beyond the verbatim window into the rolling summary."""
+    return get_memory().compact(state["messages"], state.get("summary", ""))
+
+
+prompt_builder.register("supervisor", """You are a supervisor agent that classifies user queries into IT, Finance, or both.
 
 IT queries include:
 - VPN setup, network issues, software installation
@@ -104,31 +175,41 @@ Finance queries include:
 - Financial policies and procedures
 - Invoice and payment inquiries
 
-User Query: {query}
+Some queries need both (e.g. "Can I expense the VPN software licence?").
+
+Respond with ONLY "IT", "Finance", or "IT, Finance" if the query needs both.""")
+
+
+def supervisor_agent(state: AgentState) -> AgentState:
+    """Supervisor agent that classifies queries and picks one or both domain agents."""
+    from langchain_core.messages import HumanMessage
 
-Classify this query and respond with ONLY one word: either "IT" or "Finance".""".format(query=user_query)
+    messages = state["messages"]
+    
+    user_query = ""
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            user_query = msg.content
+            break
     
-    response = llm.invoke([HumanMessage(content=classification_prompt)])
+    messages = prompt_builder.chat_messages("supervisor", [HumanMessage(content=f"User Query: {user_query}")])
+    response = get_llm().invoke(messages)
     
     classification = response.content.strip().upper()
     
-    if "IT" in classification:
-        next_agent = "it_agent"
-    elif "FINANCE" in classification:
-        next_agent = "finance_agent"
-    else:
-        next_agent = "it_agent"
+    next_agents = []
+    if re.search(r"\bIT\b", classification):
+        next_agents.append("it_agent")
+    if "FINANCE" in classification:
+        next_agents.append("finance_agent")
     
     return {
-        "messages": messages,
-        "next_agent": next_agent
+        "next_agents": next_agents or ["it_agent"],
+        # Clear the previous turn's branch answers
+        "answers": None,
     }
 
-def it_agent(state: AgentState) -> AgentState:
-    """IT agent that handles IT-related queries."""
-    messages = state["messages"]
-    
-    system_message = SystemMessage(content="""You are an IT support agent. Your role is to help users with IT-related queries including:
+prompt_builder.register("it_agent", """You are an IT support agent. Your role is to help users with IT-related queries including:
 - VPN setup and configuration
 - Approved software and installation procedures
 - Hardware requests (laptops, monitors, etc.)
@@ -138,24 +219,29 @@ def it_agent(state: AgentState) -> AgentState:
 Use the ReadFile tool to access internal IT documentation and the WebSearch tool for external technical information.
 Provide clear, step-by-step instructions when applicable.
 If you cannot find the information, suggest contacting IT support directly.""")
+
+
+def it_agent(state: AgentState) -> AgentState:
+    """IT agent that handles IT-related queries."""
+    from langchain_core.messages import AIMessage
+    from memory import ConversationMemory
+
+    messages = state["messages"]
     
     # Filter out supervisor routing messages
     filtered_messages = [msg for msg in messages if not (isinstance(msg, AIMessage) and "Routing to" in msg.content)]
-    agent_messages = [system_message] + filtered_messages
+    agent_messages = prompt_builder.chat_messages(
+        "it_agent", ConversationMemory.context_messages(state.get("summary", "")) + filtered_messages
+    )
     
-    response = it_llm.invoke(agent_messages)
+    response = get_it_llm().invoke(agent_messages)
     
     return {
-        "messages": [response],
-        "next_agent": state.get("next_agent", "")
+        "messages": [response]
     }
 
 # Finance Agent
-def finance_agent(state: AgentState) -> AgentState:
-    """Finance agent that handles Finance-related queries."""
-    messages = state["messages"]
-    
-    system_message = SystemMessage(content="""You are a Finance support agent. Your role is to help users with Finance-related queries including:
+prompt_builder.register("finance_agent", """You are a Finance support agent. Your role is to help users with Finance-related queries including:
 - Reimbursement procedures and filing
 - Budget reports and financial data
 - Payroll schedules and processing
@@ -165,34 +251,38 @@ def finance_agent(state: AgentState) -> AgentState:
 Use the ReadFile tool to access internal finance documentation and the WebSearch tool for public finance data and industry benchmarks.
 Provide clear, accurate information with relevant dates and procedures.
 If you cannot find the information, suggest contacting the Finance department directly.""")
+
+
+def finance_agent(state: AgentState) -> AgentState:
+    """Finance agent that handles Finance-related queries."""
+    from langchain_core.messages import AIMessage
+    from memory import ConversationMemory
+
+    messages = state["messages"]
     
     # Filter out supervisor routing messages
     filtered_messages = [msg for msg in messages if not (isinstance(msg, AIMessage) and "Routing to" in msg.content)]
-    agent_messages = [system_message] + filtered_messages
+    agent_messages = prompt_builder.chat_messages(
+        "finance_agent", ConversationMemory.context_messages(state.get("summary", "")) + filtered_messages
+    )
     
-    response = finance_llm.invoke(agent_messages)
+    response = get_finance_llm().invoke(agent_messages)
     
     return {
-        "messages": [response],
-        "next_agent": state.get("next_agent", "")
+        "messages": [response]
     }
 
 # Router function for supervisor
-def supervisor_router(state: AgentState) -> Literal["it_agent", "finance_agent"]:
-    """Route to the appropriate agent based on supervisor decision."""
-    next_agent = state.get("next_agent", "it_agent")
-    
-    if next_agent == "it_agent":
-        return "it_agent"
-    elif next_agent == "finance_agent":
-        return "finance_agent"
-    else:
-        return "it_agent"
+def supervisor_router(state: AgentState) -> list:
+    """Fan out to every agent the supervisor picked; they run as parallel branches."""
+    return [agent for agent in state.get("next_agents", []) if agent in ("it_agent", "finance_agent")] or ["it_agent"]
 
 
 # Router function for IT agent
 def it_agent_router(state: AgentState) -> Literal["it_tools", "end"]:
     """Route IT agent to tools or end."""
+    from langchain_core.messages import AIMessage
+
     messages = state["messages"]
     last_message = messages[-1] if messages else None
     
@@ -203,6 +293,8 @@ def it_agent_router(state: AgentState) -> Literal["it_tools", "end"]:
 # Router function for Finance agent
 def finance_agent_router(state: AgentState) -> Literal["finance_tools", "end"]:
     """Route Finance agent to tools or end."""
+    from langchain_core.messages import AIMessage
+
     messages = state["messages"]
     last_message = messages[-1] if messages else None
     
@@ -210,68 +302,158 @@ def finance_agent_router(state: AgentState) -> Literal["finance_tools", "end"]:
         return "finance_tools"
     return "end"
 
-# Create tool nodes
-it_tool_node = ToolNode(it_tools)
-finance_tool_node = ToolNode(finance_tools)
-
-# Build the graph
-workflow = StateGraph(AgentState)
-
-# Add nodes
-workflow.add_node("supervisor", supervisor_agent)
-workflow.add_node("it_agent", it_agent)
-workflow.add_node("finance_agent", finance_agent)
-workflow.add_node("it_tools", it_tool_node)
-workflow.add_node("finance_tools", finance_tool_node)
-
-# Set entry point
-workflow.set_entry_point("supervisor")
-
-# Add edges
-workflow.add_conditional_edges(
-    "supervisor",
-    supervisor_router,
-    {
-        "it_agent": "it_agent",
-        "finance_agent": "finance_agent"
-    }
-)
-
-# IT agent routes to tools if tool calls exist, otherwise ends
-workflow.add_conditional_edges(
-    "it_agent",
-    it_agent_router,    
-    {
-        "it_tools": "it_tools",
-        "end": END
-    }
-)
-
-# Finance agent routes to tools if tool calls exist, otherwise ends
-workflow.add_conditional_edges(
-    "finance_agent",
-    finance_agent_router,
-    {
-        "finance_tools": "finance_tools",
-        "end": END
-    }
-)
+def _final_answer(messages: list) -> str:
+    from langchain_core.messages import AIMessage
+
+    for msg in reversed(messages):
+        if isinstance(msg, AIMessage) and not getattr(msg, "tool_calls", None):
+            return msg.content
+    return ""
+
+
+def build_branch(agent_name: str, agent, router, tools_name: str, tools):
+    """Agent <-> tools loop for one domain, run as a single node of the parent graph.
+
+    The branch works on its own copy of the conversation, so its tool calls never
+    interleave with the other branch's; only the final answer is handed back.
+    """
+    from langgraph.graph import StateGraph, END
+    from langgraph.prebuilt import ToolNode
+
+    branch = StateGraph(AgentState)
+    branch.add_node(agent_name, agent)
+    branch.add_node(tools_name, ToolNode(tools))
+    branch.set_entry_point(agent_name)
+    branch.add_conditional_edges(agent_name, router, {tools_name: tools_name, "end": END})
+    branch.add_edge(tools_name, agent_name)
+    return branch.compile()
+
+
+@lru_cache(maxsize=None)
+def get_it_branch():
+    return build_branch("it_agent", it_agent, it_agent_router, "it_tools", get_it_tools())
+
+
+@lru_cache(maxsize=None)
+def get_finance_branch():
+    return build_branch("finance_agent", finance_agent, finance_agent_router, "finance_tools", get_finance_tools())
 
 
-workflow.add_edge("it_tools", "it_agent")
-workflow.add_edge("finance_tools", "finance_agent")
+def it_branch(state: AgentState) -> AgentState:
+    result = get_it_branch().invoke({"messages": state["messages"], "summary": state.get("summary", "")})
+    return {"answers": {"IT": _final_answer(result["messages"])}}
 
 
-app = workflow.compile()
+def finance_branch(state: AgentState) -> AgentState:
+    result = get_finance_branch().invoke({"messages": state["messages"], "summary": state.get("summary", "")})
+    return {"answers": {"Finance": _final_answer(result["messages"])}}
+
+
+prompt_builder.register("synthesize", """The user's question was answered separately by an IT support agent and a Finance support agent.
+Combine their answers into a single reply. Keep every concrete step, date, amount and policy detail,
+remove repetition, and do not add information that is not in the answers.""")
+
+
+def synthesize(state: AgentState) -> AgentState:
+    """Merge the branch answers into one reply; a single branch passes straight through."""
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    answers = {label: text for label, text in (state.get("answers") or {}).items() if text}
+    if not answers:
+        return {"messages": [AIMessage(content="No response generated.")]}
+    if len(answers) == 1:
+        return {"messages": [AIMessage(content=next(iter(answers.values())))]}
+
+    user_query = ""
+    for msg in reversed(state["messages"]):
+        if isinstance(msg, HumanMessage):
+            user_query = msg.content
+            break
+
+    sections = "\n\n".join(f"{label} agent answer:\n{text}" for label, text in answers.items())
+    messages = prompt_builder.chat_messages(
+        "synthesize", [HumanMessage(content=f"User Query: {user_query}\n\n{sections}")]
+    )
+    response = get_llm().invoke(messages)
+    return {"messages": [AIMessage(content=response.content)]}
+
+
+def build_workflow():
+    """Build the supervisor -> parallel domain agents -> synthesis graph."""
+    from langgraph.graph import StateGraph, END
+
+    # Build the graph
+    workflow = StateGraph(AgentState)
+
+    # Add nodes
+    workflow.add_node("memory", memory_node)
+    workflow.add_node("supervisor", supervisor_agent)
+    workflow.add_node("it_agent", it_branch)
+    workflow.add_node("finance_agent", finance_branch)
+    workflow.add_node("synthesize", synthesize)
+
+    # Set entry point
+    workflow.set_entry_point("memory")
+    workflow.add_edge("memory", "supervisor")
+
+    # The supervisor may pick both agents; they then run concurrently in the
+    # same step, and synthesize runs once after both have finished.
+    workflow.add_conditional_edges(
+        "supervisor",
+        supervisor_router,
+        ["it_agent", "finance_agent"]
+    )
+
+    workflow.add_edge("it_agent", "synthesize")
+    workflow.add_edge("finance_agent", "synthesize")
+    workflow.add_edge("synthesize", END)
+    return workflow
+
+
+@lru_cache(maxsize=None)
+def get_app():
+    """Graph compiled with the session checkpointer."""
+    from memory import create_checkpointer
+
+    return build_workflow().compile(checkpointer=create_checkpointer())
+
+
+@lru_cache(maxsize=None)
+def get_stateless_app():
+    """One-shot queries don't need a persisted session."""
+    return build_workflow().compile()
+
+
+TEST_QUERIES = [
+    "How to set up VPN?",
+    "What software is approved for use?",
+    "How to file a reimbursement?",
+    "When is payroll processed?",
+    "Can I expense the VPN software licence?",
+]
+
+
+def run_query(query: str, session_id: str = None, callbacks: list = None):
+    """Run a query through the multi-agent system.
+
+    Pass the same session_id across calls to continue a conversation; the
+    session is persisted by the checkpointer. Without one, the query runs
+    as a single stateless turn. `callbacks` (e.g. a cassette.NodeTimer) are
+    attached to the whole graph run.
+    """
+    from langchain_core.messages import AIMessage, HumanMessage
 
-def run_query(query: str):
-    """Run a query through the multi-agent system."""
     initial_state = {
         "messages": [HumanMessage(content=query)],
-        "next_agent": ""
+        "next_agents": []
     }
     
-    result = app.invoke(initial_state)
+    config = {"callbacks": callbacks or []}
+    if session_id:
+        config["configurable"] = {"thread_id": session_id}
+        result = get_app().invoke(initial_state, config=config)
+    else:
+        result = get_stateless_app().invoke(initial_state, config=config)
     
     final_messages = result["messages"]
     for msg in reversed(final_messages):
@@ -285,20 +467,23 @@ if __name__ == "__main__":
     os.makedirs(IT_DOCS_DIR, exist_ok=True)
     os.makedirs(FINANCE_DOCS_DIR, exist_ok=True)
     
-    test_queries = [
-        "How to set up VPN?",
-        "What software is approved for use?",
-        "How to file a reimbursement?",
-        "When is payroll processed?",
-    ]
-    
     print("=" * 70)
     print("Multi-Agent Support System")
     print("=" * 70)
     
-    for query in test_queries:
+    for query in TEST_QUERIES:
         print(f"\nQuery: {query}")
         print("-" * 70)
         response = run_query(query)
         print(f"Response: {response}")
         print("=" * 70)
+    
+    from llm_cache import get_llm_cache
+    
+    if get_llm_cache() is not None:
+        print(f"LLM cache: {get_llm_cache().stats()}")
+    from cassette import get_cassette
+    
+    if get_cassette() is not None:
+        print(f"Cassette: {get_cassette().stats()}")
+    prompt_builder.print_prefix_report()
@@ -0,0 +1,61 @@
+import os
+
+from doc_index import DocumentIndex, format_results, split_sections, tokenize
+
+VPN = """VPN Setup Guide
+
+Mac:
+Install the client from the self-service portal.
+Sign in with your company account.
+
+Windows:
+Download the installer from the IT portal.
+Run it as administrator.
+"""
+
+
+def write(path, text):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def test_tokenize_drops_stopwords():
+    assert tokenize("How do I set up the VPN?") == ["set", "up", "vpn"]
+
+
+def test_split_sections_uses_headings():
+    sections = split_sections("vpn_setup.md", VPN)
+    assert [s.heading for s in sections] == ["Mac", "Windows"]
+    assert {s.title for s in sections} == {"VPN Setup Guide"}
+    # The file stem is indexed with every section.
+    assert all(s.terms["setup"] for s in sections)
+
+
+def test_search_ranks_matching_section_first(tmp_path):
+    write(tmp_path / "vpn_setup.md", VPN)
+    write(tmp_path / "laptop_policy.txt", "Laptop Policy\n\nLaptops are replaced every three years.\nAsk IT.")
+    write(tmp_path / "notes.csv", "vpn,vpn,vpn")
+    index = DocumentIndex(str(tmp_path))
+    assert index.filenames() == ["laptop_policy.txt", "vpn_setup.md"]
+
+    (score, best), = index.search("vpn windows installer", k=1)
+    assert (best.filename, best.heading) == ("vpn_setup.md", "Windows")
+    assert "[vpn_setup.md > Windows]" in format_results([(score, best)])
+    assert index.search("printer toner") == []
+
+
+def test_refresh_only_rereads_changed_files(tmp_path):
+    write(tmp_path / "vpn_setup.md", VPN)
+    write(tmp_path / "laptop_policy.txt", "Laptop Policy\n\nLaptops are replaced every three years.\nAsk IT.")
+    index = DocumentIndex(str(tmp_path))
+    assert index.disk_reads == 2
+    assert not index.refresh()
+
+    write(tmp_path / "laptop_policy.txt", "Laptop Policy\n\nLaptops are replaced every four years.\nAsk IT.")
+    os.remove(tmp_path / "vpn_setup.md")
+    assert "four years" in index.get_file("laptop_policy.txt")
+    assert index.disk_reads == 3
+    assert index.filenames() == ["laptop_policy.txt"]
+    assert index.get_file("vpn_setup.md") is None
@@ -0,0 +1,63 @@
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, SystemMessage, ToolMessage
+
+from memory import ConversationMemory, estimate_tokens, render_turns, split_turns, truncate_to_tokens
+
+
+class FakeSummarizer:
+    def __init__(self, reply: str):
+        self.reply = reply
+        self.prompts = []
+
+    def invoke(self, messages):
+        self.prompts.append(messages[0].content)
+        return AIMessage(content=self.reply)
+
+
+def conversation(n_turns: int) -> list:
+    messages = []
+    for i in range(n_turns):
+        messages.append(HumanMessage(content=f"question {i}", id=f"h{i}"))
+        messages.append(AIMessage(content=f"answer {i}", id=f"a{i}"))
+    return messages
+
+
+def test_token_helpers():
+    assert estimate_tokens("abcd" * 10) == 10
+    assert truncate_to_tokens("short", 10) == "short"
+    assert truncate_to_tokens("word " * 20, 3) == "word word ..."
+
+
+def test_split_and_render_turns():
+    messages = [
+        HumanMessage(content="vpn broken"),
+        AIMessage(content="", tool_calls=[{"name": "ReadFile", "args": {}, "id": "t1"}]),
+        ToolMessage(content="Restart the client.", tool_call_id="t1"),
+        AIMessage(content="Restart the VPN client."),
+        HumanMessage(content="thanks"),
+    ]
+    turns = split_turns(messages)
+    assert [len(t) for t in turns] == [4, 1]
+    assert render_turns(turns) == ("User: vpn broken\nTool result: Restart the client.\n"
+                                   "Agent: Restart the VPN client.\nUser: thanks")
+
+
+def test_compact_keeps_recent_turns_and_summarizes_older_ones():
+    llm = FakeSummarizer("User asked questions 0 and 1.")
+    memory = ConversationMemory(summarize_llm=llm, max_turns=2)
+    assert memory.compact(conversation(2)) == {}
+
+    update = memory.compact(conversation(4), summary="Earlier: greeting.")
+    assert [m.id for m in update["messages"]] == ["h0", "a0", "h1", "a1"]
+    assert all(isinstance(m, RemoveMessage) for m in update["messages"])
+    assert update["summary"] == "User asked questions 0 and 1."
+    assert "Earlier: greeting." in llm.prompts[0] and "User: question 1" in llm.prompts[0]
+    assert "question 2" not in llm.prompts[0]
+
+
+def test_summary_without_model_is_capped():
+    memory = ConversationMemory(max_turns=1, summary_token_cap=5)
+    summary = memory.compact(conversation(3))["summary"]
+    assert len(summary) <= 20 and summary.endswith("answer 1")
+    assert ConversationMemory.context_messages("") == []
+    (msg,) = ConversationMemory.context_messages(summary)
+    assert isinstance(msg, SystemMessage) and summary in msg.content
@@ -0,0 +1,12 @@
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_import_defers_langgraph_and_langchain():
+    code = ("import sys, multi_agent_system; "
+            "print(sorted(m for m in ('langgraph', 'langchain_core', 'memory') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
@@ -0,0 +1,70 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from search_cache import CachedSearch, SearchCache, normalize_query
+
+
+class FakeSearch:
+    def __init__(self, gate: threading.Event = None):
+        self.gate = gate
+        self.calls = []
+
+    def run(self, query: str) -> str:
+        self.calls.append(query)
+        if self.gate is not None:
+            self.gate.wait(5)
+        return f"results for {normalize_query(query)}"
+
+
+def test_normalize_query():
+    assert normalize_query('  "Hiring   TRENDS 2026?" ') == "hiring trends 2026"
+
+
+def test_concurrent_identical_queries_share_one_call(tmp_path):
+    backend = FakeSearch(threading.Event())
+    search = CachedSearch(backend.run, SearchCache(str(tmp_path / "s.sqlite3")))
+    with ThreadPoolExecutor(4) as pool:
+        futures = [pool.submit(search.run, q) for q in ["vpn setup", "VPN setup?", " vpn  setup", "vpn setup"]]
+        while search.coalesced < 3:
+            time.sleep(0.01)
+        backend.gate.set()
+        assert {f.result() for f in futures} == {"results for vpn setup"}
+    assert len(backend.calls) == 1
+    assert search.run("vpn setup") == "results for vpn setup"
+    assert search.stats() == {"hits": 1, "misses": 1, "coalesced": 3, "entries": 1}
+
+
+def test_errors_reach_the_caller_and_are_not_cached(tmp_path):
+    def broken(query):
+        raise RuntimeError("rate limited")
+
+    search = CachedSearch(broken, SearchCache(str(tmp_path / "s.sqlite3")))
+    with pytest.raises(RuntimeError):
+        search.run("payroll")
+    assert len(search.cache) == 0
+
+
+def test_ttl_and_lru_cap(tmp_path):
+    cache = SearchCache(str(tmp_path / "s.sqlite3"), ttl_seconds=60, max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ("1", None, "3")
+
+    expired = SearchCache(str(tmp_path / "e.sqlite3"), ttl_seconds=0)
+    expired.set("a", "1")
+    time.sleep(0.01)
+    assert expired.get("a") is None
+
+
+def test_results_survive_restart(tmp_path):
+    path = str(tmp_path / "s.sqlite3")
+    backend = FakeSearch()
+    CachedSearch(backend.run, SearchCache(path)).run("attrition benchmarks")
+    restarted = CachedSearch(backend.run, SearchCache(path))
+    assert restarted.run("Attrition benchmarks") == "results for attrition benchmarks"
+    assert len(backend.calls) == 1
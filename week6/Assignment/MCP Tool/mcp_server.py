@@ -2,23 +2,21 @@ from mcp.server.fastmcp import FastMCP
 
 import os
 import pickle
-import io
-import re
 
 from google.auth.transport.requests import Request
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseDownload
-from PyPDF2 import PdfReader
+
+from drive_index import DriveDocIndex, build_drive_index, format_hits
 
 
 mcp = FastMCP("GoogleDocsMCP")
 
-INSURANCE_DOCS_CONTENT = ""
+INSURANCE_INDEX = DriveDocIndex()
 SCOPES = ["https://www.googleapis.com/auth/drive.readonly"]
 
 def load_google_drive_docs():
-    global INSURANCE_DOCS_CONTENT
+    global INSURANCE_INDEX
 
     creds = None
     token_path = "token.pickle"
@@ -43,70 +41,45 @@ def load_google_drive_docs():
         with open(token_path, "wb") as f:
             pickle.dump(creds, f)
 
-    service = build("drive", "v3", credentials=creds)
-
-    file_id = os.getenv("GOOGLE_DRIVE_FILE_ID")
-    if not file_id:
-        raise RuntimeError("GOOGLE_DRIVE_FILE_ID not set")
-
-    meta = service.files().get(
-        fileId=file_id,
-        fields="mimeType",
-    ).execute()
-
-    mime_type = meta["mimeType"]
-
-    if "google-apps.document" in mime_type:
-        request = service.files().export_media(
-            fileId=file_id,
-            mimeType="text/plain",
-        )
-        buf = io.BytesIO()
-        downloader = MediaIoBaseDownload(buf, request)
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-        INSURANCE_DOCS_CONTENT = buf.getvalue().decode("utf-8", errors="ignore")
-
-    elif "pdf" in mime_type.lower():
-        request = service.files().get_media(fileId=file_id)
-        buf = io.BytesIO()
-        downloader = MediaIoBaseDownload(buf, request)
-        done = False
-        while not done:
-            _, done = downloader.next_chunk()
-
-        reader = PdfReader(buf)
-        pages = []
-        for i, page in enumerate(reader.pages, 1):
-            text = page.extract_text()
-            if text:
-                pages.append(text)
-        INSURANCE_DOCS_CONTENT = "\n".join(pages)
-
-    else:
-        raise RuntimeError("Unsupported file type")
+    folder_id = os.getenv("GOOGLE_DRIVE_FOLDER_ID")
+    file_ids = [f.strip() for f in os.getenv("GOOGLE_DRIVE_FILE_ID", "").split(",") if f.strip()]
+    if not folder_id and not file_ids:
+        raise RuntimeError("GOOGLE_DRIVE_FOLDER_ID or GOOGLE_DRIVE_FILE_ID not set")
+
+    # One Drive client per download thread; googleapiclient services are not thread-safe.
+    INSURANCE_INDEX = build_drive_index(
+        lambda: build("drive", "v3", credentials=creds),
+        folder_id=folder_id,
+        file_ids=file_ids,
+        max_workers=int(os.getenv("GOOGLE_DRIVE_MAX_WORKERS", "8")),
+    )
+    if not len(INSURANCE_INDEX):
+        raise RuntimeError(f"No documents could be loaded: {INSURANCE_INDEX.errors}")
 
 
 @mcp.tool()
 def search_insurance_docs(query: str) -> str:
     """Search insurance documents from Google Drive."""
-    if not INSURANCE_DOCS_CONTENT:
+    if not len(INSURANCE_INDEX):
         return "No documents loaded."
 
-    words = query.lower().split()
-    sentences = re.split(r"[.!?\n]+", INSURANCE_DOCS_CONTENT)
+    hits = INSURANCE_INDEX.search(query, k=5)
+    if not hits:
+        return "No relevant information found."
 
-    matches = [
-        s.strip()
-        for s in sentences
-        if s.strip() and any(w in s.lower() for w in words)
-    ]
+    return format_hits(hits)
 
-    if not matches:
-        return "No relevant information found."
 
-    return "\n\n".join(matches[:5])
+@mcp.tool()
+def search_insurance_docs_batch(queries: list[str]) -> str:
+    """Search insurance documents from Google Drive for several queries in one call."""
+    if not len(INSURANCE_INDEX):
+        return "No documents loaded."
+
+    return "\n\n".join(
+        f"### {query}\n{format_hits(hits) or 'No relevant information found.'}"
+        for query, hits in INSURANCE_INDEX.search_batch(queries, k=5).items()
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,17 @@
+from drive_index import FakeDownloader, FakeDriveService, build_drive_index
+
+
+def test_indexes_supported_files_and_records_the_rest():
+    fake = FakeDriveService({
+        "a": ("Health Plan.txt", "text/plain", b"Hospital expenses are covered. Dental is excluded.", "folder"),
+        "b": ("Dependents", "application/vnd.google-apps.document", b"Parents need the premium add-on.", "folder"),
+        "c": ("Claims.csv", "text/csv", b"claim,limit\nhospital,500000", "folder"),
+        "d": ("Card.png", "image/png", b"\x89PNG hospital", "folder"),
+        "e": ("Extra.txt", "text/plain", b"Maternity is covered after two years.", "elsewhere"),
+    })
+    index = build_drive_index(lambda: fake, folder_id="folder", file_ids=["e"], downloader=FakeDownloader)
+
+    assert sorted(index.documents) == ["a", "b", "c", "e"]
+    assert index.errors == {"d": "Unsupported file type: image/png"}
+    assert index.search("add parents", k=1) == [("Dependents", "Parents need the premium add-on")]
+    assert {name for name, _ in index.search("hospital")} == {"Health Plan.txt", "Claims.csv"}
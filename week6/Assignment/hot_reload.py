@@ -0,0 +1,163 @@
+"""
+Hot reload of the knowledge shards from their source files.
+
+A FileWatcher follows the HR policy PDFs and the IT / finance document
+folders. Each settled batch of changes is mapped to the shard that owns the
+files, only those files are re-extracted, chunked and embedded, and the shard
+is rebuilt as a new generation and swapped in together with its routing
+centroid (ShardedCollections.rebuild_shard). Searches keep being served from
+the previous generation until the swap, so the serving path never waits on a
+reload.
+
+PDF chunks go through the same MinHash dedup as ingest_pdfs, seeded with
+the chunks the shard keeps from other files. The (mtime, size) of every file
+as last indexed is kept in shard_sources.json in the persist directory, so on
+start the files added, modified or deleted while the process was down are
+reloaded the same way; rows whose source file no longer exists are dropped
+even without that record.
+"""
+
+import json
+import os
+import time
+
+from file_watch import FileWatcher, diff, snapshot
+from sharded_store import load_text_files
+
+SOURCES_FILE = "shard_sources.json"
+EXTENSIONS = (".pdf", ".txt", ".md")
+
+
+class ShardReloader:
+    def __init__(self, shards, pdf_files: list, text_dirs: dict, interval: float = 2.0,
+                 max_workers: int = None, pdf_domain: str = "hr", dedup_threshold: float = 0.9):
+        self.shards = shards
+        self.pdf_files = list(pdf_files)
+        self.text_dirs = dict(text_dirs)
+        self.pdf_domain = pdf_domain
+        self.max_workers = max_workers
+        self.dedup_threshold = dedup_threshold
+        self.watcher = FileWatcher(
+            self.pdf_files + list(self.text_dirs.values()),
+            self.reload,
+            extensions=EXTENSIONS,
+            interval=interval,
+        )
+        self._sources_path = os.path.join(shards.persist_directory, SOURCES_FILE)
+        self.reloads = 0
+        self.reindexed_files = 0
+        self.last_reload_seconds = 0.0
+
+    def _domain_of(self, path: str):
+        if path in self.pdf_files:
+            return self.pdf_domain
+        for domain, directory in self.text_dirs.items():
+            if os.path.dirname(path) == directory:
+                return domain
+        return None
+
+    def _source_of(self, domain: str, path: str) -> str:
+        # ingest keeps the PDF path as given; text shards store the bare file name
+        return path if domain == self.pdf_domain else os.path.basename(path)
+
+    def _load(self, domain: str, paths: list, replaced: set) -> tuple:
+        """(chunks, ids) for the given files; ids None means the shard's content-derived ids."""
+        if domain == self.pdf_domain:
+            from ingest import chunk_id, unique_chunks
+
+            chunks, _ = unique_chunks(paths, self.max_workers, dedup_threshold=self.dedup_threshold,
+                                      seen_texts=self.shards.texts(domain, exclude_sources=replaced))
+            docs = list(chunks)
+            return docs, [chunk_id(doc) for doc in docs]
+        return load_text_files(paths), None
+
+    def _load_indexed(self):
+        """path -> [mtime_ns, size] of each file as last indexed, or None before the first run."""
+        try:
+            with open(self._sources_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _save_indexed(self, indexed: dict):
+        os.makedirs(os.path.dirname(self._sources_path) or ".", exist_ok=True)
+        with open(self._sources_path + ".tmp", "w") as f:
+            json.dump(indexed, f, indent=2, sort_keys=True)
+        os.replace(self._sources_path + ".tmp", self._sources_path)
+
+    def reload(self, changes):
+        """FileWatcher callback: rebuild each shard touched by the batch."""
+        start = time.perf_counter()
+        by_domain = {}
+        for path in changes.paths():
+            domain = self._domain_of(path)
+            if domain is not None:
+                by_domain.setdefault(domain, []).append(path)
+
+        indexed = self._load_indexed() or {}
+        for domain, paths in by_domain.items():
+            # Stat before reading, so a write that lands mid-reload is picked up again.
+            stats = snapshot(paths)
+            replaced = {self._source_of(domain, p) for p in paths}
+            present = [p for p in paths if p in stats]
+            docs, ids = self._load(domain, present, replaced) if present else ([], None)
+            count = self.shards.rebuild_shard(domain, replaced, docs, ids)
+            for path in paths:
+                if path in stats:
+                    indexed[path] = list(stats[path])
+                else:
+                    indexed.pop(path, None)
+            self._save_indexed(indexed)
+            self.reindexed_files += len(paths)
+            print(f"Hot reload: '{domain}' shard swapped in after {len(paths)} changed file(s) "
+                  f"({len(docs)} chunks embedded, {count} total)")
+
+        self.reloads += 1
+        self.last_reload_seconds = time.perf_counter() - start
+
+    def reconcile(self):
+        """Catch up with files changed while the process was down.
+
+        Files whose (mtime, size) differs from when they were last indexed are
+        reloaded. Without a record from an earlier run, the current files are
+        taken as indexed (get_shards() has just ingested them) and only rows
+        for deleted files are dropped.
+        """
+        current = snapshot(self.watcher.paths, EXTENSIONS)
+        indexed = self._load_indexed()
+        if indexed is None:
+            self._save_indexed({path: list(stat) for path, stat in current.items()})
+        else:
+            changes = diff({path: tuple(stat) for path, stat in indexed.items()}, current)
+            if changes:
+                print(f"Hot reload: {len(changes.paths())} file(s) changed while stopped")
+                self.reload(changes)
+
+        for domain in [self.pdf_domain, *self.text_dirs]:
+            directory = self.text_dirs.get(domain)
+            stale = {
+                source for source in self.shards.sources(domain)
+                if source and not os.path.exists(source if directory is None else os.path.join(directory, source))
+            }
+            if stale:
+                self.shards.rebuild_shard(domain, stale, [])
+                print(f"Hot reload: removed {len(stale)} deleted source(s) from the '{domain}' shard")
+
+    def start(self) -> "ShardReloader":
+        self.reconcile()
+        self.watcher.start()
+        print(f"Hot reload: watching {len(self.watcher.paths)} path(s) ({self.watcher.mode})")
+        return self
+
+    def stop(self):
+        self.watcher.stop()
+        self.shards.retire_old_generations()
+
+    def stats(self) -> dict:
+        return {
+            "reloads": self.reloads,
+            "reindexed_files": self.reindexed_files,
+            "last_reload_s": round(self.last_reload_seconds, 2),
+            "shard_rebuilds": self.shards.rebuilds,
+            "errors": self.watcher.errors,
+        }
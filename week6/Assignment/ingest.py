@@ -0,0 +1,161 @@
+"""
+Streaming PDF ingestion into Chroma.
+
+Pages are extracted in a process pool (a few pages per task, with a bounded
+number of tasks in flight), split into chunks as they arrive, and embedded and
+upserted into Chroma in fixed-size batches. Peak memory is bounded by the
+batch size and the number of in-flight tasks rather than by the corpus size.
+"""
+
+import hashlib
+import itertools
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from pypdf import PdfReader
+
+from dedup import MinHashDeduplicator
+from metadata_filter import enrich_metadata
+
+
+def _extract_pages(path: str, start: int, end: int) -> list:
+    """Worker: extract pages [start, end) of a PDF as (text, metadata) pairs.
+
+    Metadata matches PyPDFLoader's (source, page) so downstream code is unchanged.
+    """
+    reader = PdfReader(path)
+    pages = []
+    for page_num in range(start, min(end, len(reader.pages))):
+        text = reader.pages[page_num].extract_text() or ""
+        pages.append((text, {"source": path, "page": page_num}))
+    return pages
+
+
+def _page_tasks(pdf_files: list, pages_per_task: int):
+    for path in pdf_files:
+        if not os.path.exists(path):
+            print(f"Skipping missing file {path}")
+            continue
+        num_pages = len(PdfReader(path).pages)
+        print(f"Queueing {path} ({num_pages} pages)...")
+        for start in range(0, num_pages, pages_per_task):
+            yield path, start, start + pages_per_task
+
+
+def iter_pages(pdf_files: list, max_workers: int = None, pages_per_task: int = 4):
+    """Yield page Documents from a process pool, in document order.
+
+    Tasks finish out of order, so finished ones wait until the tasks before
+    them are yielded; at most 2x workers tasks are running or waiting. The
+    fixed order keeps which of two near-duplicate chunks survives dedup the
+    same from run to run.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    window = max_workers * 2
+    tasks = enumerate(_page_tasks(pdf_files, pages_per_task))
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        running = {}  # future -> task index
+        finished = {}  # task index -> pages
+        next_index = 0
+
+        def submit() -> bool:
+            task = next(tasks, None)
+            if task is None:
+                return False
+            index, args = task
+            running[pool.submit(_extract_pages, *args)] = index
+            return True
+
+        while len(running) < window and submit():
+            pass
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                finished[running.pop(future)] = future.result()
+            while next_index in finished:
+                for text, metadata in finished.pop(next_index):
+                    yield Document(page_content=text, metadata=metadata)
+                next_index += 1
+            while len(running) + len(finished) < window and submit():
+                pass
+
+
+def iter_chunks(pages, splitter=None):
+    """Split each page into chunks as it streams through."""
+    splitter = splitter or RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=150)
+    for page in pages:
+        if not page.page_content.strip():
+            continue
+        # enrich_metadata adds the doc_type / year fields used by retrieval filters
+        for i, chunk in enumerate(enrich_metadata(splitter.split_documents([page]))):
+            chunk.metadata["chunk"] = i
+            yield chunk
+
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def unique_chunks(pdf_files: list, max_workers: int = None, splitter=None, dedup_threshold: float = 0.9,
+                  seen_texts=()) -> tuple:
+    """Stream the chunks of PDFs with near-duplicates dropped; returns (chunks, dedup).
+
+    A chunk is dropped when it near-duplicates an earlier chunk or one of
+    `seen_texts` (chunks already stored from other files). With
+    dedup_threshold=None every chunk is kept and dedup is None.
+    """
+    chunks = iter_chunks(iter_pages(pdf_files, max_workers=max_workers), splitter)
+    if dedup_threshold is None:
+        return chunks, None
+    dedup = MinHashDeduplicator(threshold=dedup_threshold)
+    for text in seen_texts:
+        dedup.is_duplicate(text)
+    return (chunk for chunk in chunks if not dedup.is_duplicate(chunk.page_content)), dedup
+
+
+def chunk_id(doc: Document) -> str:
+    """Stable id so re-ingesting the same file upserts instead of duplicating."""
+    key = f"{doc.metadata.get('source')}:{doc.metadata.get('page')}:{doc.metadata.get('chunk')}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()
+
+
+def ingest_pdfs(pdf_files: list, embeddings, persist_directory: str, batch_size: int = 64,
+                max_workers: int = None, splitter=None, dedup_threshold: float = 0.9,
+                collection_metadata: dict = None, collection_name: str = "langchain"):
+    """Stream PDFs into a persisted Chroma collection and return the vectorstore.
+
+    Chunks that near-duplicate an earlier chunk (repeated headers/footers,
+    boilerplate pages) are dropped before embedding; pass dedup_threshold=None
+    to keep everything. collection_metadata (e.g. HNSW settings) applies only
+    when the collection is created.
+    """
+    db = Chroma(
+        collection_name=collection_name,
+        persist_directory=persist_directory,
+        embedding_function=embeddings,
+        collection_metadata=collection_metadata,
+    )
+    chunks, dedup = unique_chunks(pdf_files, max_workers, splitter, dedup_threshold)
+
+    total = 0
+    for batch in batched(chunks, batch_size):
+        ids = [chunk_id(doc) for doc in batch]
+        db.add_texts(
+            texts=[doc.page_content for doc in batch],
+            metadatas=[doc.metadata for doc in batch],
+            ids=ids,
+        )
+        total += len(batch)
+        print(f"Upserted {total} chunks...")
+
+    if total == 0:
+        raise ValueError("No documents found to load")
+    print(f"Ingested {total} chunks from {len(pdf_files)} file(s)")
+    if dedup is not None:
+        print(f"Dedup: {dedup.report()}")
+    return db
@@ -1,59 +1,117 @@
 import os
+import sys
 import asyncio
-import requests
+import argparse
+from functools import lru_cache
 
-from langfuse import get_client
-from langfuse.langchain import CallbackHandler
+# llm_scheduler, llm_cache, cassette and prompt_builder live in the repo-level shared/ directory.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
 
-from langchain_community.document_loaders import PyPDFLoader
-from langchain_community.vectorstores import Chroma
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.tools import DuckDuckGoSearchRun
+from search_cache import CachedSearch
 
-from langchain_openai import AzureChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain.tools import Tool
-from langchain.agents import AgentExecutor, create_react_agent
+# Importing this module must stay cheap (and side-effect free: ingestion
+# workers re-import it). The embedding model, vectorstore, MCP tool discovery,
+# LLM, agent and guardrails are all built on first use by the get_* factories
+# below, which also defer the heavy langchain / langfuse / nemoguardrails imports
+# (and requests, used only for MCP calls).
 
-from nemoguardrails import LLMRails, RailsConfig
 
+@lru_cache(maxsize=None)
+def get_langfuse():
+    from langfuse import get_client
 
+    return get_client()
 
 
-langfuse = get_client()
-langfuse_handler = CallbackHandler()
+@lru_cache(maxsize=None)
+def get_langfuse_handler():
+    from langfuse.langchain import CallbackHandler
+
+    get_langfuse()
+    return CallbackHandler()
 
 EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 
-embeddings = HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
 
-docs = []
+@lru_cache(maxsize=None)
+def get_embeddings():
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    return HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL)
+
 pdf_files = ["Hybrid Work Policy 2026.pdf"]
 
-for file in pdf_files:
-    loader = PyPDFLoader(file)
-    docs.extend(loader.load())
+KNOWLEDGE_DIR = "./vectorstore"
+_here = os.path.dirname(os.path.abspath(__file__))
+TEXT_SHARD_SOURCES = {
+    "it": os.path.join(_here, "..", "..", "week5", "multi_agent_support", "it_docs"),
+    "finance": os.path.join(_here, "..", "..", "week5", "multi_agent_support", "finance_docs"),
+}
+
+
+@lru_cache(maxsize=None)
+def get_shards():
+    """Build the per-domain collections on first use.
+
+    Ingestion runs in a process pool, so it must not happen at import time:
+    spawned workers re-import this module. Re-running is idempotent (ids are stable).
+    """
+    from ingest import ingest_pdfs
+    from sharded_store import ShardedCollections
+
+    shards = ShardedCollections(KNOWLEDGE_DIR, get_embeddings())
+    stale = shards.drop_stale_generations()
+    if stale:
+        print(f"Dropped {len(stale)} superseded shard generation(s): {', '.join(stale)}")
+    # Hot reload may have swapped in a newer generation of the HR collection.
+    ingest_pdfs(pdf_files, get_embeddings(), KNOWLEDGE_DIR, collection_name=shards.collection_name("hr"))
+    for domain, directory in TEXT_SHARD_SOURCES.items():
+        if os.path.isdir(directory):
+            shards.add_text_dir(domain, directory)
+    return shards
+
 
-db = Chroma.from_documents(
-    docs,
-    embedding=embeddings,
-    persist_directory="./vectorstore"
-)
-db.persist()
+# Reindex changed PDFs / docs in the background instead of needing a restart.
+HOT_RELOAD = os.getenv("HOT_RELOAD", "0") == "1"
 
 
-def hr_policy_search(query: str) -> str:
-    results = db.similarity_search(query, k=3)
-    return "\n".join(r.page_content for r in results)
+@lru_cache(maxsize=None)
+def get_reloader():
+    from hot_reload import ShardReloader
 
+    return ShardReloader(get_shards(), pdf_files, {
+        domain: directory for domain, directory in TEXT_SHARD_SOURCES.items() if os.path.isdir(directory)
+    }).start()
 
-web_search = DuckDuckGoSearchRun()
+
+def hr_policy_search(query: str, filter: dict = None) -> str:
+    from metadata_filter import parse_filter_suffix
+
+    if filter is None:
+        query, filter = parse_filter_suffix(query)
+    results = get_shards().search(query, k=3, domains=["hr"], filter=filter)
+    return "\n".join(doc.page_content for doc, _ in results)
+
+
+def knowledge_search(query: str) -> str:
+    """Routed search over the domain shards most relevant to the query."""
+    results = get_shards().search(query, k=4, top_n=2)
+    return "\n\n".join(f"[{doc.metadata.get('domain')}] {doc.page_content}" for doc, _ in results)
+
+
+@lru_cache(maxsize=None)
+def get_web_search() -> CachedSearch:
+    from langchain_community.tools import DuckDuckGoSearchRun
+
+    return CachedSearch(DuckDuckGoSearchRun().run)
 
 MCP_BASE_URL = "http://127.0.0.1:8000/mcp"
 
 
 def mcp_invoke_tool(tool_name: str, arguments: dict) -> str:
     """Invoke an MCP tool over HTTP"""
+    import requests
+
     response = requests.post(
         f"{MCP_BASE_URL}/tools/{tool_name}/invoke",
         json={"arguments": arguments},
@@ -71,18 +129,40 @@ def mcp_invoke_tool(tool_name: str, arguments: dict) -> str:
     return str(data.get("content", ""))
 
 
-def load_mcp_tools() -> list[Tool]:
+def load_mcp_tools() -> list:
     """Discover MCP tools and wrap them as LangChain tools"""
-    response = requests.get(f"{MCP_BASE_URL}/tools", timeout=10)
-    response.raise_for_status()
+    from langchain.tools import Tool
+    from cassette import get_cassette
+
+    def discover() -> list:
+        import requests
+
+        response = requests.get(f"{MCP_BASE_URL}/tools", timeout=10)
+        response.raise_for_status()
+        return response.json()
+
+    # Discovery is part of the recorded session, so a replay needs no MCP server.
+    cassette = get_cassette()
+    tool_defs = cassette.call("http", f"{MCP_BASE_URL}/tools", discover) if cassette is not None else discover()
 
-    mcp_tools: list[Tool] = []
+    mcp_tools = []
 
-    for tool_def in response.json():
+    for tool_def in tool_defs:
         tool_name = tool_def["name"]
         description = tool_def.get("description", "")
 
-        def make_tool(name: str):
+        properties = tool_def.get("inputSchema", {}).get("properties", {})
+
+        def make_tool(name: str, description: str, batch: bool):
+            if batch:
+                # Batch tools take a list; the agent passes queries separated by ';'
+                return Tool(
+                    name=name,
+                    description=f"{description} Separate multiple queries with ';'.",
+                    func=lambda query, n=name: mcp_invoke_tool(
+                        n, {"queries": [q.strip() for q in query.split(";") if q.strip()]}
+                    ),
+                )
             return Tool(
                 name=name,
                 description=description,
@@ -91,92 +171,145 @@ def load_mcp_tools() -> list[Tool]:
                 ),
             )
 
-        mcp_tools.append(make_tool(tool_name))
+        mcp_tools.append(make_tool(tool_name, description, "queries" in properties))
 
     return mcp_tools
 
 
-mcp_tools = load_mcp_tools()
+@lru_cache(maxsize=None)
+def get_llm():
+    from llm_scheduler import ScheduledAzureChatOpenAI
 
+    return ScheduledAzureChatOpenAI(
+        azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
+        api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
+        azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
+        api_key=os.getenv("AZURE_OPENAI_API_KEY"),
+        temperature=0,
+    )
 
 
-llm = AzureChatOpenAI(
-    azure_deployment=os.getenv("AZURE_OPENAI_DEPLOYMENT_NAME"),
-    api_version=os.getenv("AZURE_OPENAI_API_VERSION"),
-    azure_endpoint=os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_key=os.getenv("AZURE_OPENAI_API_KEY"),
-    temperature=0,
-)
-
-tools = [
-    Tool(
-        name="HR_Policy_Search",
-        func=hr_policy_search,
-        description="Search HR policy documents for internal policies and guidelines",
-    ),
-    Tool(
-        name="Web_Search",
-        func=web_search.run,
-        description="Fetch industry benchmarks and external information",
-    ),
-    *mcp_tools,
-]
-
-
+# Local searches only: Web_Search would send unvetted input to DuckDuckGo.
+READ_ONLY_TOOLS = {"HR_Policy_Search", "Internal_Knowledge_Search"}
+
+# Start the agent concurrently with the input rails instead of after them.
+SPECULATIVE_AGENT = os.getenv("SPECULATIVE_AGENT", "0") == "1"
+
+
+@lru_cache(maxsize=None)
+def get_tools() -> list:
+    from langchain.tools import Tool
+    from cassette import cassette_tools
+    from react_memo import memoize_tools
+    from speculation import gate_side_effects
+
+    # Tools outside READ_ONLY_TOOLS (web search, the MCP tools) wait for the input rails'
+    # verdict when the agent runs speculatively. Tool calls are recorded /
+    # replayed when CASSETTE_MODE is set.
+    return memoize_tools(gate_side_effects(cassette_tools([
+        Tool(
+            name="HR_Policy_Search",
+            func=hr_policy_search,
+            description="Search HR policy documents for internal policies and guidelines. "
+                        "Append filters after a pipe to narrow the search, e.g. 'leave policy | year=2026' or '... | page=3'",
+        ),
+        Tool(
+            name="Internal_Knowledge_Search",
+            func=knowledge_search,
+            description="Search all internal knowledge (HR, IT and finance documents); the query is routed to the most relevant domains. "
+                        "For insurance questions use the insurance document tools",
+        ),
+        Tool(
+            name="Web_Search",
+            func=get_web_search().run,
+            description="Fetch industry benchmarks and external information",
+        ),
+        *load_mcp_tools(),
+    ]), READ_ONLY_TOOLS))
+
+
+@lru_cache(maxsize=None)
+def get_agent_executor():
+    from langchain.agents import create_react_agent
+    from prompt_builder import react_prompt
+    from react_memo import MemoizedAgentExecutor
+
+    # Shared ReAct template: static instructions, then tools, then the question.
+    prompt = react_prompt("assistant_react_agent")
+    llm = get_llm()
+    tools = get_tools()
+
+    agent = create_react_agent(llm, tools, prompt)
+
+    return MemoizedAgentExecutor(
+        agent=agent,
+        tools=tools,
+        verbose=True,
+        max_iterations=10,
+        handle_parsing_errors=True,
+        callbacks=[get_langfuse_handler()],
+        llm=llm,
+    )
 
-template = """Answer the following questions as best you can. You have access to the following tools:
 
-{tools}
+@lru_cache(maxsize=None)
+def get_node_timer():
+    """Orchestration-overhead timer attached to agent runs while a cassette is active."""
+    from cassette import NodeTimer
 
-Use the following format:
+    return NodeTimer()
 
-Question: the input question you must answer
-Thought: you should always think about what to do
-Action: the action to take, should be one of [{tool_names}]
-Action Input: the input to the action
-Observation: the result of the action
-... (this Thought/Action/Action Input/Observation can repeat N times)
-Thought: I now know the final answer
-Final Answer: the final answer to the original input question
 
-Begin!
+def _agent_config() -> dict:
+    from cassette import get_cassette
 
-Question: {input}
-Thought:{agent_scratchpad}
-"""
+    return {"callbacks": [get_node_timer()]} if get_cassette() is not None else {}
 
-prompt = PromptTemplate.from_template(template)
 
+@lru_cache(maxsize=None)
+def get_rails():
+    from nemoguardrails import LLMRails, RailsConfig
 
+    rails_config = RailsConfig.from_path("./guardrails_config")
+    return LLMRails(rails_config)
 
-agent = create_react_agent(llm, tools, prompt)
 
-agent_executor = AgentExecutor(
-    agent=agent,
-    tools=tools,
-    verbose=True,
-    max_iterations=10,
-    handle_parsing_errors=True,
-    callbacks=[langfuse_handler],
-)
+async def guarded_agent_invoke(user_input: str, speculative: bool = None) -> tuple:
+    """Run the agent between the input and output rails.
 
+    Returns (response, memo_stats); memo_stats is None when the input was refused.
+    """
+    rails = get_rails()
+    agent_executor = get_agent_executor()
+    speculative = SPECULATIVE_AGENT if speculative is None else speculative
 
+    def check_input():
+        return rails.generate_async(
+            messages=[{"role": "user", "content": user_input}]
+        )
 
-rails_config = RailsConfig.from_path("./guardrails_config")
-rails = LLMRails(rails_config)
+    if speculative:
+        # Input guardrails and agent execution run concurrently; a refusal
+        # cancels the agent before any side-effecting tool runs.
+        from speculation import speculate
 
+        input_check, agent_result = await speculate(
+            check_input,
+            lambda: agent_executor.ainvoke({"input": user_input}, config=_agent_config()),
+            lambda check: bool(check.get("refusal")),
+        )
+        if agent_result is None:
+            return input_check["content"], None
+    else:
+        # Input guardrails
+        input_check = await check_input()
 
-async def guarded_agent_invoke(user_input: str) -> str:
-    # Input guardrails
-    input_check = await rails.generate_async(
-        messages=[{"role": "user", "content": user_input}]
-    )
+        if input_check.get("refusal"):
+            return input_check["content"], None
 
-    if input_check.get("refusal"):
-        return input_check["content"]
+        # Agent execution
+        agent_result = agent_executor.invoke({"input": user_input}, config=_agent_config())
 
-    # Agent execution
-    agent_result = agent_executor.invoke({"input": user_input})
     agent_output = agent_result["output"]
 
     # Output guardrails
@@ -184,9 +317,12 @@ async def guarded_agent_invoke(user_input: str) -> str:
         messages=[{"role": "assistant", "content": agent_output}]
     )
 
-    return output_check["content"]
+    return output_check["content"], agent_result["memo_stats"]
+
+async def main(speculative: bool = None, watch: bool = None):
+    if HOT_RELOAD if watch is None else watch:
+        get_reloader()
 
-async def main():
     queries = [
         "Compare our current hiring trend with industry benchmarks.",
         "Give me details about health insurance and hospital expenses options available for employees.",
@@ -195,11 +331,48 @@ async def main():
 
     for q in queries:
         print(f"\nUSER: {q}")
-        response = await guarded_agent_invoke(q)
+        response, memo_stats = await guarded_agent_invoke(q, speculative)
         print(f"ASSISTANT:\n{response}")
+        if memo_stats is not None:
+            print(f"Memo stats: {memo_stats}")
+
+    from prompt_builder import print_prefix_report
+
+    print_prefix_report()
+    if speculative or (speculative is None and SPECULATIVE_AGENT):
+        from speculation import stats
+
+        print(f"Speculation: {stats.summary()}")
+    if get_reloader.cache_info().currsize:
+        get_reloader().stop()
+        print(f"Hot reload: {get_reloader().stats()}")
+    from cassette import get_cassette
 
-    langfuse.flush()
+    if get_cassette() is not None:
+        print(f"Cassette: {get_cassette().stats()}")
+        get_node_timer().print_report()
+    get_langfuse().flush()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report import time per module and lazy component build times, then exit.")
+    parser.add_argument("--speculative", action="store_true", default=None,
+                        help="Run the agent concurrently with the input guardrails (or set SPECULATIVE_AGENT=1).")
+    parser.add_argument("--watch", action="store_true", default=None,
+                        help="Watch the source PDFs and doc folders and hot-reload changed files (or set HOT_RELOAD=1).")
+    args = parser.parse_args()
+
+    if args.profile_startup:
+        from startup_profile import print_startup_report
+
+        print_startup_report("main", {
+            "get_embeddings": get_embeddings,
+            "get_llm": get_llm,
+            "get_rails": get_rails,
+            "get_agent_executor": get_agent_executor,
+        })
+        sys.exit(0)
+
+    asyncio.run(main(args.speculative, args.watch))
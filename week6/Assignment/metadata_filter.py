@@ -0,0 +1,174 @@
+"""
+Metadata pre-filtering for retrieval.
+
+Chunks are tagged with source, page, doc_type, section and year. A secondary
+inverted index (field -> value -> row positions) resolves a filter to the set
+of matching rows *before* vector scoring; selective filters are then answered
+by exact search over just those rows, while broad filters fall back to ANN
+search with post-filtering. Chroma stores are filtered with an equivalent
+`where` clause, which Chroma resolves against its SQLite metadata index.
+
+Filters are dicts such as {"year": 2026}, {"source": [a, b]} or
+{"year": {"$gte": 2025}, "section": "integrations"}.
+"""
+
+import os
+import re
+from collections import defaultdict
+from typing import Any, List, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+YEAR_RE = re.compile(r"\b(20\d\d)\b")
+
+
+def enrich_metadata(docs: list) -> list:
+    """Add doc_type, section and year to each chunk's metadata (in place)."""
+    for doc in docs:
+        meta = doc.metadata
+        source = str(meta.get("source", ""))
+        if source.startswith(("http://", "https://")):
+            meta.setdefault("doc_type", "web")
+            parts = [p for p in urlparse(source).path.split("/") if p]
+            # e.g. /oss/python/integrations/vectorstores -> "integrations"
+            if len(parts) >= 2:
+                meta.setdefault("section", parts[-2])
+        else:
+            meta.setdefault("doc_type", os.path.splitext(source)[1].lstrip(".").lower() or "text")
+        year = YEAR_RE.search(os.path.basename(source))
+        if year:
+            meta.setdefault("year", int(year.group(1)))
+    return docs
+
+
+def _matches(value, condition) -> bool:
+    if isinstance(condition, dict):
+        ops = {
+            "$eq": lambda v, c: v == c,
+            "$ne": lambda v, c: v != c,
+            "$in": lambda v, c: v in c,
+            "$gte": lambda v, c: v is not None and v >= c,
+            "$lte": lambda v, c: v is not None and v <= c,
+            "$gt": lambda v, c: v is not None and v > c,
+            "$lt": lambda v, c: v is not None and v < c,
+        }
+        return all(ops[op](value, arg) for op, arg in condition.items())
+    if isinstance(condition, (list, tuple, set)):
+        return value in condition
+    return value == condition
+
+
+class MetadataIndex:
+    """Inverted index from metadata field values to row positions of a FAISS store."""
+
+    def __init__(self, db):
+        self.db = db
+        self.size = db.index.ntotal
+        self._postings = defaultdict(lambda: defaultdict(list))
+        for position, doc_id in db.index_to_docstore_id.items():
+            doc = db.docstore.search(doc_id)
+            for field, value in getattr(doc, "metadata", {}).items():
+                if isinstance(value, (str, int, float, bool)):
+                    self._postings[field][value].append(position)
+        self._postings = {
+            field: {value: np.asarray(rows, dtype=np.int64) for value, rows in values.items()}
+            for field, values in self._postings.items()
+        }
+
+    def candidates(self, filter: dict) -> np.ndarray:
+        """Sorted row positions matching every field condition."""
+        result = None
+        for field, condition in filter.items():
+            values = self._postings.get(field, {})
+            if isinstance(condition, (str, int, float, bool)):
+                rows = values.get(condition, np.empty(0, dtype=np.int64))
+            else:
+                matched = [rows for value, rows in values.items() if _matches(value, condition)]
+                rows = np.unique(np.concatenate(matched)) if matched else np.empty(0, dtype=np.int64)
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if len(result) == 0:
+                break
+        return np.sort(result) if result is not None else np.arange(self.size)
+
+
+def _row_vectors(db, rows: np.ndarray) -> np.ndarray:
+    exact = getattr(db, "exact_vectors", None)
+    if exact is not None:
+        return np.asarray(exact[rows], dtype=np.float32)
+    return np.asarray(db.index.reconstruct_batch(rows), dtype=np.float32)
+
+
+def filtered_search(db, metadata_index: MetadataIndex, query: str, k: int = 4, filter: dict = None,
+                    max_exact_fraction: float = 0.2) -> list:
+    """Similarity search restricted to rows matching `filter` before scoring.
+
+    If the filter keeps more than `max_exact_fraction` of the corpus, ANN search
+    with post-filtering is cheaper and is used instead.
+    """
+    if not filter:
+        return db.similarity_search(query, k=k)
+
+    rows = metadata_index.candidates(filter)
+    if len(rows) == 0:
+        return []
+    if len(rows) > max_exact_fraction * metadata_index.size:
+        return db.similarity_search(
+            query, k=k, filter=lambda meta: all(_matches(meta.get(f), c) for f, c in filter.items()),
+            fetch_k=max(4 * k, 20),
+        )
+
+    query_vector = np.asarray(db.embedding_function.embed_query(query), dtype=np.float32)
+    if db._normalize_L2:
+        query_vector /= np.linalg.norm(query_vector) or 1.0
+    distances = ((_row_vectors(db, rows) - query_vector) ** 2).sum(axis=1)
+    top = np.argsort(distances)[:k]
+    return [db.docstore.search(db.index_to_docstore_id[int(rows[i])]) for i in top]
+
+
+class FilteredFAISSRetriever(BaseRetriever):
+    """Retriever over a FAISS store that pre-filters with a MetadataIndex."""
+
+    db: Any
+    metadata_index: Any
+    k: int = 6
+    filter: Optional[dict] = None
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return filtered_search(self.db, self.metadata_index, query, k=self.k, filter=self.filter)
+
+
+def chroma_where(filter: dict = None):
+    """Translate a filter dict into a Chroma `where` clause."""
+    if not filter:
+        return None
+    clauses = []
+    for field, condition in filter.items():
+        if isinstance(condition, (list, tuple, set)):
+            condition = {"$in": list(condition)}
+        clauses.append({field: condition})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def parse_filter_suffix(query: str) -> tuple:
+    """Split 'question | year=2026, source=file.pdf' into (question, filter dict).
+
+    `page=N` in the suffix counts from 1, as people (and the tool descriptions)
+    number pages, and is translated to the 0-based `page` that PyPDFLoader and
+    ingest.py store. Filter dicts passed directly use the stored 0-based value.
+    """
+    if "|" not in query:
+        return query, None
+    text, _, spec = query.partition("|")
+    filter = {}
+    for part in re.split(r"[,;]", spec):
+        if "=" not in part:
+            continue
+        key, value = (s.strip() for s in part.split("=", 1))
+        filter[key] = int(value) if value.isdigit() else value
+        if key == "page" and isinstance(filter[key], int) and filter[key] > 0:
+            filter[key] -= 1
+    return text.strip(), filter or None
@@ -0,0 +1,140 @@
+"""
+Run-scoped tool memoization for ReAct agents.
+
+Within a single AgentExecutor run, repeating the same (tool, input) pair
+returns the earlier observation instead of calling the tool again. If the
+agent keeps repeating itself without getting new observations, the run is
+stopped and a final answer is generated from what has been gathered so far.
+Each run reports how many tool calls and iterations this saved.
+"""
+
+import contextvars
+import re
+from typing import Any, Optional
+
+from langchain.agents import AgentExecutor
+from langchain.tools import Tool
+from langchain_core.messages import HumanMessage
+
+_current_memo = contextvars.ContextVar("react_run_memo", default=None)
+
+FINAL_ANSWER_PROMPT = """Answer the question using only the observations gathered so far. If they are insufficient, say what is missing.
+
+Question: {question}
+
+Observations:
+{observations}
+
+Final Answer:"""
+
+
+def _normalize_input(tool_input: str) -> str:
+    return re.sub(r"\s+", " ", str(tool_input).strip().strip("\"'").lower())
+
+
+class RunMemo:
+    """Observations and loop state for one agent run."""
+
+    def __init__(self, repeat_limit: int = 2):
+        self.repeat_limit = repeat_limit
+        self.observations = {}  # (tool, normalized input) -> observation
+        self.tool_calls = 0
+        self.cache_hits = 0
+        self.consecutive_stalls = 0
+        self.stalled = False
+
+    def call(self, tool_name: str, func, tool_input: str) -> str:
+        self.tool_calls += 1
+        key = (tool_name, _normalize_input(tool_input))
+        if key in self.observations:
+            self.cache_hits += 1
+            self.consecutive_stalls += 1
+            self.stalled = self.consecutive_stalls >= self.repeat_limit
+            return (
+                f"{self.observations[key]}\n\n(You already ran {tool_name} with this input; "
+                "this is the same result. Use it or give the Final Answer.)"
+            )
+
+        observation = str(func(tool_input))
+        # A different input that yields an already-seen observation is not progress either.
+        if observation in self.observations.values():
+            self.consecutive_stalls += 1
+        else:
+            self.consecutive_stalls = 0
+        self.stalled = self.consecutive_stalls >= self.repeat_limit
+        self.observations[key] = observation
+        return observation
+
+    def stats(self, max_iterations: Optional[int]) -> dict:
+        saved_iterations = 0
+        if self.stalled and max_iterations:
+            saved_iterations = max(max_iterations - self.tool_calls, 0)
+        return {
+            "tool_calls": self.tool_calls,
+            "tool_calls_saved": self.cache_hits,
+            "iterations_saved": saved_iterations,
+            "loop_short_circuited": self.stalled,
+        }
+
+
+def memoize_tool(tool: Tool) -> Tool:
+    """Wrap a Tool so that calls inside a memoized run go through the run's RunMemo."""
+    func = tool.func
+
+    def memoized(tool_input: str) -> str:
+        memo = _current_memo.get()
+        if memo is None:
+            return func(tool_input)
+        return memo.call(tool.name, func, tool_input)
+
+    return Tool(name=tool.name, description=tool.description, func=memoized)
+
+
+def memoize_tools(tools: list) -> list:
+    return [memoize_tool(t) for t in tools]
+
+
+class MemoizedAgentExecutor(AgentExecutor):
+    """AgentExecutor that memoizes tool calls per run and stops non-progressing loops.
+
+    Tools must be wrapped with memoize_tools(). When a loop is detected, `llm`
+    (if set) writes the final answer from the observations collected so far.
+    Per-run savings are returned under the "memo_stats" output key.
+    """
+
+    llm: Optional[Any] = None
+    repeat_limit: int = 2
+
+    def _should_continue(self, iterations: int, time_elapsed: float) -> bool:
+        memo = _current_memo.get()
+        if memo is not None and memo.stalled:
+            return False
+        return super()._should_continue(iterations, time_elapsed)
+
+    def _call(self, inputs, run_manager=None):
+        memo = RunMemo(self.repeat_limit)
+        token = _current_memo.set(memo)
+        try:
+            outputs = super()._call(inputs, run_manager=run_manager)
+        finally:
+            _current_memo.reset(token)
+        return self._finish(inputs, outputs, memo)
+
+    async def _acall(self, inputs, run_manager=None):
+        memo = RunMemo(self.repeat_limit)
+        token = _current_memo.set(memo)
+        try:
+            outputs = await super()._acall(inputs, run_manager=run_manager)
+        finally:
+            _current_memo.reset(token)
+        return self._finish(inputs, outputs, memo)
+
+    def _finish(self, inputs, outputs, memo: RunMemo) -> dict:
+        if memo.stalled and self.llm is not None:
+            observations = "\n\n".join(
+                f"{tool}({tool_input}): {obs}" for (tool, tool_input), obs in memo.observations.items()
+            )
+            prompt = FINAL_ANSWER_PROMPT.format(question=inputs.get("input", ""), observations=observations)
+            outputs["output"] = self.llm.invoke([HumanMessage(content=prompt)]).content
+        outputs["memo_stats"] = memo.stats(self.max_iterations)
+        return outputs
@@ -0,0 +1,189 @@
+"""
+Persistent cache for web search tools.
+
+Results are keyed by the normalized query and stored in a small SQLite file so
+they survive restarts. Entries expire after a TTL and the table is capped at
+max_entries, evicting the least recently used rows. Concurrent calls for the
+same query share a single upstream request (single-flight).
+"""
+
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "./.search_cache.sqlite3"
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, collapse whitespace and drop surrounding quotes/punctuation."""
+    query = re.sub(r"\s+", " ", query.strip().lower())
+    return query.strip(" \"'`.?!")
+
+
+class SearchCache:
+    """SQLite-backed TTL + LRU store for search results."""
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, ttl_seconds: float = 24 * 3600, max_entries: int = 1000):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_cache ("
+            "key TEXT PRIMARY KEY, result TEXT NOT NULL, "
+            "created_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str):
+        """Return the cached result, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result, created_at FROM search_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            result, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE search_cache SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return result
+
+    def set(self, key: str, result: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO search_cache (key, result, created_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, result, now, now),
+            )
+            self._evict_locked()
+            self._conn.commit()
+
+    def invalidate(self, key: str = None):
+        """Drop one entry, or the whole cache when key is None."""
+        with self._lock:
+            if key is None:
+                self._conn.execute("DELETE FROM search_cache")
+            else:
+                self._conn.execute("DELETE FROM search_cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def _evict_locked(self):
+        self._conn.execute(
+            "DELETE FROM search_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,)
+        )
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM search_cache WHERE key IN "
+                "(SELECT key FROM search_cache ORDER BY last_access ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM search_cache").fetchone()[0]
+
+
+class CachedSearch:
+    """Wrap a search callable (e.g. DuckDuckGoSearchRun().run) with caching and single-flight.
+
+    Exposes .run(query) so it can be dropped into a Tool in place of the
+    original search function.
+    """
+
+    def __init__(self, search_fn, cache: SearchCache = None):
+        self.search_fn = search_fn
+        self.cache = cache if cache is not None else SearchCache()
+        self._inflight = {}  # key -> (Event, result holder)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def run(self, query: str) -> str:
+        key = normalize_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        with self._lock:
+            inflight = self._inflight.get(key)
+            leader = inflight is None
+            if leader:
+                inflight = (threading.Event(), {})
+                self._inflight[key] = inflight
+
+        done, holder = inflight
+        if not leader:
+            self.coalesced += 1
+            done.wait()
+            if "error" in holder:
+                raise holder["error"]
+            return holder["result"]
+
+        try:
+            # Another leader may have finished between our cache miss and
+            # registering as in-flight.
+            result = self.cache.get(key)
+            if result is not None:
+                self.hits += 1
+                holder["result"] = result
+                return result
+            self.misses += 1
+            result = self.search_fn(query)
+            holder["result"] = result
+            self.cache.set(key, result)
+            return result
+        except Exception as e:
+            holder["error"] = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            done.set()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.coalesced, "entries": len(self.cache)}
+
+
+if __name__ == "__main__":
+    import os
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+
+    class FakeSearch:
+        """Local stand-in for DuckDuckGoSearchRun that counts upstream calls."""
+
+        def __init__(self, delay: float = 0.2):
+            self.delay = delay
+            self.calls = 0
+
+        def run(self, query: str) -> str:
+            self.calls += 1
+            time.sleep(self.delay)
+            return f"results for {query!r}"
+
+    path = os.path.join(tempfile.mkdtemp(), "search_cache.sqlite3")
+    backend = FakeSearch()
+    search = CachedSearch(backend.run, SearchCache(path, ttl_seconds=60, max_entries=2))
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(search.run, ["Hiring trends 2026"] * 4 + ["  hiring TRENDS 2026? "] * 4))
+    print(f"8 concurrent identical queries -> {backend.calls} upstream call(s); {search.stats()}")
+
+    search.run("remote work benchmarks")
+    search.run("attrition rate benchmarks")
+    print(f"LRU cap of 2 keeps {len(search.cache)} entries")
+
+    restarted = CachedSearch(backend.run, SearchCache(path, ttl_seconds=60, max_entries=2))
+    restarted.run("attrition rate benchmarks")
+    print(f"After restart: {restarted.stats()}, upstream calls total {backend.calls}")
@@ -0,0 +1,300 @@
+"""
+Domain-sharded Chroma collections with a routed, concurrent search.
+
+Each knowledge domain (HR policy, IT, finance, ...) lives in its own
+collection in one persist directory. A query is embedded once, routed to the
+top-N shards by similarity to each shard's centroid embedding (plus a keyword
+boost from the domain description), searched on those shards concurrently, and
+the hits are merged by distance. Search cost scales with the relevant shards
+rather than the whole corpus.
+
+A shard can be rebuilt while it keeps serving: rebuild_shard() writes a new
+generation of the collection (reusing the stored embeddings of unchanged rows)
+and swaps it in with its centroid in one step. The active generation of each
+domain is recorded in shard_generations.json in the persist directory;
+drop_stale_generations() removes any other generation left on disk by a
+process that exited before retiring it.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_community.vectorstores import Chroma
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from metadata_filter import chroma_where
+
+COLLECTION_PREFIX = "shard_"
+GENERATIONS_FILE = "shard_generations.json"
+# Chroma rejects very large add() calls; copy rows between generations in batches.
+COPY_BATCH = 2000
+
+DOMAIN_DESCRIPTIONS = {
+    "hr": "HR policy hiring hybrid remote work leave benefits employee handbook conduct onboarding",
+    "it": "IT VPN laptop software hardware network access password install support",
+    "finance": "finance reimbursement expense budget payroll invoice payment salary schedule",
+}
+
+
+def _terms(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", text.lower()))
+
+
+def _cosine(a, b) -> float:
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class ShardedCollections:
+    """One Chroma collection per domain, with query routing and fan-out search."""
+
+    def __init__(self, persist_directory: str, embeddings, descriptions: dict = None,
+                 keyword_weight: float = 0.1, max_workers: int = 4, retire_after: float = 60.0):
+        self.persist_directory = persist_directory
+        self.embeddings = embeddings
+        self.descriptions = descriptions or DOMAIN_DESCRIPTIONS
+        self.keyword_weight = keyword_weight
+        self.retire_after = retire_after
+        self._shards = {}
+        self._centroids = {}
+        self._retiring = {}  # collection name -> (Chroma, Timer)
+        self._generations = self._load_generations()
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.rebuilds = 0
+
+    def _load_generations(self) -> dict:
+        try:
+            with open(os.path.join(self.persist_directory, GENERATIONS_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_generations(self):
+        os.makedirs(self.persist_directory, exist_ok=True)
+        path = os.path.join(self.persist_directory, GENERATIONS_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self._generations, f, indent=2)
+        os.replace(path + ".tmp", path)
+
+    def collection_name(self, domain: str) -> str:
+        """Name of the domain's active collection generation."""
+        return self._generations.get(domain, COLLECTION_PREFIX + domain)
+
+    def drop_stale_generations(self) -> list:
+        """Delete every generation of a known domain other than its active one; returns their names."""
+        import chromadb
+
+        pattern = re.compile(rf"{re.escape(COLLECTION_PREFIX)}(.+?)(?:-\d+)?")
+        with self._rebuild_lock:
+            client = chromadb.PersistentClient(path=self.persist_directory)
+            # list_collections() returns names on newer Chroma versions.
+            names = [c if isinstance(c, str) else c.name for c in client.list_collections()]
+            stale = []
+            for name in names:
+                match = pattern.fullmatch(name)
+                if match is None or name in self._retiring:
+                    continue
+                domain = match.group(1)
+                if (domain in self.descriptions or domain in self._generations) and name != self.collection_name(domain):
+                    client.delete_collection(name)
+                    stale.append(name)
+        return stale
+
+    def shard(self, domain: str) -> Chroma:
+        with self._lock:
+            if domain not in self._shards:
+                self._shards[domain] = Chroma(
+                    collection_name=self.collection_name(domain),
+                    persist_directory=self.persist_directory,
+                    embedding_function=self.embeddings,
+                )
+            return self._shards[domain]
+
+    def domains(self) -> list:
+        return sorted(set(self.descriptions) | set(self._shards))
+
+    def _doc_ids(self, domain: str, docs: list) -> list:
+        ids = []
+        for doc in docs:
+            doc.metadata["domain"] = domain
+            key = f"{domain}:{doc.metadata.get('source')}:{doc.page_content}"
+            ids.append(hashlib.sha1(key.encode("utf-8")).hexdigest())
+        return ids
+
+    def add_documents(self, domain: str, docs: list):
+        """Upsert documents into a shard; ids are content-derived so re-adding is idempotent."""
+        self.shard(domain).add_documents(docs, ids=self._doc_ids(domain, docs))
+        self._centroids.pop(domain, None)
+
+    def add_text_dir(self, domain: str, directory: str, chunk_size: int = 800, chunk_overlap: int = 100):
+        """Chunk every .txt/.md file in a directory into the domain's shard.
+
+        Each file's chunks replace what the shard held for that source, so a
+        file edited since the last load doesn't keep its old chunks.
+        """
+        paths = [os.path.join(directory, name) for name in sorted(os.listdir(directory))]
+        docs = load_text_files(paths, chunk_size, chunk_overlap)
+        ids = self._doc_ids(domain, docs)
+        keep = set(ids)
+        collection = self.shard(domain)._collection
+        for path in paths:
+            if path.endswith((".txt", ".md")):
+                stored = collection.get(where={"source": os.path.basename(path)}, include=[])["ids"]
+                stale = [i for i in stored if i not in keep]
+                if stale:
+                    collection.delete(ids=stale)
+        if docs:
+            self.shard(domain).add_documents(docs, ids=ids)
+        self._centroids.pop(domain, None)
+
+    def sources(self, domain: str) -> set:
+        """The distinct `source` values stored in a shard."""
+        metadatas = self.shard(domain)._collection.get(include=["metadatas"])["metadatas"]
+        return {(meta or {}).get("source") for meta in metadatas}
+
+    def texts(self, domain: str, exclude_sources: set = frozenset()) -> list:
+        """Stored chunk texts of a shard in (source, page, chunk) order, skipping `exclude_sources`."""
+        rows = self.shard(domain)._collection.get(include=["documents", "metadatas"])
+        kept = [
+            (meta or {}, text) for text, meta in zip(rows["documents"], rows["metadatas"])
+            if (meta or {}).get("source") not in exclude_sources
+        ]
+        kept.sort(key=lambda pair: (str(pair[0].get("source")), pair[0].get("page", 0), pair[0].get("chunk", 0)))
+        return [text for _, text in kept]
+
+    def rebuild_shard(self, domain: str, remove_sources: set, docs: list, ids: list = None) -> int:
+        """Replace the chunks of `remove_sources` with `docs`, swapping in a new generation.
+
+        Every other row is copied with its stored embedding, so only `docs` are
+        embedded. Searches use the old generation until the swap, which replaces
+        the collection and its centroid together; the old collection is dropped
+        after `retire_after` seconds so in-flight searches can finish, or by
+        retire_old_generations(). Returns the new row count.
+        """
+        with self._rebuild_lock:
+            old = self.shard(domain)
+            name = f"{COLLECTION_PREFIX}{domain}-{time.time_ns() // 1_000_000}"
+            new = Chroma(
+                collection_name=name,
+                persist_directory=self.persist_directory,
+                embedding_function=self.embeddings,
+                collection_metadata=old._collection.metadata or None,
+            )
+            rows = old._collection.get(include=["embeddings", "documents", "metadatas"])
+            keep = [i for i, meta in enumerate(rows["metadatas"]) if (meta or {}).get("source") not in remove_sources]
+            for start in range(0, len(keep), COPY_BATCH):
+                part = keep[start:start + COPY_BATCH]
+                new._collection.add(
+                    ids=[rows["ids"][i] for i in part],
+                    embeddings=[list(rows["embeddings"][i]) for i in part],
+                    documents=[rows["documents"][i] for i in part],
+                    metadatas=[rows["metadatas"][i] for i in part],
+                )
+            if docs:
+                for doc in docs:
+                    doc.metadata["domain"] = domain
+                new.add_documents(docs, ids=ids or self._doc_ids(domain, docs))
+            centroid = self._mean_embedding(new)
+
+            with self._lock:
+                self._shards[domain] = new
+                self._centroids[domain] = centroid
+                self._generations[domain] = name
+                self._save_generations()
+            self.rebuilds += 1
+            old_name = old._collection.name
+            timer = threading.Timer(self.retire_after, self._retire, args=(old_name,))
+            timer.daemon = True
+            with self._lock:
+                self._retiring[old_name] = (old, timer)
+            timer.start()
+            return new._collection.count()
+
+    def _retire(self, name: str):
+        with self._lock:
+            old, timer = self._retiring.pop(name, (None, None))
+        if old is not None:
+            timer.cancel()
+            old.delete_collection()
+
+    def retire_old_generations(self):
+        """Drop superseded generations now instead of after `retire_after` (e.g. on shutdown)."""
+        for name in list(self._retiring):
+            self._retire(name)
+
+    def count(self, domain: str) -> int:
+        return self.shard(domain)._collection.count()
+
+    @staticmethod
+    def _mean_embedding(shard: Chroma):
+        rows = shard._collection.get(include=["embeddings"])["embeddings"]
+        rows = [list(r) for r in rows] if rows is not None else []
+        if not rows:
+            return None
+        dim = len(rows[0])
+        return [sum(r[i] for r in rows) / len(rows) for i in range(dim)]
+
+    def _centroid(self, domain: str):
+        if domain not in self._centroids:
+            self._centroids[domain] = self._mean_embedding(self.shard(domain))
+        return self._centroids[domain]
+
+    def route(self, query: str, top_n: int = 2, query_embedding=None) -> list:
+        """Rank non-empty shards for a query; returns [(domain, score), ...][:top_n]."""
+        query_embedding = query_embedding or self.embeddings.embed_query(query)
+        q_terms = _terms(query)
+        scored = []
+        for domain in self.domains():
+            centroid = self._centroid(domain)
+            if centroid is None:
+                continue
+            keyword_hits = len(q_terms & _terms(self.descriptions.get(domain, domain)))
+            scored.append((domain, _cosine(query_embedding, centroid) + self.keyword_weight * keyword_hits))
+        scored.sort(key=lambda pair: pair[1], reverse=True)
+        return scored[:top_n]
+
+    def search(self, query: str, k: int = 4, top_n: int = 2, domains: list = None, filter: dict = None) -> list:
+        """Search the routed (or given) shards concurrently; returns [(Document, distance)].
+
+        `filter` is applied inside each shard as a Chroma `where` clause, so only
+        matching chunks are scored.
+        """
+        where = chroma_where(filter)
+        query_embedding = self.embeddings.embed_query(query)
+        if domains is None:
+            domains = [domain for domain, _ in self.route(query, top_n, query_embedding)]
+
+        futures = {
+            domain: self._pool.submit(self.shard(domain).similarity_search_by_vector_with_relevance_scores,
+                                      query_embedding, k, filter=where)
+            for domain in domains
+        }
+        hits = []
+        for domain, future in futures.items():
+            for doc, distance in future.result():
+                doc.metadata.setdefault("domain", domain)
+                hits.append((doc, distance))
+        # All shards share the embedding model and distance space, so distances compare directly.
+        hits.sort(key=lambda pair: pair[1])
+        return hits[:k]
+
+
+def load_text_files(paths: list, chunk_size: int = 800, chunk_overlap: int = 100) -> list:
+    """Chunk .txt/.md files into Documents whose source is the file name."""
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    docs = []
+    for path in paths:
+        if path.endswith((".txt", ".md")):
+            with open(path, encoding="utf-8") as f:
+                docs.append(Document(page_content=f.read(), metadata={"source": os.path.basename(path)}))
+    return splitter.split_documents(docs)
@@ -0,0 +1,147 @@
+"""
+Speculative agent execution alongside the input guardrails.
+
+Almost every request passes the input rails, so waiting for them before
+starting the agent adds their full latency to every answer. In speculative
+mode the agent starts at the same time as the input check:
+
+  - tools without side effects that stay local (the internal searches) run
+    immediately;
+  - everything else (MCP tools, and web search, which would send the
+    unvetted input to an external service) blocks until the verdict, then
+    runs if the input passed or raises SpeculationCancelled if it was refused;
+  - on refusal the agent task is cancelled and its result discarded.
+
+SpeculationStats tracks how often speculation was wasted (agent time burnt on
+refused inputs) against the latency it saved on accepted ones.
+"""
+
+import asyncio
+import contextvars
+import threading
+import time
+
+_current_gate = contextvars.ContextVar("speculation_gate", default=None)
+
+
+class SpeculationCancelled(Exception):
+    """Raised inside a side-effecting tool when the speculated request was refused."""
+
+
+class SpeculationGate:
+    """The input-rail verdict for one request, visible to tool threads."""
+
+    def __init__(self):
+        self._decided = threading.Event()
+        self.allowed = None
+        self.deferred_calls = 0
+        self.suppressed_calls = 0
+        self.waited_seconds = 0.0
+
+    def decide(self, allowed: bool):
+        self.allowed = allowed
+        self._decided.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        self._decided.wait(timeout)
+        return bool(self.allowed)
+
+
+def gate_side_effects(tools: list, read_only: set) -> list:
+    """Wrap tools not named in `read_only` so they wait for the verdict during speculation."""
+    from langchain.tools import Tool
+
+    def wrap(tool):
+        func = tool.func
+
+        def gated(tool_input):
+            gate = _current_gate.get()
+            if gate is not None and gate.allowed is not True:
+                gate.deferred_calls += 1
+                start = time.perf_counter()
+                allowed = gate.wait()
+                gate.waited_seconds += time.perf_counter() - start
+                if not allowed:
+                    gate.suppressed_calls += 1
+                    raise SpeculationCancelled(f"{tool.name} suppressed: input was refused")
+            return func(tool_input)
+
+        return Tool(name=tool.name, description=tool.description, func=gated)
+
+    return [t if t.name in read_only else wrap(t) for t in tools]
+
+
+class SpeculationStats:
+    def __init__(self):
+        self.requests = 0
+        self.refused = 0
+        self.saved_seconds = 0.0
+        self.wasted_agent_seconds = 0.0
+        self.deferred_tool_calls = 0
+        self.suppressed_tool_calls = 0
+
+    def summary(self) -> dict:
+        accepted = self.requests - self.refused
+        return {
+            "requests": self.requests,
+            "wasted_runs": self.refused,
+            "waste_rate": round(self.refused / self.requests, 3) if self.requests else 0.0,
+            "saved_s": round(self.saved_seconds, 2),
+            "avg_saved_s": round(self.saved_seconds / accepted, 3) if accepted else 0.0,
+            "wasted_agent_s": round(self.wasted_agent_seconds, 2),
+            "deferred_tool_calls": self.deferred_tool_calls,
+            "suppressed_tool_calls": self.suppressed_tool_calls,
+        }
+
+
+stats = SpeculationStats()
+
+
+async def speculate(input_check, run_agent, is_refusal):
+    """Run `input_check()` and `run_agent()` concurrently.
+
+    Returns (check_result, agent_result); agent_result is None when
+    `is_refusal(check_result)`, in which case the agent has been cancelled.
+    """
+    gate = SpeculationGate()
+    token = _current_gate.set(gate)
+    try:
+        start = time.perf_counter()
+        agent_task = asyncio.ensure_future(run_agent())  # copies the context, gate included
+    finally:
+        _current_gate.reset(token)
+    agent_end = []
+    agent_task.add_done_callback(lambda _: agent_end.append(time.perf_counter()))
+
+    try:
+        check = await input_check()
+    except BaseException:
+        gate.decide(False)
+        agent_task.cancel()
+        raise
+    check_seconds = time.perf_counter() - start
+    stats.requests += 1
+
+    if is_refusal(check):
+        gate.decide(False)
+        agent_task.cancel()
+        # wait() doesn't raise the discarded run's outcome, but a cancellation
+        # of this task still propagates.
+        await asyncio.wait({agent_task})
+        if not agent_task.cancelled():
+            agent_task.exception()  # mark retrieved
+        stats.refused += 1
+        stats.wasted_agent_seconds += min(check_seconds, agent_end[0] - start)
+        stats.deferred_tool_calls += gate.deferred_calls
+        stats.suppressed_tool_calls += gate.suppressed_calls
+        return check, None
+
+    gate.decide(True)
+    result = await agent_task
+    agent_seconds = agent_end[0] - start
+    # Run serially this would take check + the agent's own time (excluding waits
+    # on the gate); speculatively it takes whichever of the two finished last.
+    serial = check_seconds + agent_seconds - gate.waited_seconds
+    stats.saved_seconds += serial - max(check_seconds, agent_seconds)
+    stats.deferred_tool_calls += gate.deferred_calls
+    return check, result
@@ -0,0 +1,48 @@
+"""
+Startup-time profiling.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter and
+reports the slowest imports by cumulative time, then times the lazy factories
+(first call builds the component) in the current process.
+"""
+
+import os
+import subprocess
+import sys
+import time
+
+
+def profile_imports(module: str, cwd: str = None) -> tuple:
+    """Return (wall_seconds, [(cumulative_us, self_us, name), ...]) for importing module."""
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=cwd or os.getcwd(),
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return wall, entries
+
+
+def print_startup_report(module: str, factories: dict = None, top: int = 15, cwd: str = None):
+    """Print import cost per module and first-call cost of each lazy factory."""
+    wall, entries = profile_imports(module, cwd)
+    print(f"Startup profile for `import {module}` (fresh interpreter, {wall:.2f}s wall incl. interpreter start)")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative_us, self_us, name in sorted(entries, reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+
+    for label, factory in (factories or {}).items():
+        start = time.perf_counter()
+        factory()
+        print(f"{label:>24}: {(time.perf_counter() - start) * 1000:.1f} ms on first use")
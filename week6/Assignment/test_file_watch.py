@@ -0,0 +1,59 @@
+import os
+import time
+
+from file_watch import FileWatcher, diff, snapshot
+
+
+def touch(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+    # Make sure the change is visible even on filesystems with coarse mtimes.
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.02)
+
+
+def test_snapshot_and_diff(tmp_path):
+    touch(tmp_path / "a.txt", "a")
+    touch(tmp_path / "b.md", "b")
+    touch(tmp_path / "skip.csv", "c")
+    before = snapshot([str(tmp_path)], (".txt", ".md"))
+    assert sorted(os.path.basename(p) for p in before) == ["a.txt", "b.md"]
+
+    touch(tmp_path / "a.txt", "a changed")
+    os.remove(tmp_path / "b.md")
+    touch(tmp_path / "c.txt", "c")
+    changes = diff(before, snapshot([str(tmp_path)], (".txt", ".md")))
+    assert [os.path.basename(p) for p in changes.added] == ["c.txt"]
+    assert [os.path.basename(p) for p in changes.modified] == ["a.txt"]
+    assert [os.path.basename(p) for p in changes.removed] == ["b.md"]
+    assert not diff(before, before)
+
+
+def test_watcher_delivers_batches_and_retries_failed_callbacks(tmp_path):
+    touch(tmp_path / "vpn.txt", "v1")
+    batches, failures = [], []
+
+    def on_change(changes):
+        if not failures:
+            failures.append(changes)
+            raise RuntimeError("reload failed")
+        batches.append(changes)
+
+    watcher = FileWatcher([str(tmp_path)], on_change, extensions=(".txt",), interval=0.05, settle=0.05).start()
+    try:
+        touch(tmp_path / "vpn.txt", "v2")
+        wait_for(lambda: batches)
+    finally:
+        watcher.stop()
+
+    assert watcher.errors == 1 and isinstance(watcher.last_error, RuntimeError)
+    # The failed batch is delivered again on the next scan.
+    assert [os.path.basename(p) for p in batches[0].modified] == ["vpn.txt"]
+    assert watcher.batches >= 1
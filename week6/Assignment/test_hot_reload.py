@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_community")
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from file_watch import Changes
+from hot_reload import ShardReloader
+from sharded_store import ShardedCollections
+
+
+def write(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+
+
+@pytest.fixture
+def setup(tmp_path):
+    docs = tmp_path / "it_docs"
+    docs.mkdir()
+    write(docs / "vpn.md", "Install the VPN client.")
+    write(docs / "laptop.txt", "Laptops are replaced every three years.")
+    store = str(tmp_path / "store")
+    shards = ShardedCollections(store, DeterministicFakeEmbedding(size=16))
+    shards.add_text_dir("it", str(docs))
+    yield shards, str(docs)
+    shards.retire_old_generations()
+
+
+def test_reload_swaps_in_changed_files(setup):
+    shards, docs = setup
+    reloader = ShardReloader(shards, [], {"it": docs})
+    reloader.reconcile()
+
+    write(os.path.join(docs, "vpn.md"), "Use the new VPN portal.")
+    reloader.reload(Changes(modified=[os.path.join(docs, "vpn.md")]))
+    assert sorted(shards.texts("it")) == ["Laptops are replaced every three years.", "Use the new VPN portal."]
+    assert reloader.stats()["shard_rebuilds"] == 1
+
+
+def test_reconcile_catches_up_with_changes_made_while_stopped(setup):
+    shards, docs = setup
+    ShardReloader(shards, [], {"it": docs}).reconcile()  # first run records what was indexed
+
+    write(os.path.join(docs, "vpn.md"), "VPN edited while stopped.")
+    os.remove(os.path.join(docs, "laptop.txt"))
+    write(os.path.join(docs, "printer.md"), "Printers are on floor two.")
+
+    restarted = ShardedCollections(shards.persist_directory, shards.embeddings)
+    try:
+        ShardReloader(restarted, [], {"it": docs}).reconcile()
+        assert sorted(restarted.texts("it")) == ["Printers are on floor two.", "VPN edited while stopped."]
+        assert restarted.sources("it") == {"vpn.md", "printer.md"}
+    finally:
+        restarted.retire_old_generations()
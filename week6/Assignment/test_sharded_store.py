@@ -0,0 +1,67 @@
+import pytest
+
+pytest.importorskip("chromadb")
+pytest.importorskip("langchain_community")
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from sharded_store import ShardedCollections
+
+
+@pytest.fixture
+def shards(tmp_path):
+    store = ShardedCollections(str(tmp_path / "store"), DeterministicFakeEmbedding(size=16), retire_after=60)
+    yield store
+    store.retire_old_generations()
+
+
+def test_add_text_dir_replaces_chunks_of_edited_files(shards, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "vpn.md").write_text("Old VPN instructions.")
+    (docs / "laptop.txt").write_text("Laptops are replaced every three years.")
+    (docs / "notes.csv").write_text("ignored")
+    shards.add_text_dir("it", str(docs))
+    assert shards.sources("it") == {"vpn.md", "laptop.txt"}
+
+    (docs / "vpn.md").write_text("New VPN instructions.")
+    shards.add_text_dir("it", str(docs))
+    assert sorted(shards.texts("it")) == ["Laptops are replaced every three years.", "New VPN instructions."]
+
+    # Re-adding unchanged files is idempotent.
+    shards.add_text_dir("it", str(docs))
+    assert shards.count("it") == 2
+
+
+def test_rebuild_shard_swaps_generation_and_keeps_other_sources(shards):
+    shards.add_documents("hr", [Document(page_content="Leave policy v1", metadata={"source": "leave.pdf"}),
+                                Document(page_content="Remote work", metadata={"source": "remote.pdf"})])
+    old_name = shards.collection_name("hr")
+
+    count = shards.rebuild_shard("hr", {"leave.pdf"}, [Document(page_content="Leave policy v2",
+                                                                 metadata={"source": "leave.pdf"})])
+    assert count == 2
+    assert shards.collection_name("hr") != old_name
+    assert sorted(shards.texts("hr")) == ["Leave policy v2", "Remote work"]
+    assert shards.texts("hr", exclude_sources={"remote.pdf"}) == ["Leave policy v2"]
+
+    # The process exits before retiring the old generation; the next one picks up
+    # the active generation and drops the superseded one.
+    for _, timer in shards._retiring.values():
+        timer.cancel()
+    shards._retiring.clear()
+    reopened = ShardedCollections(shards.persist_directory, shards.embeddings)
+    assert reopened.collection_name("hr") == shards.collection_name("hr")
+    assert reopened.drop_stale_generations() == [old_name]
+    assert reopened.count("hr") == 2
+
+
+def test_search_routes_and_tags_domain(shards):
+    shards.add_documents("it", [Document(page_content="Install the VPN client", metadata={"source": "vpn.md"})])
+    shards.add_documents("finance", [Document(page_content="Expense reimbursement", metadata={"source": "exp.md"})])
+    assert shards.route("vpn password", top_n=1)[0][0] == "it"
+
+    hits = shards.search("Install the VPN client", k=1, domains=["it", "finance"])
+    assert hits[0][0].page_content == "Install the VPN client"
+    assert hits[0][0].metadata["domain"] == "it"
@@ -0,0 +1,76 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "shared"))
+
+from llm_scheduler import LLMScheduler
+from speculation import speculate
+
+
+def test_refusal_cancels_agent_mid_call_and_frees_slot():
+    scheduler = LLMScheduler(rpm=100000, tpm=1e9, initial_concurrency=1)
+
+    async def main():
+        started = asyncio.Event()
+
+        async def slow_llm():
+            started.set()
+            await asyncio.sleep(60)
+            return "answer"
+
+        async def run_agent():
+            return await scheduler.acall(slow_llm)
+
+        async def input_check():
+            await started.wait()
+            return "refused"
+
+        check, result = await asyncio.wait_for(
+            speculate(input_check, run_agent, lambda c: c == "refused"), 5
+        )
+        assert (check, result) == ("refused", None)
+        assert scheduler.active == 0
+
+        # With a leaked slot this would block forever at initial_concurrency=1.
+        for _ in range(3):
+            check, result = await asyncio.wait_for(
+                speculate(lambda: asyncio.sleep(0, "ok"),
+                          lambda: scheduler.acall(lambda: asyncio.sleep(0, "answer")),
+                          lambda c: c == "refused"), 5
+            )
+            assert (check, result) == ("ok", "answer")
+
+    asyncio.run(main())
+    assert scheduler.active == 0
+
+
+def test_refusal_while_agent_queued_withdraws_request():
+    scheduler = LLMScheduler(rpm=100000, tpm=1e9, initial_concurrency=1)
+
+    async def main():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(scheduler.acall(release.wait))
+        while scheduler.active == 0:
+            await asyncio.sleep(0.01)
+
+        async def input_check():
+            while scheduler.queued == 0:
+                await asyncio.sleep(0.01)
+            return "refused"
+
+        check, result = await asyncio.wait_for(
+            speculate(input_check, lambda: scheduler.acall(lambda: asyncio.sleep(0, "answer")),
+                      lambda c: c == "refused"), 5
+        )
+        assert result is None
+        release.set()
+        await holder
+        for _ in range(100):
+            if scheduler.queued == 0:
+                break
+            await asyncio.sleep(0.01)
+        assert scheduler.queued == 0
+        assert scheduler.active == 0
+
+    asyncio.run(main())